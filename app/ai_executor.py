@@ -0,0 +1,180 @@
+"""
+AI Executor - Runs AIService work off the event loop
+"""
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from app.monitoring import PrometheusMetrics
+
+EXECUTOR_MODES = ("thread", "process")
+
+
+class ExecutorBusy(RuntimeError):
+    """Raised when too many AI calls are already waiting"""
+
+
+# ============ PROCESS WORKERS ============
+
+# AIService of a worker process, over its own copy of the catalog
+_worker_service = None
+
+
+def _start_worker(data_path: str, compiled_path: Optional[str], reload_interval: float):
+    """Load the catalog and an AIService in a freshly started worker process"""
+    global _worker_service
+    from app.ai_service import AIService
+    from app.dataset import Dataset
+
+    dataset = Dataset(data_path, compiled_path)
+    dataset.reload()
+    snapshot = dataset.snapshot
+    service = AIService(snapshot.products, name_index=snapshot.indexes.get('boycott_product'))
+    dataset.add_listener(
+        lambda snapshot: service.reload(snapshot.products, snapshot.indexes.get('boycott_product'))
+    )
+    if reload_interval > 0:
+        dataset.watch(reload_interval)
+    _worker_service = service
+
+
+def _call_worker(method: str, args: tuple) -> Any:
+    """Run an AIService method in a worker process"""
+    return getattr(_worker_service, method)(*args)
+
+
+# ============ EXECUTOR ============
+
+class AIExecutor:
+    """
+    Runs AIService methods in a pool so the event loop stays free.
+
+    In "thread" mode calls go to the given service in a thread pool. In
+    "process" mode every worker process loads the catalog itself (a
+    compiled snapshot file is mapped, so pages are shared) and keeps it
+    fresh with its own file watcher; this sidesteps the GIL entirely.
+
+    At most `max_concurrency` calls run at once. Further calls wait in
+    order; when `max_queue` of them are already waiting, new ones are
+    refused with ExecutorBusy instead of piling up behind a slow call.
+    """
+
+    def __init__(self, service: Any = None, mode: str = "thread", workers: int = 4,
+                 max_concurrency: Optional[int] = None, max_queue: int = 0,
+                 data_path: Optional[str] = None, compiled_path: Optional[str] = None,
+                 reload_interval: float = 0):
+        """
+        Args:
+            service: AIService used in thread mode
+            mode: "thread" or "process"
+            workers: Pool size
+            max_concurrency: Calls running at once (defaults to `workers`)
+            max_queue: Calls allowed to wait for a slot (0 for no limit)
+            data_path: Catalog CSV loaded by process workers
+            compiled_path: Compiled snapshot file of the catalog, if any
+            reload_interval: Seconds between catalog checks in process workers
+        """
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(f"Unknown executor mode: {mode}")
+        if mode == "thread" and service is None:
+            raise ValueError("Thread mode needs the AI service")
+        if mode == "process" and not data_path:
+            raise ValueError("Process mode needs the catalog path")
+
+        self.service = service
+        self.mode = mode
+        self.workers = workers
+        self.max_concurrency = max_concurrency or workers
+        self.max_queue = max_queue
+        self.running = 0
+        self.queued = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._lock = threading.Lock()
+
+        if mode == "thread":
+            self._pool: Executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ai")
+        else:
+            # Fresh interpreters rather than forks of a process running threads
+            self._pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_start_worker,
+                initargs=(data_path, compiled_path, reload_interval),
+            )
+
+    async def run(self, method: str, *args: Any) -> Any:
+        """
+        Call an AIService method in the pool and wait for its result
+
+        Raises:
+            ExecutorBusy: `max_queue` calls are already waiting
+        """
+        with self._lock:
+            if self.max_queue and self.queued >= self.max_queue and self._slots.locked():
+                self.rejected += 1
+                if PrometheusMetrics.AI_REJECTED:
+                    PrometheusMetrics.AI_REJECTED.inc()
+                raise ExecutorBusy(f"{self.queued} AI calls already waiting")
+            self.queued += 1
+            self._publish()
+
+        try:
+            await self._slots.acquire()
+        finally:
+            with self._lock:
+                self.queued -= 1
+                self._publish()
+
+        try:
+            with self._lock:
+                self.running += 1
+                self._publish()
+            loop = asyncio.get_running_loop()
+            if self.mode == "thread":
+                call = loop.run_in_executor(self._pool, getattr(self.service, method), *args)
+            else:
+                call = loop.run_in_executor(self._pool, _call_worker, method, args)
+            result = await call
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        else:
+            with self._lock:
+                self.completed += 1
+            return result
+        finally:
+            self._slots.release()
+            with self._lock:
+                self.running -= 1
+                self._publish()
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool settings, calls running and waiting, and call counts"""
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "workers": self.workers,
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "running": self.running,
+                "queued": self.queued,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+            }
+
+    def _publish(self):
+        # Called with the lock held
+        if PrometheusMetrics.AI_QUEUE_DEPTH:
+            PrometheusMetrics.AI_QUEUE_DEPTH.set(self.queued)
+            PrometheusMetrics.AI_RUNNING.set(self.running)
+
+    def shutdown(self, wait: bool = True):
+        """Stop the pool"""
+        self._pool.shutdown(wait=wait, cancel_futures=True)
@@ -2,119 +2,346 @@
 AI Service Module - Chatbot, Recommendations & Sentiment Analysis
 """
 import json
-from typing import List, Dict, Any
+import threading
+from typing import List, Dict, Any, AsyncIterator, Awaitable, Callable, Iterator, Optional
 import logging
 
+from app.conversation_store import ConversationStore
+from app.inference import InferenceUnavailable, MicroBatchScheduler
+from app.feedback import (
+    analyze_feedback, analyze_feedback_batch, category_of, keywords_in, sentiment_of, suggestion_for,
+)
+from app.recommender import CategoryIndex
+from app.search_index import TokenIndex
+from app.similarity import SimilarityIndex
+from app.text_matcher import FirstRowMatcher
+
 logger = logging.getLogger(__name__)
 
+# Ways get_recommendations can pick products
+RECOMMENDATION_MODES = ("category", "similarity")
+
+# Chat intents and their keywords, checked in order: the first intent
+# with a keyword in the message wins
+INTENT_KEYWORDS = (
+    ("why_boycott", ("produits", "products", "boycotter", "boycott", "listes", "list")),
+    ("why_boycott", ("pourquoi", "why", "raison", "reason")),
+    ("find_alternative", ("alternative", "remplacer", "autre", "tunisien", "replace")),
+    ("statistics", ("stats", "statistiques", "nombre", "total", "combien")),
+    ("palestine_support", ("palestine", "enfants", "children", "guerre", "war")),
+)
+DEFAULT_INTENT = "general"
+
+# Every intent keyword in one automaton, the row being its rule's position
+_INTENT_MATCHER = FirstRowMatcher({
+    "intents": [(word, rank) for rank, (_, words) in enumerate(INTENT_KEYWORDS) for word in words]
+})
+
+
+def _normalize_for_match(text: str) -> str:
+    """Hyphens to spaces, apostrophes removed"""
+    return text.replace("-", " ").replace("'", "")
+
+
+def split_paragraphs(text: str) -> Iterator[str]:
+    """Pieces of a response ending after each blank line; they join back to the text"""
+    start = 0
+    length = len(text)
+    while start < length:
+        end = text.find("\n\n", start)
+        if end == -1:
+            end = length
+        while end < length and text[end] == "\n":
+            end += 1
+        yield text[start:end]
+        start = end
+
+
+def _compile_product_matcher(products: List[Dict[str, Any]]) -> FirstRowMatcher:
+    """
+    Compile product names and brands for the chat lookups
+
+    The "names" group holds the lowercased names and brands. The
+    "mentions" group adds their normalized forms and the normalized words
+    longer than three characters. Matching the lowercased message and its
+    normalized form against "mentions" finds the same first product as
+    checking every product in turn for an exact name/brand, a normalized
+    name/brand, then a long word. Patterns without '-' or "'" occur in the
+    normalized message whenever they occur in the raw one. Patterns with
+    them only ever occur in the raw one.
+    """
+    names = []
+    mentions = []
+    for row, product in enumerate(products):
+        for field in ('boycott_product', 'brand'):
+            text = (product.get(field) or '').lower()
+            normalized = _normalize_for_match(text)
+            names.append((text, row))
+            mentions.append((text, row))
+            mentions.append((normalized, row))
+            mentions.extend((word, row) for word in normalized.split() if len(word) > 3)
+    return FirstRowMatcher({"names": names, "mentions": mentions})
+
+
+class CatalogState:
+    """
+    One catalog and everything the service derives from it.
+
+    The service swaps its whole state in one assignment on reload, and
+    each call reads it once, so a product row found by the matcher is
+    always looked up in the catalog the matcher was built from. The
+    matcher and indexes are built on first use (or by `warm`), not when
+    the state is created; the answer cache only ever holds answers built
+    from this catalog.
+    """
+
+    __slots__ = ("products", "name_index", "version", "responses", "_score",
+                 "_matcher", "_categories", "_similarity", "_lock")
+
+    def __init__(self, products: List[Dict[str, Any]], name_index: Optional[TokenIndex],
+                 version: int, score: Callable[[Dict[str, Any]], float]):
+        self.products = products
+        self.name_index = name_index
+        self.version = version
+        # (kind, key) -> answer text
+        self.responses: Dict[tuple, str] = {}
+        self._score = score
+        self._matcher: Optional[FirstRowMatcher] = None
+        self._categories: Optional[CategoryIndex] = None
+        self._similarity: Optional[SimilarityIndex] = None
+        self._lock = threading.Lock()
+
+    @property
+    def matcher(self) -> FirstRowMatcher:
+        """Product names and brands compiled for the chat lookups"""
+        if self._matcher is None:
+            with self._lock:
+                if self._matcher is None:
+                    self._matcher = _compile_product_matcher(self.products)
+        return self._matcher
+
+    @property
+    def categories(self) -> CategoryIndex:
+        """Products by category, scored without the category match"""
+        if self._categories is None:
+            with self._lock:
+                if self._categories is None:
+                    self._categories = CategoryIndex(self.products, self._score, self.name_index)
+        return self._categories
+
+    @property
+    def similarity(self) -> SimilarityIndex:
+        """TF-IDF index of the catalog"""
+        if self._similarity is None:
+            categories = self.categories
+            with self._lock:
+                if self._similarity is None:
+                    self._similarity = SimilarityIndex(categories.products, categories.name_index)
+        return self._similarity
+
 
 class AIService:
     """Handle all AI operations for ConsumeSafe"""
     
-    def __init__(self, products_data: List[Dict[str, Any]]):
-        self.products = products_data
-        self.conversation_history = []
+    def __init__(self, products_data: List[Dict[str, Any]],
+                 conversations: Optional[ConversationStore] = None,
+                 name_index: Optional[TokenIndex] = None,
+                 inference: Optional[MicroBatchScheduler] = None):
+        self.conversations = conversations if conversations is not None else ConversationStore()
+        # Chat model answering in place of the rules, when configured
+        self.inference = inference
         self.user_preferences = {}
-        
+        self._state = self._new_state(products_data, name_index, 0)
+
+    def _new_state(self, products_data: List[Dict[str, Any]],
+                   name_index: Optional[TokenIndex], version: int) -> CatalogState:
+        return CatalogState(
+            products_data,
+            name_index,
+            version,
+            lambda product: self._calculate_relevance_score(product, set()),
+        )
+
+    @property
+    def products(self) -> List[Dict[str, Any]]:
+        """Products of the current catalog"""
+        return self._state.products
+
+    @property
+    def version(self) -> int:
+        """Catalog generation: 0, then one more per reload"""
+        return self._state.version
+
+    def reload(self, products_data: List[Dict[str, Any]],
+               name_index: Optional[TokenIndex] = None):
+        """
+        Switch to a new product catalog after a dataset reload
+
+        Args:
+            products_data: Products of the newly published dataset
+            name_index: Its product name index, reused if given
+        """
+        self._state = self._new_state(products_data, name_index, self._state.version + 1)
+
+    def warm(self):
+        """Build the current catalog's chat matcher and category index ahead of use"""
+        state = self._state
+        state.matcher
+        state.categories
+
     # ============ CHATBOT FUNCTIONALITY ============
     
-    def chat(self, user_message: str) -> str:
+    def chat(self, user_message: str, session_id: Optional[str] = None) -> str:
         """
         Conversational AI for boycott education
         
         Args:
             user_message: User's message
+            session_id: Conversation to record the exchange in (not
+                recorded when omitted)
             
         Returns:
             AI response about boycott alternatives
         """
-        self.conversation_history.append({"role": "user", "content": user_message})
-        message_lower = user_message.lower()
+        response = self.respond(user_message)
+        self.remember(session_id, user_message, response)
+        return response
+    
+    async def respond_async(self, user_message: str,
+                            fallback: Optional[Callable[[str], Awaitable[str]]] = None) -> str:
+        """
+        Answer one message with the inference backend, if any
+        
+        Falls back to the rule-based answer when there is no backend or
+        it fails or times out.
+        
+        Args:
+            user_message: User's message
+            fallback: Coroutine function giving the rule-based answer
+                (defaults to calling respond() directly)
+        """
+        if self.inference is not None:
+            try:
+                return await self.inference.generate(user_message)
+            except InferenceUnavailable as e:
+                logger.warning(f"Inference unavailable, answering with rules: {e}")
+        if fallback is not None:
+            return await fallback(user_message)
+        return self.respond(user_message)
+    
+    def respond_stream(self, user_message: str) -> Iterator[str]:
+        """Rule-based answer to one message, paragraph by paragraph"""
+        yield from split_paragraphs(self.respond(user_message))
+    
+    async def respond_stream_async(self, user_message: str,
+                                   fallback: Optional[Callable[[str], Awaitable[str]]] = None
+                                   ) -> AsyncIterator[str]:
+        """
+        Answer one message piece by piece
+        
+        The inference backend's stream is relayed as it is generated. If
+        there is no backend, or it fails before its first piece, the
+        rule-based answer is streamed paragraph by paragraph.
+        
+        Args:
+            user_message: User's message
+            fallback: Coroutine function giving the rule-based answer
+                (defaults to calling respond() directly)
         
+        Raises:
+            InferenceUnavailable: The backend failed after it started answering
+        """
+        if self.inference is not None:
+            started = False
+            try:
+                async for piece in self.inference.stream(user_message):
+                    started = True
+                    yield piece
+                return
+            except InferenceUnavailable as e:
+                if started:
+                    raise
+                logger.warning(f"Inference unavailable, answering with rules: {e}")
+        if fallback is not None:
+            response = await fallback(user_message)
+        else:
+            response = self.respond(user_message)
+        for piece in split_paragraphs(response):
+            yield piece
+    
+    def remember(self, session_id: Optional[str], user_message: str, response: str):
+        """Record an exchange in a chat session (nothing without a session)"""
+        if session_id:
+            self.conversations.append(session_id, "user", user_message)
+            self.conversations.append(session_id, "assistant", response)
+    
+    def conversation_history(self, session_id: str) -> List[Dict[str, str]]:
+        """Recorded messages of a chat session, oldest first"""
+        return self.conversations.history(session_id)
+    
+    def respond(self, user_message: str) -> str:
+        """Answer one message, without recording it"""
+        # One catalog for the whole answer, whatever reloads meanwhile
+        state = self._state
         # First, check if it's a specific product question
-        product_match = self._extract_product(user_message)
+        product_match = self._extract_product(user_message, state)
         if product_match:
-            response = self._answer_specific_product(product_match)
-            self.conversation_history.append({"role": "assistant", "content": response})
-            return response
+            return self._cached_response("product", product_match, state)
         
         # Then detect broader intent
-        intent = self._detect_intent(user_message)
-        
-        # Generate response based on intent
-        if intent == "why_boycott":
-            response = self._answer_why_boycott()
-        elif intent == "find_alternative":
-            response = self._find_alternative("")
-        elif intent == "statistics":
-            response = self._get_chat_statistics()
-        elif intent == "palestine_support":
-            response = self._answer_palestine_support()
-        else:
-            response = self._generate_general_response(user_message)
+        return self._cached_response("intent", self._detect_intent(user_message), state)
+    
+    def _cached_response(self, kind: str, key: str, state: CatalogState) -> str:
+        """
+        Answer for a product or an intent, built once per catalog version
         
-        self.conversation_history.append({"role": "assistant", "content": response})
+        None of these answers depend on the message beyond its product or
+        intent, so each is kept until the next reload.
+        """
+        responses = state.responses
+        response = responses.get((kind, key))
+        if response is None:
+            if kind == "product":
+                response = self._answer_specific_product(key, state)
+            elif key == "why_boycott":
+                response = self._answer_why_boycott(state)
+            elif key == "find_alternative":
+                response = self._find_alternative("", state)
+            elif key == "statistics":
+                response = self._get_chat_statistics(state)
+            elif key == "palestine_support":
+                response = self._answer_palestine_support(state)
+            else:
+                response = self._generate_general_response("")
+            responses[(kind, key)] = response
         return response
     
     def _detect_intent(self, message: str) -> str:
-        """Detect user intent from message"""
-        message_lower = message.lower()
-        
-        if any(word in message_lower for word in ["produits", "products", "boycotter", "boycott", "listes", "list"]):
-            return "why_boycott"
-        elif any(word in message_lower for word in ["pourquoi", "why", "raison", "reason"]):
-            return "why_boycott"
-        elif any(word in message_lower for word in ["alternative", "remplacer", "autre", "tunisien", "replace"]):
-            return "find_alternative"
-        elif any(word in message_lower for word in ["stats", "statistiques", "nombre", "total", "combien"]):
-            return "statistics"
-        elif any(word in message_lower for word in ["palestine", "enfants", "children", "guerre", "war"]):
-            return "palestine_support"
-        else:
-            return "general"
+        """Detect user intent from message, in one pass over it"""
+        rank = _INTENT_MATCHER.first_row("intents", message.lower())
+        if rank is None:
+            return DEFAULT_INTENT
+        return INTENT_KEYWORDS[rank][0]
     
-    def _extract_product(self, message: str) -> str:
+    def _extract_product(self, message: str, state: Optional[CatalogState] = None) -> str:
         """Extract product name from message - SMART VERSION"""
         message_lower = message.lower()
         
         # Normalize message (remove special chars for matching)
-        normalized_msg = message_lower.replace("-", " ").replace("'", "")
+        normalized_msg = _normalize_for_match(message_lower)
         
-        # Check each product in database
-        for product in self.products:
-            product_name = product.get('boycott_product', '').lower()
-            brand = product.get('brand', '').lower()
-            
-            # Normalize product names
-            normalized_product = product_name.replace("-", " ").replace("'", "")
-            normalized_brand = brand.replace("-", " ").replace("'", "")
-            
-            # Exact match first
-            if product_name in message_lower or brand in message_lower:
-                return product_name
-            
-            # Then try normalized match
-            if normalized_product in normalized_msg or normalized_brand in normalized_msg:
-                return product_name
-            
-            # Partial match for multi-word brands (at least 2 words)
-            product_words = normalized_product.split()
-            brand_words = normalized_brand.split()
-            
-            for word in product_words:
-                if len(word) > 3 and word in normalized_msg:
-                    return product_name
-            
-            for word in brand_words:
-                if len(word) > 3 and word in normalized_msg:
-                    return product_name
-        
-        return None
+        # First product in catalog order with a name, brand or long word in the message
+        state = state or self._state
+        row = state.matcher.first_row("mentions", message_lower, normalized_msg)
+        if row is None:
+            return None
+        return (state.products[row].get('boycott_product') or '').lower()
     
-    def _answer_why_boycott(self) -> str:
+    def _answer_why_boycott(self, state: Optional[CatalogState] = None) -> str:
         """Explain why boycott is important and list top products"""
+        products = (state or self._state).products
         # Get top 5 products
-        top_products = self.products[:5] if self.products else []
+        top_products = products[:5] if products else []
         products_list = "\n".join([
             f"❌ {p.get('boycott_product')} ({p.get('brand')})"
             for p in top_products
@@ -124,14 +351,14 @@ class AIService:
 
 {products_list}
 
-... et {len(self.products) - 5} autres
+... et {len(products) - 5} autres
 
 **Impact:** $10+ milliards de pertes depuis 2023
 💡 Demandez: "Coca Cola" ou "Alternative pour [produit]"?"""
     
-    def _answer_palestine_support(self) -> str:
+    def _answer_palestine_support(self, state: Optional[CatalogState] = None) -> str:
         """Answer about Palestine support"""
-        total_products = len(self.products)
+        total_products = len((state or self._state).products)
         return f"""🇵🇸 **ConsumeSafe pour la Palestine:**
 
 ✅ {total_products} marques boycottées identifiées
@@ -140,22 +367,22 @@ class AIService:
 
 Votre consommation = votre vote pour la justice! 🇹🇳"""
 
-    def _answer_specific_product(self, product_query: str) -> str:
+    def _answer_specific_product(self, product_query: str,
+                                 state: Optional[CatalogState] = None) -> str:
         """Answer specifically about one product - SHORT AND DIRECT"""
         if not product_query:
             return "Je n'ai pas compris. Quel produit?"
         
-        # Find the product
-        for product in self.products:
-            product_name = product.get('boycott_product', '').lower()
-            brand = product.get('brand', '').lower()
+        # Find the first product whose name or brand appears in the query
+        state = state or self._state
+        row = state.matcher.first_row("names", product_query.lower())
+        if row is not None:
+            product = state.products[row]
+            alternative = product.get('tunisian_alternative', 'N/A')
+            alt_brand = product.get('alternative_brand', 'N/A')
+            reason = product.get('reason', 'Soutien à l\'occupation')
             
-            if product_name in product_query.lower() or brand in product_query.lower():
-                alternative = product.get('tunisian_alternative', 'N/A')
-                alt_brand = product.get('alternative_brand', 'N/A')
-                reason = product.get('reason', 'Soutien à l\'occupation')
-                
-                return f"""❌ **À BOYCOTTER**
+            return f"""❌ **À BOYCOTTER**
 
 {product.get('boycott_product')}
 Marque: {product.get('brand')}
@@ -171,12 +398,12 @@ Marque: {alt_brand} 🇹🇳"""
         
         return f"❓ Produit non trouvé"
     
-    def _find_alternative(self, product_name: str) -> str:
+    def _find_alternative(self, product_name: str, state: Optional[CatalogState] = None) -> str:
         """Find alternative for a product"""
         if not product_name:
             return "🤔 Je n'ai pas bien compris le produit. Pouvez-vous être plus spécifique?"
         
-        for product in self.products:
+        for product in (state or self._state).products:
             if product_name.lower() in product.get('boycott_product', '').lower():
                 alternative = product.get('tunisian_alternative', 'N/A')
                 brand = product.get('alternative_brand', 'N/A')
@@ -197,11 +424,12 @@ En faisant ce choix, vous:
         
         return f"❌ Je n'ai pas trouvé '{product_name}' dans notre base de données. C'est peut-être un produit sûr!"
     
-    def _get_chat_statistics(self) -> str:
+    def _get_chat_statistics(self, state: Optional[CatalogState] = None) -> str:
         """Get statistics for chat"""
-        total = len(self.products)
-        categories = set(p.get('category', '') for p in self.products)
-        brands = set(p.get('brand', '') for p in self.products)
+        products = (state or self._state).products
+        total = len(products)
+        categories = set(p.get('category', '') for p in products)
+        brands = set(p.get('brand', '') for p in products)
         
         return f"""📊 **Statistiques:**
 
@@ -222,40 +450,59 @@ Demandez un produit spécifique pour plus d'info!"""
     
     # ============ RECOMMENDATIONS FUNCTIONALITY ============
     
-    def get_recommendations(self, user_history: List[str], limit: int = 5) -> List[Dict[str, Any]]:
+    def get_recommendations(self, user_history: List[str], limit: int = 5,
+                            mode: str = "category") -> List[Dict[str, Any]]:
         """
         Get personalized recommendations based on user history
         
         Args:
             user_history: List of products user viewed/searched
             limit: Number of recommendations
+            mode: "category" for products of the viewed categories,
+                "similarity" for the products closest to the history by
+                TF-IDF cosine similarity
             
         Returns:
             List of recommended alternatives
         """
-        recommendations = []
-        viewed_categories = set()
-        
-        # Get categories from user history
-        for product_name in user_history:
-            for product in self.products:
-                if product_name.lower() in product.get('boycott_product', '').lower():
-                    viewed_categories.add(product.get('category', ''))
+        if mode == "similarity":
+            return self._similar_products(user_history, limit)
+        if mode != "category":
+            raise ValueError(f"Unknown recommendation mode: {mode}")
         
-        # Get products from same categories
-        for product in self.products:
-            if product.get('category', '') in viewed_categories:
-                recommendations.append({
-                    "product": product.get('boycott_product'),
-                    "brand": product.get('brand'),
-                    "alternative": product.get('tunisian_alternative'),
-                    "category": product.get('category'),
-                    "score": self._calculate_relevance_score(product, viewed_categories)
-                })
+        index = self._state.categories
+        viewed_categories = index.viewed_categories(user_history)
         
-        # Sort by relevance score and return top N
-        recommendations.sort(key=lambda x: x['score'], reverse=True)
-        return recommendations[:limit]
+        recommendations = []
+        for row in index.top_rows(viewed_categories, limit):
+            product = index.products[row]
+            recommendations.append({
+                "product": product.get('boycott_product'),
+                "brand": product.get('brand'),
+                "alternative": product.get('tunisian_alternative'),
+                "category": product.get('category'),
+                "score": self._calculate_relevance_score(product, viewed_categories)
+            })
+        return recommendations
+    
+    def _similar_products(self, user_history: List[str], limit: int) -> List[Dict[str, Any]]:
+        """Products most similar to the history, scored by cosine similarity"""
+        index = self._similarity_index()
+        recommendations = []
+        for row, score in index.top_rows(user_history, limit):
+            product = index.products[row]
+            recommendations.append({
+                "product": product.get('boycott_product'),
+                "brand": product.get('brand'),
+                "alternative": product.get('tunisian_alternative'),
+                "category": product.get('category'),
+                "score": round(score, 4)
+            })
+        return recommendations
+    
+    def _similarity_index(self) -> SimilarityIndex:
+        """TF-IDF index of the current catalog, built on first use"""
+        return self._state.similarity
     
     def _calculate_relevance_score(self, product: Dict, user_categories: set) -> float:
         """Calculate relevance score for recommendation"""
@@ -286,61 +533,36 @@ Demandez un produit spécifique pour plus d'info!"""
         Returns:
             Sentiment analysis result
         """
-        sentiment = self._simple_sentiment(text)
+        return analyze_feedback(text)
+    
+    def analyze_sentiment_batch(self, texts: List[str], processes: int = 0) -> List[Dict[str, Any]]:
+        """
+        Analyze sentiment of many feedback texts
         
-        return {
-            "text": text,
-            "sentiment": sentiment['label'],
-            "score": sentiment['score'],
-            "category": self._categorize_feedback(text),
-            "actionable": sentiment['label'] in ['negative', 'neutral'],
-            "suggestion": self._generate_suggestion(sentiment['label'], text)
-        }
+        Args:
+            texts: User feedback texts
+            processes: Worker processes to use for large batches (0 for none)
+            
+        Returns:
+            One sentiment analysis result per text, in order
+        """
+        return analyze_feedback_batch(texts, processes)
     
     def _simple_sentiment(self, text: str) -> Dict[str, Any]:
         """Simple sentiment analysis"""
-        text_lower = text.lower()
-        
-        positive_words = ['excellent', 'bon', 'merveilleux', 'fantastic', 'love', 'adore', 'parfait']
-        negative_words = ['mauvais', 'nul', 'terrible', 'hate', 'awful', 'problème', 'bug', 'erreur']
-        
-        positive_count = sum(1 for word in positive_words if word in text_lower)
-        negative_count = sum(1 for word in negative_words if word in text_lower)
-        
-        if positive_count > negative_count:
-            return {"label": "positive", "score": 0.8 + (positive_count * 0.1)}
-        elif negative_count > positive_count:
-            return {"label": "negative", "score": 0.8 + (negative_count * 0.1)}
-        else:
-            return {"label": "neutral", "score": 0.5}
+        return sentiment_of(keywords_in(text.lower()))
     
     def _categorize_feedback(self, text: str) -> str:
         """Categorize feedback type"""
-        text_lower = text.lower()
-        
-        if any(word in text_lower for word in ['interface', 'design', 'couleur', 'button']):
-            return "UI/UX"
-        elif any(word in text_lower for word in ['vitesse', 'lent', 'fast', 'performance']):
-            return "Performance"
-        elif any(word in text_lower for word in ['produit', 'données', 'data', 'alternative']):
-            return "Content"
-        elif any(word in text_lower for word in ['bug', 'erreur', 'error', 'crash']):
-            return "Bug"
-        else:
-            return "General"
+        return category_of(keywords_in(text.lower()))
     
     def _generate_suggestion(self, sentiment: str, text: str) -> str:
         """Generate actionable suggestion"""
-        category = self._categorize_feedback(text)
-        
-        if sentiment == "negative":
-            return f"❌ Feedback négatif détecté en {category}. À investiguer en priorité."
-        elif sentiment == "neutral":
-            return f"ℹ️ Suggestion d'amélioration en {category}. À examiner."
-        else:
-            return f"✅ Feedback positif! Utilisateur satisfait avec {category}."
-
+        return suggestion_for(sentiment, self._categorize_feedback(text))
 
-def create_ai_service(products_data: List[Dict[str, Any]]) -> AIService:
+def create_ai_service(products_data: List[Dict[str, Any]],
+                      conversations: Optional[ConversationStore] = None,
+                      name_index: Optional[TokenIndex] = None,
+                      inference: Optional[MicroBatchScheduler] = None) -> AIService:
     """Factory function to create AI service"""
-    return AIService(products_data)
+    return AIService(products_data, conversations, name_index, inference)
@@ -23,7 +23,51 @@ ALLOWED_ORIGINS = [
     "http://127.0.0.1:8000",
 ]
 
-# Rate limiting
-RATE_LIMIT_ENABLED = True
-RATE_LIMIT_REQUESTS = 100
-RATE_LIMIT_PERIOD = 3600  # 1 hour
+# Rate limiting: requests allowed per client per period (seconds), bursts
+# included. State is kept per process ("memory"), shared by the workers of a
+# host through a mapped file ("shared"), or in Redis ("redis"; the URL
+# "local" uses an in-process stand-in).
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "True") == "True"
+RATE_LIMIT_REQUESTS = int(os.getenv("RATE_LIMIT_REQUESTS", "100"))
+RATE_LIMIT_PERIOD = float(os.getenv("RATE_LIMIT_PERIOD", "3600"))  # 1 hour
+RATE_LIMIT_STORE = os.getenv("RATE_LIMIT_STORE", "memory")
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "")
+RATE_LIMIT_SHARED_PATH = os.getenv("RATE_LIMIT_SHARED_PATH") or None
+RATE_LIMIT_SHARED_SLOTS = int(os.getenv("RATE_LIMIT_SHARED_SLOTS", "65536"))
+
+# Dataset hot reload: seconds between checks of the CSV (0 disables)
+DATA_RELOAD_INTERVAL = float(os.getenv("DATA_RELOAD_INTERVAL", "2"))
+
+# Static page hot reload: seconds between checks of index.html (0 disables)
+STATIC_RELOAD_INTERVAL = float(os.getenv("STATIC_RELOAD_INTERVAL", "2"))
+
+# Compiled catalog snapshot (python -m app.snapshot_file), mapped instead of
+# parsing the CSV when it was built from the current file
+DATA_SNAPSHOT_PATH = os.getenv("DATA_SNAPSHOT_PATH", str(BASE_DIR / "data" / "boycott_products.snap"))
+
+# Chat history: messages kept per session, sessions kept, idle seconds before
+# a session is dropped, and a cap on the memory all histories may hold
+CHAT_HISTORY_MAX_MESSAGES = int(os.getenv("CHAT_HISTORY_MAX_MESSAGES", "20"))
+CHAT_MAX_SESSIONS = int(os.getenv("CHAT_MAX_SESSIONS", "10000"))
+CHAT_SESSION_TTL = float(os.getenv("CHAT_SESSION_TTL", "1800"))
+CHAT_HISTORY_MAX_BYTES = int(os.getenv("CHAT_HISTORY_MAX_BYTES", str(16 * 2**20)))
+
+# Worker processes for large sentiment batches (0 analyzes in the API process)
+SENTIMENT_PROCESSES = int(os.getenv("SENTIMENT_PROCESSES", "0"))
+
+# AI executor: "thread" or "process" pool, its size, calls running at once
+# (0 means one per worker) and calls allowed to wait (0 means no limit)
+AI_EXECUTOR_MODE = os.getenv("AI_EXECUTOR_MODE", "thread")
+AI_EXECUTOR_WORKERS = int(os.getenv("AI_EXECUTOR_WORKERS", "4"))
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "0"))
+AI_MAX_QUEUE = int(os.getenv("AI_MAX_QUEUE", "100"))
+
+# Chat inference backend: "rules" (keyword answers), "http" (local model
+# server at INFERENCE_URL) or "package.module:ClassName". Concurrent messages
+# are batched up to INFERENCE_MAX_BATCH or INFERENCE_MAX_WAIT_MS; past
+# INFERENCE_TIMEOUT seconds the rules answer instead.
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "rules")
+INFERENCE_URL = os.getenv("INFERENCE_URL", "")
+INFERENCE_MAX_BATCH = int(os.getenv("INFERENCE_MAX_BATCH", "8"))
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "10"))
+INFERENCE_TIMEOUT = float(os.getenv("INFERENCE_TIMEOUT", "2"))
@@ -0,0 +1,145 @@
+"""
+Conversation Store - Bounded per-session chat history
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Dict, List
+
+# Bookkeeping cost of one stored message besides its text (tuple, deque slot)
+MESSAGE_OVERHEAD = 100
+
+# Largest single message kept, bookkeeping included; longer ones are cut
+MAX_MESSAGE_BYTES = 64 * 2**10
+
+
+class _Session:
+    """Ring buffer of (role, content, size) messages of one conversation"""
+
+    __slots__ = ("messages", "bytes", "last_seen")
+
+    def __init__(self, max_messages: int, now: float):
+        self.messages = deque(maxlen=max_messages)
+        self.bytes = 0
+        self.last_seen = now
+
+
+class ConversationStore:
+    """
+    Chat histories keyed by session id.
+
+    Each session keeps only its last `max_messages` messages. Sessions
+    are held in least-recently-used order and dropped when idle for
+    longer than `ttl` seconds, when there are more than `max_sessions`,
+    or, least recently used first, when all histories together exceed
+    `max_bytes` even after the growing session dropped its own oldest
+    messages. A single message is cut to `max_message_bytes`. All
+    methods are thread-safe.
+    """
+
+    def __init__(self, max_messages: int = 20, max_sessions: int = 10_000,
+                 ttl: float = 1800, max_bytes: int = 16 * 2**20,
+                 max_message_bytes: int = MAX_MESSAGE_BYTES,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_messages = max_messages
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_message_bytes = min(max_message_bytes, max_bytes)
+        self.clock = clock
+        self.bytes_held = 0
+        self.evictions = {"ttl": 0, "lru": 0, "memory": 0}
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def append(self, session_id: str, role: str, content: str):
+        """
+        Add a message to a session, creating the session if needed.
+
+        A message larger than `max_message_bytes` keeps only its start.
+        """
+        size = sys.getsizeof(content) + MESSAGE_OVERHEAD
+        while size > self.max_message_bytes and content:
+            content = content[:len(content) * max(self.max_message_bytes - MESSAGE_OVERHEAD, 0) // size]
+            size = sys.getsizeof(content) + MESSAGE_OVERHEAD
+        with self._lock:
+            now = self.clock()
+            self._expire(now)
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = _Session(self.max_messages, now)
+                while len(self._sessions) > self.max_sessions:
+                    self._evict_oldest("lru")
+            else:
+                self._sessions.move_to_end(session_id)
+                session.last_seen = now
+
+            if len(session.messages) == session.messages.maxlen:
+                self._forget(session, session.messages[0][2])
+            session.messages.append((role, content, size))
+            session.bytes += size
+            self.bytes_held += size
+
+            # Over the memory cap: drop the oldest messages of this session
+            # first, so one large conversation cannot push out the others,
+            # then whole sessions, least recently used first
+            while self.bytes_held > self.max_bytes and len(session.messages) > 1:
+                self._forget(session, session.messages.popleft()[2])
+            while self.bytes_held > self.max_bytes and len(self._sessions) > 1:
+                self._evict_oldest("memory")
+
+    def history(self, session_id: str) -> List[Dict[str, str]]:
+        """Messages of a session, oldest first (empty if unknown or expired)"""
+        with self._lock:
+            self._expire(self.clock())
+            session = self._sessions.get(session_id)
+            if session is None:
+                return []
+            return [{"role": role, "content": content} for role, content, _ in session.messages]
+
+    def clear(self, session_id: str) -> bool:
+        """Forget a session; False if it did not exist"""
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is None:
+                return False
+            self.bytes_held -= session.bytes
+            return True
+
+    def stats(self) -> Dict[str, object]:
+        """Session count, bytes held and evictions, for metrics"""
+        with self._lock:
+            self._expire(self.clock())
+            return {
+                "sessions": len(self._sessions),
+                "messages": sum(len(s.messages) for s in self._sessions.values()),
+                "bytes": self.bytes_held,
+                "max_bytes": self.max_bytes,
+                "evictions": dict(self.evictions),
+            }
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def _forget(self, session: _Session, size: int):
+        # The deque drops its oldest entry by itself; only the byte counts move
+        session.bytes -= size
+        self.bytes_held -= size
+
+    def _evict_oldest(self, reason: str):
+        _, session = self._sessions.popitem(last=False)
+        self.bytes_held -= session.bytes
+        self.evictions[reason] += 1
+
+    def _expire(self, now: float):
+        # LRU order is also last-seen order: expired sessions are at the front
+        deadline = now - self.ttl
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if session.last_seen > deadline:
+                break
+            self._evict_oldest("ttl")
@@ -0,0 +1,272 @@
+"""
+Dataset - Immutable catalog snapshots and hot reload of the boycott CSV
+"""
+import hashlib
+import itertools
+import logging
+import os
+import threading
+from datetime import datetime
+from email.utils import formatdate
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.product_store import ProductStore
+from app.search_index import Autocomplete, TokenIndex, TrigramIndex
+from app.text_matcher import CatalogScanner
+
+logger = logging.getLogger(__name__)
+
+# Text columns with a search index, and the default fields for lookups
+INDEXED_FIELDS = ('boycott_product', 'brand', 'tunisian_alternative')
+SEARCH_FIELDS = ('boycott_product', 'brand')
+
+# Columns with a value index for filtered listings
+FILTER_FIELDS = ('category', 'intensity')
+
+_versions = itertools.count(1)
+
+
+class DatasetSnapshot:
+    """
+    One loaded catalog together with every index built from it.
+
+    A snapshot is never modified once built: readers take a reference to
+    the current snapshot and keep using it for the whole request, while a
+    reload builds a new snapshot on the side and publishes it by swapping
+    a single reference.
+    """
+
+    def __init__(self, products: ProductStore, source: Optional[Tuple[int, int, int]] = None,
+                 indexes: Optional[Dict[str, TokenIndex]] = None,
+                 trigram_index: Optional[TrigramIndex] = None,
+                 autocomplete: Optional[Autocomplete] = None, mapping: Any = None,
+                 content_hash: Optional[str] = None):
+        self.products = products
+        self.source = source
+        self.version = next(_versions)
+        self.loaded_at = datetime.now()
+        # SHA-256 of the catalog file the snapshot was loaded from, if known
+        self.content_hash = content_hash
+        # mmap backing the columns and indexes when opened from a snapshot file
+        self.mapping = mapping
+        if indexes is None:
+            indexes = {
+                field: TokenIndex(products.column(field))
+                for field in INDEXED_FIELDS
+            }
+        self.indexes = indexes
+        if trigram_index is None:
+            trigram_index = TrigramIndex({
+                field: index.values for field, index in indexes.items()
+            })
+        self.trigram_index = trigram_index
+        if autocomplete is None:
+            autocomplete = Autocomplete(products)
+        self.autocomplete = autocomplete
+        for field in FILTER_FIELDS:
+            if field not in products.value_indexes:
+                products.build_value_index(field)
+        self._scanner = None
+        self._scanner_lock = threading.Lock()
+
+    @property
+    def scanner(self) -> CatalogScanner:
+        """Free-text scanner over the catalog, built on first use"""
+        if self._scanner is None:
+            with self._scanner_lock:
+                if self._scanner is None:
+                    self._scanner = CatalogScanner(self.products)
+        return self._scanner
+
+    @property
+    def etag(self) -> str:
+        """
+        Strong entity tag of everything served from this snapshot
+
+        Derived from the catalog's content, so every worker and every
+        reload of the same file agree on it.
+        """
+        if self.content_hash is None:
+            return f'"v{self.version}"'
+        return f'"{self.content_hash[:32]}"'
+
+    @property
+    def last_modified(self) -> str:
+        """HTTP date of the catalog file's last change (or of loading)"""
+        if self.source is not None:
+            return formatdate(self.source[0] / 1e9, usegmt=True)
+        return formatdate(self.loaded_at.timestamp(), usegmt=True)
+
+    @classmethod
+    def empty(cls) -> 'DatasetSnapshot':
+        """Snapshot of an empty catalog"""
+        return cls(ProductStore.from_rows([], []), content_hash=hashlib.sha256(b"").hexdigest())
+
+    @classmethod
+    def from_csv(cls, path: str) -> 'DatasetSnapshot':
+        """Load a catalog CSV and build its indexes"""
+        source = file_signature(path)
+        content_hash = file_hash(path)
+        return cls(ProductStore.from_csv(path), source, content_hash=content_hash)
+
+
+def file_hash(path: str) -> str:
+    """SHA-256 of a file's content, as hex"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_signature(path: str) -> Tuple[int, int, int]:
+    """(mtime_ns, inode, size) of a file: changes when it is edited or replaced"""
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_ino, stat.st_size)
+
+
+class DatasetWatcher:
+    """
+    Poll a file in a background thread and call `on_change` when its
+    modification time, inode or size changes. A change counts as handled
+    only once `on_change` returns without raising and without returning
+    False, so a failed reload is retried on the next check.
+
+    Polling `os.stat` is cheap and works for in-place edits as well as
+    atomic replacements (write to a temp file, then rename over the
+    original) without any platform-specific notification API.
+    """
+
+    def __init__(self, path: str, on_change: Callable[[], Optional[bool]], interval: float = 2.0,
+                 signature: Optional[Tuple[int, int, int]] = None):
+        self.path = path
+        self.on_change = on_change
+        self.interval = interval
+        self.signature = signature
+        self._stop = threading.Event()
+        self._thread = None
+
+    def check(self) -> bool:
+        """Call `on_change` if the file changed since the last handled change"""
+        try:
+            signature = file_signature(self.path)
+        except OSError:
+            # Missing while being replaced: look again on the next tick
+            return False
+        if signature == self.signature:
+            return False
+        if self.on_change() is False:
+            return False
+        self.signature = signature
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Error reloading {self.path}: {e}")
+
+    def start(self):
+        """Start polling in a daemon thread"""
+        if self._thread is not None:
+            return
+        if self.signature is None:
+            try:
+                self.signature = file_signature(self.path)
+            except OSError:
+                pass
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="dataset-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop polling and wait for the thread to exit"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+
+class Dataset:
+    """
+    Holder of the current snapshot of a catalog file.
+
+    `snapshot` is replaced, never mutated, so reading it needs no lock.
+    Reloads are serialized among themselves, and listeners are told about
+    each newly published snapshot. When a compiled snapshot file built
+    from the current CSV exists, it is mapped instead of parsing the CSV.
+    """
+
+    def __init__(self, path: str, compiled_path: Optional[str] = None):
+        self.path = path
+        self.compiled_path = compiled_path
+        self.snapshot = DatasetSnapshot.empty()
+        self.listeners: List[Callable[[DatasetSnapshot], None]] = []
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+
+    def add_listener(self, listener: Callable[[DatasetSnapshot], None]):
+        """Call `listener(snapshot)` after every swap"""
+        if listener not in self.listeners:
+            self.listeners.append(listener)
+
+    def publish(self, snapshot: DatasetSnapshot):
+        """Make `snapshot` the current one and notify listeners"""
+        self.snapshot = snapshot
+        for listener in self.listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                logger.error(f"Dataset listener failed: {e}")
+
+    def reload(self) -> bool:
+        """
+        Rebuild the snapshot from the file
+
+        On failure the current snapshot stays in place and False is returned.
+        """
+        with self._reload_lock:
+            try:
+                snapshot = self._open_compiled() or DatasetSnapshot.from_csv(self.path)
+            except Exception as e:
+                logger.error(f"Error loading data: {e}")
+                return False
+            self.publish(snapshot)
+            logger.info(f"Loaded {len(snapshot.products)} boycott products "
+                        f"(dataset version {snapshot.version})")
+            return True
+
+    def _open_compiled(self) -> Optional[DatasetSnapshot]:
+        """Map the compiled snapshot file if it was built from the current CSV"""
+        if not self.compiled_path or not os.path.exists(self.compiled_path):
+            return None
+        from app.snapshot_file import is_fresh, open_snapshot, read_manifest
+        try:
+            source = file_signature(self.path)
+        except OSError:
+            source = None
+        try:
+            if not is_fresh(read_manifest(self.compiled_path), self.path):
+                logger.warning(f"Snapshot file {self.compiled_path} is stale, loading the CSV")
+                return None
+            snapshot = open_snapshot(self.compiled_path)
+        except Exception as e:
+            logger.warning(f"Ignoring snapshot file {self.compiled_path}: {e}")
+            return None
+        snapshot.source = source
+        return snapshot
+
+    def watch(self, interval: float):
+        """Reload automatically whenever the file changes"""
+        if self._watcher is not None:
+            return
+        self._watcher = DatasetWatcher(self.path, self.reload, interval, self.snapshot.source)
+        self._watcher.start()
+
+    def stop_watching(self):
+        """Stop the file watcher, if running"""
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
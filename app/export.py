@@ -0,0 +1,61 @@
+"""
+Export - Streaming CSV and NDJSON dumps of the catalog
+"""
+import csv
+import io
+import json
+from typing import Iterable, Iterator, Mapping, Sequence
+
+EXPORT_FORMATS = ("csv", "ndjson")
+MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+# Rows encoded per yielded chunk: large enough to amortize the send,
+# small enough that memory does not depend on the export size
+CHUNK_ROWS = 500
+
+
+def iter_csv(products: Iterable[Mapping], fieldnames: Sequence[str],
+             chunk_rows: int = CHUNK_ROWS) -> Iterator[str]:
+    """
+    Lazily encode rows as CSV, header first
+
+    Fields are quoted by csv.writer where needed (commas, quotes,
+    newlines); missing values are written as empty fields.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(fieldnames)
+    pending = 0
+    for product in products:
+        writer.writerow([product.get(name) for name in fieldnames])
+        pending += 1
+        if pending >= chunk_rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
+
+
+def iter_ndjson(products: Iterable[Mapping], fieldnames: Sequence[str],
+                chunk_rows: int = CHUNK_ROWS) -> Iterator[str]:
+    """Lazily encode rows as newline-delimited JSON objects"""
+    lines = []
+    for product in products:
+        row = {name: product.get(name) for name in fieldnames}
+        lines.append(json.dumps(row, ensure_ascii=False, separators=(",", ":")))
+        if len(lines) >= chunk_rows:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def iter_export(products: Iterable[Mapping], fieldnames: Sequence[str],
+                export_format: str = "csv") -> Iterator[str]:
+    """Lazily encode rows in one of EXPORT_FORMATS"""
+    if export_format == "csv":
+        return iter_csv(products, fieldnames)
+    if export_format == "ndjson":
+        return iter_ndjson(products, fieldnames)
+    raise ValueError(f"Unknown export format: {export_format}")
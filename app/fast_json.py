@@ -0,0 +1,121 @@
+"""
+Fast JSON - Byte-level JSON encoding of catalog rows and responses
+"""
+from typing import Any, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from fastapi.responses import JSONResponse
+
+from app.response_cache import encode_json
+
+try:
+    import orjson
+except ImportError:  # stdlib json only
+    orjson = None
+
+# Encoded rows kept per shape and catalog, at most
+FRAGMENT_CACHE_BYTES = 8 * 2**20
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Compact UTF-8 JSON, with orjson when it is installed
+
+    Strings, non-string keys and str/int/dict/list subclasses come out as
+    `encode_json` writes them. With orjson, floats may use a shorter
+    exponent form (1e16 for 1e+16), and NaN or infinities become null
+    where `encode_json` refuses them. Integers past 64 bits go through
+    `encode_json`.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass
+    return encode_json(content)
+
+
+class JSONFragment:
+    """Already encoded JSON, inserted as-is by `encode_object`"""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+
+def encode_object(content: Mapping[str, Any]) -> bytes:
+    """Encode a JSON object whose values may be JSONFragments, in key order"""
+    return b"{" + b",".join(
+        dumps(key) + b":" + (value.data if isinstance(value, JSONFragment) else dumps(value))
+        for key, value in content.items()
+    ) + b"}"
+
+
+class _Fragments:
+    """Encoded rows of one shape for one catalog, and their total size"""
+
+    __slots__ = ("rows", "size")
+
+    def __init__(self, rows: int):
+        self.rows: List[Optional[bytes]] = [None] * rows
+        self.size = 0
+
+
+class RowShape:
+    """
+    How a listing renders one catalog row: output keys and source columns.
+
+    Each row is encoded once per shape and the bytes are kept on the
+    product store, next to its other derived data, so a listing only
+    joins fragments; a reloaded catalog is a new store and starts with
+    no fragments. Rows are encoded when first listed, not up front, and
+    once `max_bytes` of them are kept the others are encoded on every
+    listing. Shapes are meant to be module constants: each one holds
+    its own fragments on every store it lists.
+    """
+
+    __slots__ = ("fields", "max_bytes")
+
+    def __init__(self, fields: Sequence[Tuple[str, str]], max_bytes: int = FRAGMENT_CACHE_BYTES):
+        """
+        Args:
+            fields: (output key, column name) pairs in output order
+            max_bytes: Size of the encoded rows kept per catalog, at most
+        """
+        self.fields = tuple(fields)
+        self.max_bytes = max_bytes
+
+    def encode(self, row: Mapping[str, Any]) -> bytes:
+        """JSON object of one row"""
+        return dumps({key: row.get(column) for key, column in self.fields})
+
+    def fragment(self, row: Mapping[str, Any]) -> bytes:
+        """JSON object of one row, cached when the row is a store view"""
+        store = getattr(row, "store", None)
+        if store is None:
+            return self.encode(row)
+        fragments = store.row_fragments.get(self)
+        if fragments is None:
+            fragments = store.row_fragments.setdefault(self, _Fragments(len(store)))
+        data = fragments.rows[row.row]
+        if data is None:
+            data = self.encode(row)
+            if fragments.size + len(data) <= self.max_bytes:
+                fragments.rows[row.row] = data
+                fragments.size += len(data)
+        return data
+
+    def encode_rows(self, rows: Iterable[Mapping[str, Any]]) -> JSONFragment:
+        """JSON array of rows"""
+        return JSONFragment(b"[" + b",".join(self.fragment(row) for row in rows) + b"]")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered by `dumps`, taking encoded bodies as they are"""
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        if isinstance(content, JSONFragment):
+            return content.data
+        return dumps(content)
@@ -0,0 +1,145 @@
+"""
+Feedback Analysis - Keyword sentiment and category of user feedback
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+POSITIVE_WORDS = ('excellent', 'bon', 'merveilleux', 'fantastic', 'love', 'adore', 'parfait')
+NEGATIVE_WORDS = ('mauvais', 'nul', 'terrible', 'hate', 'awful', 'problème', 'bug', 'erreur')
+
+# Checked in order: the first category with a keyword in the text wins
+CATEGORY_KEYWORDS = (
+    ("UI/UX", ('interface', 'design', 'couleur', 'button')),
+    ("Performance", ('vitesse', 'lent', 'fast', 'performance')),
+    ("Content", ('produit', 'données', 'data', 'alternative')),
+    ("Bug", ('bug', 'erreur', 'error', 'crash')),
+)
+DEFAULT_CATEGORY = "General"
+
+# Batches at least this large are worth shipping to worker processes
+PROCESS_POOL_MIN_BATCH = 2000
+
+# Worker processes for large batches, started on first use and kept:
+# (processes, pool)
+_pool: Optional[Tuple[int, ProcessPoolExecutor]] = None
+_pool_lock = threading.Lock()
+
+# Every keyword once: a text is checked against each of them a single time,
+# and both its sentiment and its category are read from what was found
+KEYWORDS = tuple(sorted(set(
+    POSITIVE_WORDS + NEGATIVE_WORDS + tuple(w for _, words in CATEGORY_KEYWORDS for w in words)
+)))
+_POSITIVE = frozenset(POSITIVE_WORDS)
+_NEGATIVE = frozenset(NEGATIVE_WORDS)
+
+
+def keywords_in(text_lower: str) -> FrozenSet[str]:
+    """Keywords occurring in a lowercased text"""
+    return frozenset([keyword for keyword in KEYWORDS if keyword in text_lower])
+
+
+def sentiment_of(keywords: FrozenSet[str]) -> Dict[str, Any]:
+    """Sentiment label and score from the keywords of a text"""
+    positive_count = len(keywords & _POSITIVE)
+    negative_count = len(keywords & _NEGATIVE)
+
+    if positive_count > negative_count:
+        return {"label": "positive", "score": 0.8 + (positive_count * 0.1)}
+    elif negative_count > positive_count:
+        return {"label": "negative", "score": 0.8 + (negative_count * 0.1)}
+    else:
+        return {"label": "neutral", "score": 0.5}
+
+
+def category_of(keywords: FrozenSet[str]) -> str:
+    """Feedback category from the keywords of a text"""
+    for category, words in CATEGORY_KEYWORDS:
+        if not keywords.isdisjoint(words):
+            return category
+    return DEFAULT_CATEGORY
+
+
+def suggestion_for(sentiment: str, category: str) -> str:
+    """Actionable suggestion for a sentiment and category"""
+    if sentiment == "negative":
+        return f"❌ Feedback négatif détecté en {category}. À investiguer en priorité."
+    elif sentiment == "neutral":
+        return f"ℹ️ Suggestion d'amélioration en {category}. À examiner."
+    else:
+        return f"✅ Feedback positif! Utilisateur satisfait avec {category}."
+
+
+def analyze_feedback(text: str) -> Dict[str, Any]:
+    """
+    Analyze one feedback text, looking for each keyword once
+
+    Args:
+        text: User feedback text
+
+    Returns:
+        Sentiment analysis result
+    """
+    keywords = keywords_in(text.lower())
+    sentiment = sentiment_of(keywords)
+    category = category_of(keywords)
+    return {
+        "text": text,
+        "sentiment": sentiment['label'],
+        "score": sentiment['score'],
+        "category": category,
+        "actionable": sentiment['label'] in ['negative', 'neutral'],
+        "suggestion": suggestion_for(sentiment['label'], category)
+    }
+
+
+def analyze_feedback_batch(texts: Sequence[str], processes: int = 0) -> List[Dict[str, Any]]:
+    """
+    Analyze many feedback texts, in order
+
+    Args:
+        texts: Feedback texts
+        processes: Worker processes for batches of at least
+            PROCESS_POOL_MIN_BATCH texts (0 or 1 analyzes in-process)
+
+    Returns:
+        One result per text, as analyze_feedback returns them
+    """
+    if processes > 1 and len(texts) >= PROCESS_POOL_MIN_BATCH:
+        chunk_size = max(1, len(texts) // (processes * 4))
+        try:
+            return list(_worker_pool(processes).map(analyze_feedback, texts, chunksize=chunk_size))
+        except BrokenProcessPool:
+            # A worker died: start a new pool next time, answer this batch here
+            shutdown_pool(wait=False)
+    return [analyze_feedback(text) for text in texts]
+
+
+def _worker_pool(processes: int) -> ProcessPoolExecutor:
+    """
+    The long-lived batch pool, started on first use
+
+    Workers are spawned rather than forked: forking a threaded server
+    process can copy locks held by other threads.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool[0] != processes:
+            if _pool is not None:
+                _pool[1].shutdown(wait=False)
+            pool = ProcessPoolExecutor(
+                max_workers=processes, mp_context=multiprocessing.get_context("spawn")
+            )
+            _pool = (processes, pool)
+        return _pool[1]
+
+
+def shutdown_pool(wait: bool = True):
+    """Stop the batch worker processes, if they were started"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool[1].shutdown(wait=wait)
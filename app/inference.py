@@ -0,0 +1,245 @@
+"""
+Inference - Pluggable chat model backends with micro-batching
+"""
+import asyncio
+import importlib
+import json
+import logging
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceUnavailable(RuntimeError):
+    """The backend failed or did not answer in time"""
+
+
+# End of a streamed response
+_END = object()
+
+
+class InferenceBackend:
+    """
+    A chat model answering a batch of prompts at once.
+
+    `generate_batch` is called from a dedicated thread, one batch at a
+    time, so implementations may block and need not be thread-safe.
+    """
+
+    name = "backend"
+
+    def generate_batch(self, prompts: List[str]) -> List[str]:
+        """Return one response per prompt, in order"""
+        raise NotImplementedError
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """
+        Yield the response to one prompt piece by piece
+
+        Backends that generate token by token should override this; the
+        default yields the whole response at once.
+        """
+        yield self.generate_batch([prompt])[0]
+
+    def close(self):
+        """Release the model's resources"""
+
+
+class HTTPInferenceBackend(InferenceBackend):
+    """
+    Model served by a local HTTP server.
+
+    Each batch is one POST of ``{"prompts": [...]}`` to `url`, answered
+    with ``{"responses": [...]}`` in the same order.
+    """
+
+    name = "http"
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        self.url = url
+        self.timeout = timeout
+
+    def generate_batch(self, prompts: List[str]) -> List[str]:
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps({"prompts": prompts}).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())["responses"]
+
+
+def load_backend(spec: str, url: Optional[str] = None, timeout: float = 5.0) -> Optional[InferenceBackend]:
+    """
+    Build the backend named by a setting
+
+    Args:
+        spec: "rules" (no model), "http", or "package.module:ClassName"
+            for a backend class built without arguments
+        url: Server of the "http" backend
+        timeout: Request timeout of the "http" backend
+
+    Returns:
+        The backend, or None for "rules"
+    """
+    if not spec or spec == "rules":
+        return None
+    if spec == "http":
+        if not url:
+            raise ValueError("The http inference backend needs INFERENCE_URL")
+        return HTTPInferenceBackend(url, timeout)
+    module_name, _, class_name = spec.partition(":")
+    if not class_name:
+        raise ValueError(f"Unknown inference backend: {spec}")
+    backend = getattr(importlib.import_module(module_name), class_name)()
+    if not isinstance(backend, InferenceBackend):
+        raise TypeError(f"{spec} is not an InferenceBackend")
+    return backend
+
+
+class MicroBatchScheduler:
+    """
+    Groups concurrent prompts into batches for a backend.
+
+    The first waiting prompt opens a batch; it is sent when `max_batch`
+    prompts have joined or `max_wait` seconds have passed, whichever
+    comes first. Results are handed back to each caller. A caller that
+    gets no answer within `timeout` seconds gets InferenceUnavailable,
+    and its prompt is dropped if its batch has not started yet.
+    """
+
+    def __init__(self, backend: InferenceBackend, max_batch: int = 8,
+                 max_wait: float = 0.01, timeout: float = 2.0):
+        self.backend = backend
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self.batches = 0
+        self.prompts = 0
+        self.largest_batch = 0
+        self.streams = 0
+        self.timeouts = 0
+        self.errors = 0
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop = None
+
+    async def generate(self, prompt: str) -> str:
+        """
+        Answer one prompt as part of a batch
+
+        Raises:
+            InferenceUnavailable: The backend failed or timed out
+        """
+        self._ensure_running()
+        future = self._loop.create_future()
+        self._queue.put_nowait((prompt, future))
+        try:
+            return await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise InferenceUnavailable(f"No answer within {self.timeout}s")
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Relay the backend's streamed response to one prompt
+
+        Streams are not batched. Each piece runs on the backend thread
+        and must arrive within `timeout` seconds of the previous one.
+
+        Raises:
+            InferenceUnavailable: The backend failed or timed out
+        """
+        loop = asyncio.get_running_loop()
+        self.streams += 1
+        pieces = None
+        while True:
+            try:
+                if pieces is None:
+                    call = loop.run_in_executor(self._pool, lambda: iter(self.backend.stream(prompt)))
+                    pieces = await asyncio.wait_for(call, self.timeout)
+                    continue
+                call = loop.run_in_executor(self._pool, next, pieces, _END)
+                piece = await asyncio.wait_for(call, self.timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise InferenceUnavailable(f"No answer within {self.timeout}s")
+            except Exception as e:
+                self.errors += 1
+                raise InferenceUnavailable(str(e))
+            if piece is _END:
+                return
+            yield piece
+
+    def _ensure_running(self):
+        # The batching task belongs to the loop serving requests
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run(self._queue))
+
+    async def _run(self, queue: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            # Callers that already gave up cancelled their future
+            batch = [(prompt, future) for prompt, future in batch if not future.done()]
+            if not batch:
+                continue
+            self.batches += 1
+            self.prompts += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            try:
+                results = await loop.run_in_executor(
+                    self._pool, self.backend.generate_batch, [prompt for prompt, _ in batch]
+                )
+                if len(results) != len(batch):
+                    raise ValueError(f"{len(results)} responses for {len(batch)} prompts")
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Inference batch failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(InferenceUnavailable(str(e)))
+            else:
+                for (_, future), result in zip(batch, results):
+                    if not future.done():
+                        future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        """Batching settings and counts"""
+        return {
+            "backend": self.backend.name,
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": self.batches,
+            "streams": self.streams,
+            "prompts": self.prompts,
+            "average_batch": round(self.prompts / self.batches, 2) if self.batches else 0,
+            "largest_batch": self.largest_batch,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+        }
+
+    def close(self):
+        """Stop batching and release the backend"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self.backend.close()
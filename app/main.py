@@ -1,18 +1,49 @@
-from fastapi import FastAPI, HTTPException, Query, Request
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import APIRouter, FastAPI, HTTPException, Query, Request
+from fastapi.dependencies.utils import request_params_to_args
+from fastapi.routing import APIRoute
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-import csv
+from fastapi.concurrency import run_in_threadpool
+import asyncio
 import os
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Callable, Iterable, Iterator, Tuple
+from itertools import islice
 from datetime import datetime
 import logging
 import json
 import time
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 # Import AI Service
 from app.ai_service import create_ai_service
+from app.ai_executor import AIExecutor, ExecutorBusy
+from app.feedback import shutdown_pool as shutdown_feedback_pool
+from app.inference import MicroBatchScheduler, load_backend
+from app.conversation_store import ConversationStore
+
+# Import Product Store
+from app.product_store import ProductStore
+
+# Import Search Indexes
+from app.search_index import Autocomplete, TokenIndex, TrigramIndex, SUGGEST_TOP_K, merge_rows
+
+# Import Dataset Snapshots
+from app.dataset import Dataset, DatasetSnapshot, INDEXED_FIELDS, SEARCH_FIELDS
+from app.sync import ChangeLog
+from app.export import MEDIA_TYPES, iter_export
+from app.static_assets import StaticAsset
+from app.fast_json import FastJSONResponse, RowShape, encode_object
+from app.response_cache import (
+    ResponseCache, accepts_gzip, etag_matches, gzip_etag, not_modified_since,
+)
+
+from app.config import (
+    DATA_RELOAD_INTERVAL, DATA_SNAPSHOT_PATH, STATIC_RELOAD_INTERVAL, CHAT_HISTORY_MAX_MESSAGES,
+    CHAT_MAX_SESSIONS, CHAT_SESSION_TTL, CHAT_HISTORY_MAX_BYTES, SENTIMENT_PROCESSES,
+    AI_EXECUTOR_MODE, AI_EXECUTOR_WORKERS, AI_MAX_CONCURRENCY, AI_MAX_QUEUE,
+    INFERENCE_BACKEND, INFERENCE_URL, INFERENCE_MAX_BATCH, INFERENCE_MAX_WAIT_MS, INFERENCE_TIMEOUT,
+)
 
 # Import Monitoring
 from app.monitoring import initialize_monitoring, RequestLogger, PrometheusMetrics
@@ -24,9 +55,69 @@ PrometheusMetrics.initialize()
 app = FastAPI(
     title="ConsumeSafe",
     description="Check if products are boycotted and find Tunisian alternatives",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse
 )
 
+def catalog_unchanged(request: Request, snapshot: DatasetSnapshot) -> bool:
+    """Whether a request's validators still match the catalog snapshot"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, snapshot.etag)
+    return not_modified_since(request.headers.get("if-modified-since"), snapshot.last_modified)
+
+def catalog_headers(snapshot: DatasetSnapshot) -> Dict[str, str]:
+    """Validators of a catalog response"""
+    return {
+        "ETag": snapshot.etag,
+        "Last-Modified": snapshot.last_modified,
+        "Cache-Control": "no-cache",
+    }
+
+class CatalogRoute(APIRoute):
+    """
+    Route of a catalog endpoint: answers 304 as soon as its query is
+    accepted, before the endpoint filters or serializes anything.
+
+    The query is validated first so a request the endpoint would reject
+    (bad value, missing parameter) still gets its error, not a 304.
+    """
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        query_params = self.dependant.query_params
+
+        async def route_handler(request: Request) -> Response:
+            if request.method in ("GET", "HEAD"):
+                _, errors = request_params_to_args(query_params, request.query_params)
+                snapshot = boycott_data.snapshot
+                if not errors and catalog_unchanged(request, snapshot):
+                    return Response(status_code=304, headers=catalog_headers(snapshot))
+            return await handler(request)
+
+        return route_handler
+
+# Endpoints whose answers depend only on the catalog and the query
+catalog = APIRouter(route_class=CatalogRoute, default_response_class=FastJSONResponse)
+
+# Registered first, so it runs innermost: 304s are still logged and get CORS headers
+@app.middleware("http")
+async def conditional_get(request: Request, call_next):
+    """Add the dataset's validators to successful catalog responses"""
+    if request.method not in ("GET", "HEAD") or request.url.path not in CATALOG_PATHS:
+        return await call_next(request)
+    
+    snapshot = boycott_data.snapshot
+    response = await call_next(request)
+    if response.status_code != 200:
+        return response
+    
+    headers = catalog_headers(snapshot)
+    if response.headers.get("content-encoding") == "gzip":
+        headers["ETag"] = gzip_etag(snapshot.etag)
+    response.headers.update(headers)
+    return response
+
 # Add middleware for request tracking
 @app.middleware("http")
 async def track_requests(request: Request, call_next):
@@ -101,90 +192,243 @@ app.add_middleware(
 # Load dataset
 DATA_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'boycott_products.csv')
 HTML_PATH = os.path.join(os.path.dirname(__file__), 'index.html')
+index_page = StaticAsset(HTML_PATH, "text/html; charset=utf-8")
+
+# Batch checks: most names per request, and batch size above which the
+# response is streamed instead of built in memory
+MAX_BATCH_ITEMS = 5000
+BATCH_STREAM_THRESHOLD = 200
+
+# Longest text accepted by the receipt scanner
+MAX_SCAN_CHARS = 100_000
+
+# Most feedback texts per sentiment batch
+MAX_FEEDBACK_BATCH = 50_000
+
+# Longest chat message accepted
+MAX_CHAT_CHARS = 2_000
+
+class BoycottData(Dataset):
+    """Boycott catalog served from the current dataset snapshot"""
 
-class BoycottData:
     def __init__(self):
-        self.products = []
+        super().__init__(DATA_PATH, DATA_SNAPSHOT_PATH)
         self.load_data()
     
+    @property
+    def products(self) -> ProductStore:
+        return self.snapshot.products
+    
+    @property
+    def indexes(self) -> Dict[str, TokenIndex]:
+        return self.snapshot.indexes
+    
+    @property
+    def trigram_index(self) -> TrigramIndex:
+        return self.snapshot.trigram_index
+    
+    @property
+    def autocomplete(self) -> Autocomplete:
+        return self.snapshot.autocomplete
+    
     def load_data(self):
-        """Load boycott products dataset from CSV"""
-        try:
-            with open(DATA_PATH, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                self.products = list(reader)
-            logger.info(f"Loaded {len(self.products)} boycott products")
-        except Exception as e:
-            logger.error(f"Error loading data: {e}")
-            self.products = []
-    
-    def search_products(self, query: str) -> List[Dict[str, Any]]:
-        """Search products by name or brand (case-insensitive)"""
-        query_lower = query.lower()
-        results = []
-        for product in self.products:
-            if (query_lower in product.get('boycott_product', '').lower() or
-                query_lower in product.get('brand', '').lower()):
-                results.append(product)
-        return results
+        """Load boycott products dataset from CSV into a columnar store"""
+        if not self.reload():
+            self.publish(DatasetSnapshot.empty())
+    
+    def search_products(self, query: str, fields: tuple = SEARCH_FIELDS,
+                        fuzzy: bool = False) -> List[Dict[str, Any]]:
+        """Search products by name or brand (fuzzy=True also matches typos)"""
+        snapshot = self.snapshot
+        if fuzzy:
+            rows = [row for row, _ in snapshot.trigram_index.fuzzy_search(query, fields)]
+        else:
+            rows = merge_rows(snapshot.indexes[field].search(query) for field in fields)
+        return [snapshot.products[row] for row in rows]
+    
+    def search_many(self, queries: Iterable[str],
+                    fields: tuple = SEARCH_FIELDS) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        """
+        Lazily search several queries against one snapshot
+
+        Queries differing only by case are looked up once. Blank queries
+        match nothing.
+        """
+        snapshot = self.snapshot
+        seen = {}
+        for query in queries:
+            key = query.lower()
+            matching = seen.get(key)
+            if matching is None:
+                if key.strip():
+                    rows = merge_rows(snapshot.indexes[field].search(query) for field in fields)
+                    matching = [snapshot.products[row] for row in rows]
+                else:
+                    matching = []
+                seen[key] = matching
+            yield query, matching
+    
+    def scan_text(self, text: str, whole_words: bool = True) -> List[Dict[str, Any]]:
+        """Find boycotted product names and brands in free text"""
+        snapshot = self.snapshot
+        matches = snapshot.scanner.scan(text, whole_words)
+        for match in matches:
+            match["products"] = [snapshot.products[row] for row in match.pop("rows")]
+        return matches
+    
+    def suggest(self, prefix: str, limit: int = SUGGEST_TOP_K) -> List[Dict[str, Any]]:
+        """Autocomplete product and brand names by popularity"""
+        snapshot = self.snapshot
+        return [
+            {"text": text, "type": kind, "product": snapshot.products[row]}
+            for text, kind, row in snapshot.autocomplete.suggest(prefix, limit)
+        ]
     
     def get_by_category(self, category: str) -> List[Dict[str, Any]]:
         """Get products by category"""
-        category_lower = category.lower()
-        return [p for p in self.products 
-                if p.get('category', '').lower() == category_lower]
+        return list(self.products.iter_where(category=category))
     
     def get_by_intensity(self, intensity: str) -> List[Dict[str, Any]]:
         """Get products by intensity"""
-        intensity_lower = intensity.lower()
-        return [p for p in self.products 
-                if p.get('intensity', '').lower() == intensity_lower]
+        return list(self.products.iter_where(intensity=intensity))
+    
+    def iter_products(self, category: Optional[str] = None,
+                      intensity: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Lazily iterate products matching optional category/intensity filters"""
+        return self.products.iter_where(category=category, intensity=intensity)
     
     def get_categories(self) -> List[str]:
         """Get unique categories"""
         categories = set()
-        for product in self.products:
-            cat = product.get('category', '').strip()
+        for cat in self.products.value_counts('category', ''):
+            cat = (cat or '').strip()
             if cat:
                 categories.add(cat)
         return sorted(list(categories))
     
     def get_stats(self) -> Dict[str, Any]:
         """Get statistics"""
-        intensity_count = {}
-        category_count = {}
-        
-        for product in self.products:
-            intensity = product.get('intensity', 'Unknown')
-            category = product.get('category', 'Unknown')
-            
-            intensity_count[intensity] = intensity_count.get(intensity, 0) + 1
-            category_count[category] = category_count.get(category, 0) + 1
-        
+        products = self.products
+        categories = {(cat or '').strip() for cat in products.value_counts('category', '')}
         return {
-            'total_products': len(self.products),
-            'categories': len(self.get_categories()),
-            'by_intensity': intensity_count,
-            'by_category': category_count
+            'total_products': len(products),
+            'categories': len(categories - {''}),
+            'by_intensity': products.value_counts('intensity', 'Unknown'),
+            'by_category': products.value_counts('category', 'Unknown')
         }
 
 # Initialize data
 boycott_data = BoycottData()
 ai_service = None
+ai_executor = None
+
+# Encoded bodies of the read-only catalog endpoints, dropped on every reload
+response_cache = ResponseCache(lambda: boycott_data.snapshot.version)
+boycott_data.add_listener(response_cache.clear)
+
+# Rows changed by each reload, for clients syncing a copy of the catalog
+change_log = ChangeLog(boycott_data.snapshot)
+boycott_data.add_listener(change_log.record)
+
+def filter_value(value: Optional[str]) -> Optional[str]:
+    """
+    Listing filter as the value indexes compare it: lowercase, without
+    surrounding spaces, None when blank, so equivalent filters share a
+    response cache entry
+    """
+    return (value or '').strip().lower() or None
+
+def cached_json(request: Request, endpoint: str, params: Optional[Dict[str, Any]],
+                build: Callable[[], Any]) -> Response:
+    """Serve a read-only endpoint from the response cache, gzipped when accepted"""
+    entry = response_cache.get_or_build(ResponseCache.key(endpoint, params), build)
+    headers = {"Vary": "Accept-Encoding"}
+    if entry.gzip_body is not None and accepts_gzip(request.headers.get("accept-encoding")):
+        headers["Content-Encoding"] = "gzip"
+        return Response(entry.gzip_body, media_type="application/json", headers=headers)
+    return Response(entry.body, media_type="application/json", headers=headers)
+
+def reload_ai_service(snapshot):
+    """Keep the AI service on the same catalog as the API after a reload"""
+    if ai_service is not None:
+        ai_service.reload(snapshot.products, snapshot.indexes.get('boycott_product'))
+        # Listeners run on the watcher thread: build the chat indexes here, not in a request
+        ai_service.warm()
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize on startup"""
-    global boycott_data, ai_service
-    boycott_data = BoycottData()
-    ai_service = create_ai_service(boycott_data.products)
+    global ai_service, ai_executor
+    # The catalog was loaded at import time: don't parse it a second time
+    conversations = ConversationStore(
+        max_messages=CHAT_HISTORY_MAX_MESSAGES,
+        max_sessions=CHAT_MAX_SESSIONS,
+        ttl=CHAT_SESSION_TTL,
+        max_bytes=CHAT_HISTORY_MAX_BYTES,
+    )
+    backend = load_backend(INFERENCE_BACKEND, INFERENCE_URL, INFERENCE_TIMEOUT)
+    inference = None
+    if backend is not None:
+        inference = MicroBatchScheduler(
+            backend,
+            max_batch=INFERENCE_MAX_BATCH,
+            max_wait=INFERENCE_MAX_WAIT_MS / 1000,
+            timeout=INFERENCE_TIMEOUT,
+        )
+        logger.info(f"Chat inference backend: {backend.name}")
+    ai_service = create_ai_service(
+        boycott_data.products, conversations, boycott_data.indexes.get('boycott_product'), inference
+    )
+    boycott_data.add_listener(reload_ai_service)
+    # Compiling the chat matcher takes seconds on large catalogs: do it off the loop
+    asyncio.get_running_loop().run_in_executor(None, ai_service.warm)
+    ai_executor = AIExecutor(
+        ai_service,
+        mode=AI_EXECUTOR_MODE,
+        workers=AI_EXECUTOR_WORKERS,
+        max_concurrency=AI_MAX_CONCURRENCY or None,
+        max_queue=AI_MAX_QUEUE,
+        data_path=DATA_PATH,
+        compiled_path=DATA_SNAPSHOT_PATH,
+        reload_interval=DATA_RELOAD_INTERVAL,
+    )
+    if DATA_RELOAD_INTERVAL > 0:
+        boycott_data.watch(DATA_RELOAD_INTERVAL)
+    if STATIC_RELOAD_INTERVAL > 0:
+        index_page.watch(STATIC_RELOAD_INTERVAL)
     logger.info("ConsumeSafe API started successfully")
     logger.info("AI Service initialized")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background work on shutdown"""
+    boycott_data.stop_watching()
+    index_page.stop_watching()
+    if ai_executor is not None:
+        ai_executor.shutdown()
+    shutdown_feedback_pool()
+    if ai_service is not None and ai_service.inference is not None:
+        ai_service.inference.close()
+
 @app.get("/")
-async def root():
+async def root(request: Request):
     """Serve the main HTML page"""
-    return FileResponse(HTML_PATH, media_type="text/html")
+    page = index_page.current
+    if page is None:
+        raise HTTPException(status_code=404, detail="Page not found")
+    encoding, body = page.select(request.headers.get("accept-encoding"))
+    headers = {
+        "ETag": page.encoded_etag(encoding),
+        "Last-Modified": page.last_modified,
+        "Vary": "Accept-Encoding",
+        # Revalidated on every load: the page's URL does not change with its content
+        "Cache-Control": "no-cache",
+    }
+    if page.matches(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(body, media_type=index_page.media_type, headers=headers)
 
 @app.get("/metrics")
 async def metrics():
@@ -201,13 +445,66 @@ async def metrics():
 @app.get("/api/health")
 async def health_check():
     """Health check endpoint"""
-    return {
+    health = {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
         "products_loaded": len(boycott_data.products)
     }
+    if ai_service:
+        health["chat_sessions"] = ai_service.conversations.stats()
+    if ai_executor:
+        health["ai_executor"] = ai_executor.stats()
+    if ai_service and ai_service.inference is not None:
+        health["inference"] = ai_service.inference.stats()
+    health["response_cache"] = response_cache.stats()
+    health["catalog_version"] = change_log.version
+    health["index_page"] = index_page.stats()
+    return health
 
-@app.get("/api/check")
+# Output shapes of catalog listings, encoded once per row
+PRODUCTS_SHAPE = RowShape([
+    ("id", "id"),
+    ("Product Name", "boycott_product"),
+    ("Brand", "brand"),
+    ("Category", "category"),
+    ("Reason", "reason"),
+    ("Intensity", "intensity"),
+    ("Tunisian Alternative", "tunisian_alternative"),
+    ("Alternative Brand", "alternative_brand"),
+])
+SUMMARY_SHAPE = RowShape([
+    ("id", "id"),
+    ("product", "boycott_product"),
+    ("brand", "brand"),
+    ("category", "category"),
+    ("reason", "reason"),
+    ("intensity", "intensity"),
+    ("tunisian_alternative", "tunisian_alternative"),
+    ("alternative_brand", "alternative_brand"),
+])
+SEARCH_SHAPE = RowShape([
+    ("id", "id"),
+    ("product", "boycott_product"),
+    ("brand", "brand"),
+    ("category", "category"),
+    ("tunisian_alternative", "tunisian_alternative"),
+    ("alternative_brand", "alternative_brand"),
+])
+
+def product_summary(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Fields of a boycotted product returned by the check endpoints"""
+    return {
+        "id": row.get('id'),
+        "product": row.get('boycott_product'),
+        "brand": row.get('brand'),
+        "category": row.get('category'),
+        "reason": row.get('reason'),
+        "intensity": row.get('intensity'),
+        "tunisian_alternative": row.get('tunisian_alternative'),
+        "alternative_brand": row.get('alternative_brand')
+    }
+
+@catalog.get("/api/check")
 async def check_product(product_name: str = Query(..., min_length=1)):
     """Check if a product is on the boycott list"""
     if not boycott_data.products:
@@ -223,18 +520,7 @@ async def check_product(product_name: str = Query(..., min_length=1)):
             "recommendation": "You can purchase this product safely"
         }
     
-    results = []
-    for row in matching:
-        results.append({
-            "id": row.get('id'),
-            "product": row.get('boycott_product'),
-            "brand": row.get('brand'),
-            "category": row.get('category'),
-            "reason": row.get('reason'),
-            "intensity": row.get('intensity'),
-            "tunisian_alternative": row.get('tunisian_alternative'),
-            "alternative_brand": row.get('alternative_brand')
-        })
+    results = [product_summary(row) for row in matching]
     
     return {
         "status": "boycotted",
@@ -244,7 +530,74 @@ async def check_product(product_name: str = Query(..., min_length=1)):
         "solidarity": "Stand with Palestine 🇵🇸"
     }
 
-@app.get("/api/alternatives")
+class BatchCheckRequest(BaseModel):
+    products: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_ITEMS)
+
+def iter_batch_check(names: List[str]) -> Iterator[str]:
+    """Encode batch check results as JSON text, one item per chunk"""
+    boycotted = 0
+    yield '{"results":['
+    for position, (name, matching) in enumerate(boycott_data.search_many(names)):
+        if not name.strip():
+            item = {"product": name, "status": "invalid", "message": "Empty product name"}
+        elif matching:
+            boycotted += 1
+            item = {
+                "product": name,
+                "status": "boycotted",
+                "found_items": [product_summary(row) for row in matching]
+            }
+        else:
+            item = {"product": name, "status": "safe"}
+        yield ("," if position else "") + json.dumps(item, ensure_ascii=False, separators=(",", ":"))
+    yield f'],"total":{len(names)},"boycotted":{boycotted},"safe":{len(names) - boycotted}}}'
+
+@app.post("/api/check/batch")
+async def check_products_batch(batch: BatchCheckRequest):
+    """Check a whole cart or receipt of product names in one request"""
+    if not boycott_data.products:
+        raise HTTPException(status_code=500, detail="Data not loaded")
+    
+    body = iter_batch_check(batch.products)
+    if len(batch.products) > BATCH_STREAM_THRESHOLD:
+        return StreamingResponse(body, media_type="application/json")
+    return Response("".join(body), media_type="application/json")
+
+class ScanRequest(BaseModel):
+    text: str = Field(..., min_length=1, max_length=MAX_SCAN_CHARS)
+    whole_words: bool = True
+
+@app.post("/api/scan")
+async def scan_text(scan: ScanRequest):
+    """Flag every boycotted product or brand mentioned in a receipt or free text"""
+    if not boycott_data.products:
+        raise HTTPException(status_code=500, detail="Data not loaded")
+    
+    matches = boycott_data.scan_text(scan.text, scan.whole_words)
+    results = []
+    found_ids = set()
+    for match in matches:
+        products = [product_summary(row) for row in match["products"]]
+        found_ids.update(product["id"] for product in products)
+        results.append({
+            "start": match["start"],
+            "end": match["end"],
+            "text": match["text"],
+            "kind": match["kind"],
+            "matched": match["pattern"],
+            "products": products
+        })
+    
+    return {
+        "status": "boycotted" if results else "safe",
+        "matches": results,
+        "total_matches": len(results),
+        "total_products": len(found_ids),
+        "message": f"⚠️ Found {len(results)} boycotted mention(s)" if results
+                   else "No boycotted product found in this text"
+    }
+
+@catalog.get("/api/alternatives")
 async def get_alternatives(product_name: str = Query(..., min_length=1)):
     """Get Tunisian alternatives for boycotted products"""
     if not boycott_data.products:
@@ -277,8 +630,9 @@ async def get_alternatives(product_name: str = Query(..., min_length=1)):
         "total_alternatives": len(alternatives)
     }
 
-@app.get("/api/products")
+@catalog.get("/api/products")
 async def get_products(
+    request: Request,
     category: Optional[str] = None,
     intensity: Optional[str] = None,
     limit: int = Query(50, ge=1, le=500)
@@ -287,33 +641,18 @@ async def get_products(
     if not boycott_data.products:
         raise HTTPException(status_code=500, detail="Data not loaded")
     
-    results = boycott_data.products.copy()
-    
-    if category:
-        results = boycott_data.get_by_category(category)
-    
-    if intensity:
-        results = [p for p in results if p.get('intensity', '').lower() == intensity.lower()]
-    
-    results = results[:limit]
-    
-    products = []
-    for row in results:
-        products.append({
-            "id": row.get('id'),
-            "Product Name": row.get('boycott_product'),
-            "Brand": row.get('brand'),
-            "Category": row.get('category'),
-            "Reason": row.get('reason'),
-            "Intensity": row.get('intensity'),
-            "Tunisian Alternative": row.get('tunisian_alternative'),
-            "Alternative Brand": row.get('alternative_brand')
-        })
-    
-    return products
+    category, intensity = filter_value(category), filter_value(intensity)
+    params = {"category": category, "intensity": intensity, "limit": limit}
+    return cached_json(request, "products", params, lambda: build_products(category, intensity, limit))
 
-@app.get("/api/boycotts")
+def build_products(category: Optional[str], intensity: Optional[str], limit: int) -> bytes:
+    """Body of /api/products"""
+    results = islice(boycott_data.iter_products(category, intensity), limit)
+    return PRODUCTS_SHAPE.encode_rows(results).data
+
+@catalog.get("/api/boycotts")
 async def list_all_boycotts(
+    request: Request,
     category: Optional[str] = None,
     intensity: Optional[str] = None,
     limit: int = Query(50, ge=1, le=500)
@@ -322,109 +661,155 @@ async def list_all_boycotts(
     if not boycott_data.products:
         raise HTTPException(status_code=500, detail="Data not loaded")
     
-    results = boycott_data.products.copy()
-    
-    if category:
-        results = boycott_data.get_by_category(category)
-    
-    if intensity:
-        results = [p for p in results if p.get('intensity', '').lower() == intensity.lower()]
-    
-    results = results[:limit]
-    
-    products = []
-    for row in results:
-        products.append({
-            "id": row.get('id'),
-            "product": row.get('boycott_product'),
-            "brand": row.get('brand'),
-            "category": row.get('category'),
-            "reason": row.get('reason'),
-            "intensity": row.get('intensity'),
-            "tunisian_alternative": row.get('tunisian_alternative'),
-            "alternative_brand": row.get('alternative_brand')
-        })
+    category, intensity = filter_value(category), filter_value(intensity)
+    params = {"category": category, "intensity": intensity, "limit": limit}
+    return cached_json(request, "boycotts", params, lambda: build_boycotts(category, intensity, limit))
+
+def build_boycotts(category: Optional[str], intensity: Optional[str], limit: int) -> bytes:
+    """Body of /api/boycotts"""
+    results = list(islice(boycott_data.iter_products(category, intensity), limit))
     
-    return {
+    return encode_object({
         "status": "success",
-        "total": len(products),
-        "products": products,
+        "total": len(results),
+        "products": SUMMARY_SHAPE.encode_rows(results),
         "message": "Every purchase is a vote. Choose Palestine! 🇵🇸"
-    }
+    })
 
-@app.get("/api/categories")
-async def get_categories():
+@catalog.get("/api/categories")
+async def get_categories(request: Request):
     """Get all product categories"""
     if not boycott_data.products:
         raise HTTPException(status_code=500, detail="Data not loaded")
     
+    return cached_json(request, "categories", None, build_categories)
+
+def build_categories() -> Dict[str, Any]:
+    """Body of /api/categories"""
     categories = boycott_data.get_categories()
     return {
         "categories": categories,
         "count": len(categories)
     }
 
-@app.get("/api/stats")
-async def get_statistics():
+@catalog.get("/api/stats")
+async def get_statistics(request: Request):
     """Get statistics about boycotted products"""
     if not boycott_data.products:
         raise HTTPException(status_code=500, detail="Data not loaded")
     
+    return cached_json(request, "stats", None, build_statistics)
+
+def build_statistics() -> Dict[str, Any]:
+    """Body of /api/stats"""
     stats = boycott_data.get_stats()
     stats["message"] = "Knowledge is power. Share this information! 🇵🇸"
     return stats
 
-@app.get("/api/download/boycott_list.csv")
+def export_response(export_format: str, category: Optional[str] = None,
+                    intensity: Optional[str] = None) -> StreamingResponse:
+    """Stream the catalog being served, filtered, without building it in memory"""
+    # The whole export reads one snapshot, even if a reload happens meanwhile
+    products = boycott_data.snapshot.products
+    rows = products.iter_where(category=category, intensity=intensity)
+    return StreamingResponse(
+        iter_export(rows, products.fieldnames, export_format),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f"attachment; filename=boycott_products.{export_format}"}
+    )
+
+@catalog.get("/api/download/boycott_list.csv")
 async def download_boycott_list():
     """Download complete boycott list as CSV"""
     if not boycott_data.products:
         raise HTTPException(status_code=500, detail="Data not loaded")
     
-    try:
-        return FileResponse(
-            DATA_PATH,
-            media_type="text/csv",
-            headers={"Content-Disposition": "attachment; filename=boycott_products.csv"}
-        )
-    except Exception as e:
-        logger.error(f"Download error: {e}")
-        raise HTTPException(status_code=500, detail="Error generating download")
+    return export_response("csv")
 
-@app.get("/api/search")
-async def search_product(q: str = Query(..., min_length=1)):
-    """Search products by name or brand"""
+@catalog.get("/api/export")
+async def export_catalog(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    category: Optional[str] = None,
+    intensity: Optional[str] = None
+):
+    """Export the boycott list as CSV or NDJSON, optionally filtered"""
     if not boycott_data.products:
         raise HTTPException(status_code=500, detail="Data not loaded")
     
-    q_lower = q.lower()
-    results = []
-    for product in boycott_data.products:
-        if (q_lower in product.get('boycott_product', '').lower() or
-            q_lower in product.get('brand', '').lower() or
-            q_lower in product.get('tunisian_alternative', '').lower()):
-            results.append(product)
+    return export_response(format, category, intensity)
+
+@catalog.get("/api/sync")
+async def sync_catalog(
+    request: Request,
+    since: Optional[str] = Query(None, min_length=1, max_length=64)
+):
+    """Rows added, modified and removed since a catalog version, or the full catalog"""
+    if not boycott_data.products:
+        raise HTTPException(status_code=500, detail="Data not loaded")
+    
+    # Every unusable version gets the same full resync: one cache entry,
+    # not one per made-up value. The key also names the change log's
+    # version, so a body built from it just before a reload is not
+    # served for the new catalog.
+    usable = since if change_log.knows(since) else None
+    params = {"since": usable, "log": change_log.version}
+    # The first request indexes the catalog: off the event loop
+    return await run_in_threadpool(
+        cached_json, request, "sync", params, lambda: change_log.sync(usable)
+    )
+
+@catalog.get("/api/search")
+async def search_product(q: str = Query(..., min_length=1), fuzzy: bool = False):
+    """Search products by name or brand (fuzzy=true tolerates typos)"""
+    if not boycott_data.products:
+        raise HTTPException(status_code=500, detail="Data not loaded")
+    
+    results = boycott_data.search_products(q, fields=INDEXED_FIELDS, fuzzy=fuzzy)
     
     if not results:
         return {"status": "no_results", "message": f"No results for '{q}'"}
     
-    products = []
-    for row in results:
-        products.append({
+    return FastJSONResponse(encode_object({
+        "status": "success",
+        "query": q,
+        "results_count": len(results),
+        "results": SEARCH_SHAPE.encode_rows(results)
+    }))
+
+@catalog.get("/api/suggest")
+async def suggest_products(
+    prefix: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(SUGGEST_TOP_K, ge=1, le=SUGGEST_TOP_K)
+):
+    """Autocomplete product and brand names as the user types"""
+    if not boycott_data.products:
+        raise HTTPException(status_code=500, detail="Data not loaded")
+    
+    suggestions = []
+    for suggestion in boycott_data.suggest(prefix, limit):
+        row = suggestion["product"]
+        suggestions.append({
+            "text": suggestion["text"],
+            "type": suggestion["type"],
             "id": row.get('id'),
             "product": row.get('boycott_product'),
             "brand": row.get('brand'),
             "category": row.get('category'),
+            "reason": row.get('reason'),
+            "intensity": row.get('intensity'),
             "tunisian_alternative": row.get('tunisian_alternative'),
             "alternative_brand": row.get('alternative_brand')
         })
     
     return {
-        "status": "success",
-        "query": q,
-        "results_count": len(products),
-        "results": products
+        "prefix": prefix,
+        "count": len(suggestions),
+        "suggestions": suggestions
     }
 
+app.include_router(catalog)
+CATALOG_PATHS = frozenset(route.path for route in catalog.routes)
+
 @app.post("/api/feedback")
 async def submit_feedback(feedback: dict):
     """Submit feedback about products"""
@@ -460,43 +845,124 @@ async def get_message():
 # ============ AI ENDPOINTS ============
 
 class ChatMessage(BaseModel):
-    message: str
+    message: str = Field(..., max_length=MAX_CHAT_CHARS)
+    session_id: Optional[str] = Field(None, min_length=1, max_length=128)
 
 class FeedbackAnalysis(BaseModel):
     feedback: str
 
+class FeedbackBatch(BaseModel):
+    feedback: List[str] = Field(..., min_length=1, max_length=MAX_FEEDBACK_BATCH)
+
+async def run_ai(method: str, *args):
+    """Run an AIService method on the AI executor, off the event loop"""
+    try:
+        return await ai_executor.run(method, *args)
+    except ExecutorBusy:
+        raise HTTPException(status_code=503, detail="AI service busy, please retry")
+
+def remember_chat(chat_msg: ChatMessage, response: str):
+    """Add an exchange to its session and publish the conversation store size"""
+    ai_service.remember(chat_msg.session_id, chat_msg.message, response)
+    if chat_msg.session_id and PrometheusMetrics.CHAT_SESSIONS:
+        stats = ai_service.conversations.stats()
+        PrometheusMetrics.CHAT_SESSIONS.set(stats["sessions"])
+        PrometheusMetrics.CHAT_HISTORY_BYTES.set(stats["bytes"])
+
+def sse_event(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    """One Server-Sent Event carrying a JSON payload"""
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    return (f"event: {event}\n" if event else "") + f"data: {payload}\n\n"
+
 @app.post("/api/ai/chat")
 async def chat_with_ai(chat_msg: ChatMessage):
     """Chat with AI about boycott products"""
-    if not ai_service:
+    if not ai_service or not ai_executor:
         raise HTTPException(status_code=500, detail="AI Service not initialized")
     
     try:
-        response = ai_service.chat(chat_msg.message)
+        response = await ai_service.respond_async(
+            chat_msg.message, fallback=lambda message: run_ai("respond", message)
+        )
+        remember_chat(chat_msg, response)
         return {
             "status": "success",
             "user_message": chat_msg.message,
             "ai_response": response,
+            "session_id": chat_msg.session_id,
             "timestamp": datetime.now().isoformat()
         }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Chat error: {e}")
+        raise HTTPException(status_code=500, detail="Error processing chat request")
+
+@app.post("/api/ai/chat/stream")
+async def chat_with_ai_stream(chat_msg: ChatMessage):
+    """Chat with AI, receiving the answer piece by piece as Server-Sent Events"""
+    if not ai_service or not ai_executor:
+        raise HTTPException(status_code=500, detail="AI Service not initialized")
+    
+    pieces = ai_service.respond_stream_async(
+        chat_msg.message, fallback=lambda message: run_ai("respond", message)
+    )
+    # Wait for the first piece here, so a busy or failing service still
+    # gets a proper status code instead of an already-started stream
+    try:
+        first = await pieces.__anext__()
+    except StopAsyncIteration:
+        first = ""
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Chat error: {e}")
         raise HTTPException(status_code=500, detail="Error processing chat request")
+    
+    async def events():
+        response = [first]
+        if first:
+            yield sse_event({"delta": first})
+        try:
+            async for piece in pieces:
+                response.append(piece)
+                yield sse_event({"delta": piece})
+        except Exception as e:
+            logger.error(f"Chat stream error: {e}")
+            yield sse_event({"detail": "Error processing chat request"}, "error")
+            return
+        remember_chat(chat_msg, "".join(response))
+        yield sse_event({
+            "session_id": chat_msg.session_id,
+            "timestamp": datetime.now().isoformat()
+        }, "done")
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.post("/api/ai/recommend")
-async def get_recommendations(history: List[str] = Query(...)):
+async def get_recommendations(
+    history: List[str] = Query(...),
+    mode: str = Query("category", pattern="^(category|similarity)$")
+):
     """Get personalized product recommendations"""
-    if not ai_service:
+    if not ai_service or not ai_executor:
         raise HTTPException(status_code=500, detail="AI Service not initialized")
     
     try:
-        recommendations = ai_service.get_recommendations(history, limit=5)
+        recommendations = await run_ai("get_recommendations", history, 5, mode)
         return {
             "status": "success",
             "recommendations": recommendations,
             "total": len(recommendations),
+            "mode": mode,
             "message": "Personalized recommendations based on your search history"
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Recommendation error: {e}")
         raise HTTPException(status_code=500, detail="Error generating recommendations")
@@ -504,20 +970,51 @@ async def get_recommendations(history: List[str] = Query(...)):
 @app.post("/api/ai/analyze-sentiment")
 async def analyze_feedback_sentiment(feedback_analysis: FeedbackAnalysis):
     """Analyze sentiment of user feedback"""
-    if not ai_service:
+    if not ai_service or not ai_executor:
         raise HTTPException(status_code=500, detail="AI Service not initialized")
     
     try:
-        analysis = ai_service.analyze_sentiment(feedback_analysis.feedback)
+        analysis = await run_ai("analyze_sentiment", feedback_analysis.feedback)
         return {
             "status": "success",
             "analysis": analysis,
             "timestamp": datetime.now().isoformat()
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Sentiment analysis error: {e}")
         raise HTTPException(status_code=500, detail="Error analyzing sentiment")
 
+@app.post("/api/ai/analyze-sentiment/batch")
+async def analyze_feedback_sentiment_batch(batch: FeedbackBatch):
+    """Analyze the sentiment of many feedback texts"""
+    if not ai_service or not ai_executor:
+        raise HTTPException(status_code=500, detail="AI Service not initialized")
+    
+    try:
+        # Process workers are already parallel: no nested pool there
+        processes = SENTIMENT_PROCESSES if ai_executor.mode == "thread" else 0
+        results = await run_ai("analyze_sentiment_batch", batch.feedback, processes)
+        sentiments = {"positive": 0, "negative": 0, "neutral": 0}
+        categories = {}
+        for result in results:
+            sentiments[result["sentiment"]] += 1
+            categories[result["category"]] = categories.get(result["category"], 0) + 1
+        return {
+            "status": "success",
+            "results": results,
+            "total": len(results),
+            "by_sentiment": sentiments,
+            "by_category": categories,
+            "timestamp": datetime.now().isoformat()
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Batch sentiment analysis error: {e}")
+        raise HTTPException(status_code=500, detail="Error analyzing sentiment")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -1,7 +1,7 @@
-from fastapi import FastAPI, HTTPException, Query, Request, RateLimiter
+from fastapi import FastAPI, HTTPException, Path, Query, Request
 from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.middleware.gzip import GZIPMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 import csv
 import os
@@ -13,8 +13,13 @@ import html
 import re
 from functools import lru_cache
 import time
-from collections import defaultdict
-from threading import Lock
+
+from app.config import (
+    RATE_LIMIT_ENABLED, RATE_LIMIT_REQUESTS, RATE_LIMIT_STORE,
+    RATE_LIMIT_REDIS_URL, RATE_LIMIT_SHARED_PATH, RATE_LIMIT_SHARED_SLOTS,
+)
+from app.rate_limit import RateLimiter, create_store
+from app.export import iter_csv
 
 # ============================================================================
 # SECURITY & LOGGING CONFIGURATION
@@ -26,30 +31,16 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Security: Rate limiting
-class RateLimiter:
-    def __init__(self, max_requests: int = 100, time_window: int = 60):
-        self.max_requests = max_requests
-        self.time_window = time_window
-        self.requests = defaultdict(list)
-        self.lock = Lock()
-
-    def is_allowed(self, client_id: str) -> bool:
-        with self.lock:
-            now = time.time()
-            # Clean old requests
-            self.requests[client_id] = [
-                req_time for req_time in self.requests[client_id]
-                if now - req_time < self.time_window
-            ]
-            
-            if len(self.requests[client_id]) >= self.max_requests:
-                return False
-            
-            self.requests[client_id].append(now)
-            return True
+# Security: Rate limiting (shared by all workers unless RATE_LIMIT_STORE is "memory")
+# The v2 API has always limited per minute, not per RATE_LIMIT_PERIOD
+RATE_LIMIT_WINDOW = 60
 
-rate_limiter = RateLimiter(max_requests=100, time_window=60)
+rate_limiter = RateLimiter(
+    max_requests=RATE_LIMIT_REQUESTS,
+    time_window=RATE_LIMIT_WINDOW,
+    store=create_store(RATE_LIMIT_STORE, RATE_LIMIT_REDIS_URL,
+                       RATE_LIMIT_SHARED_PATH, RATE_LIMIT_SHARED_SLOTS),
+) if RATE_LIMIT_ENABLED else None
 
 # ============================================================================
 # FASTAPI APP SETUP
@@ -71,11 +62,12 @@ app = FastAPI(
 # 1. Trusted Host Middleware (prevent host header attacks)
 app.add_middleware(
     TrustedHostMiddleware,
-    allowed_hosts=["127.0.0.1", "localhost", "127.0.0.1:*", "*.local"]
+    # Hosts are matched without their port
+    allowed_hosts=["127.0.0.1", "localhost", "*.local"]
 )
 
 # 2. GZIP Compression Middleware (performance optimization)
-app.add_middleware(GZIPMiddleware, minimum_size=1000)
+app.add_middleware(GZipMiddleware, minimum_size=1000)
 
 # 3. CORS Middleware (secure origin policy)
 app.add_middleware(
@@ -94,11 +86,13 @@ async def add_security_headers(request: Request, call_next):
     client_ip = request.client.host if request.client else "unknown"
     
     # Rate limiting check
-    if not rate_limiter.is_allowed(client_ip):
+    limit = rate_limiter.hit(client_ip) if rate_limiter else None
+    if limit and not limit.allowed:
         logger.warning(f"Rate limit exceeded for IP: {client_ip}")
         return JSONResponse(
             status_code=429,
-            content={"detail": "Too many requests. Please try again later."}
+            content={"detail": "Too many requests. Please try again later."},
+            headers=RateLimiter.headers(limit)
         )
     
     # Log requests
@@ -115,6 +109,8 @@ async def add_security_headers(request: Request, call_next):
     response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
     response.headers["Permissions-Policy"] = "geolocation=(), microphone=(), camera=()"
     response.headers["Cache-Control"] = "public, max-age=3600"
+    if limit:
+        response.headers.update(RateLimiter.headers(limit))
     
     return response
 
@@ -391,7 +387,7 @@ async def get_categories():
 
 # Get by category endpoint
 @app.get("/api/category/{category}")
-async def get_by_category(category: str = Query(..., min_length=1, max_length=50)):
+async def get_by_category(category: str = Path(..., min_length=1, max_length=50)):
     """Get products by category"""
     try:
         category = sanitize_input(category)
@@ -434,6 +430,9 @@ async def get_stats():
     return boycott_data.get_stats()
 
 # Download endpoint (CSV format)
+CSV_FIELDNAMES = ["id", "boycott_product", "brand", "category", "reason",
+                  "tunisian_alternative", "alternative_brand", "intensity"]
+
 @app.get("/api/download")
 async def download_csv():
     """Download boycott list as CSV"""
@@ -441,14 +440,9 @@ async def download_csv():
         raise HTTPException(status_code=503, detail="Dataset not available")
     
     try:
-        # Create CSV content
-        csv_content = "id,boycott_product,brand,category,reason,tunisian_alternative,alternative_brand,intensity\n"
-        
-        for product in boycott_data.products:
-            csv_content += f"{product.get('id', '')},{product.get('boycott_product', '')},{product.get('brand', '')},{product.get('category', '')},{product.get('reason', '')},{product.get('tunisian_alternative', '')},{product.get('alternative_brand', '')},{product.get('intensity', '')}\n"
-        
+        # Encoded and sent a chunk at a time, with fields quoted where needed
         return StreamingResponse(
-            iter([csv_content.encode('utf-8')]),
+            iter_csv(boycott_data.products, CSV_FIELDNAMES),
             media_type="text/csv",
             headers={"Content-Disposition": "attachment; filename=boycott_products.csv"}
         )
@@ -123,6 +123,11 @@ class PrometheusMetrics:
     CHAT_DURATION = None
     RECOMMENDATION_COUNT = None
     SENTIMENT_ANALYSIS_COUNT = None
+    CHAT_SESSIONS = None
+    CHAT_HISTORY_BYTES = None
+    AI_QUEUE_DEPTH = None
+    AI_RUNNING = None
+    AI_REJECTED = None
     
     # Error metrics
     ERROR_COUNT = None
@@ -196,6 +201,26 @@ class PrometheusMetrics:
                 'consumesafe_ai_sentiment_total',
                 'Total sentiment analyses'
             )
+            cls.CHAT_SESSIONS = Gauge(
+                'consumesafe_ai_chat_sessions',
+                'Chat sessions with stored history'
+            )
+            cls.CHAT_HISTORY_BYTES = Gauge(
+                'consumesafe_ai_chat_history_bytes',
+                'Approximate memory held by chat histories'
+            )
+            cls.AI_QUEUE_DEPTH = Gauge(
+                'consumesafe_ai_queue_depth',
+                'AI calls waiting for an executor slot'
+            )
+            cls.AI_RUNNING = Gauge(
+                'consumesafe_ai_running',
+                'AI calls running in the executor'
+            )
+            cls.AI_REJECTED = Counter(
+                'consumesafe_ai_rejected_total',
+                'AI calls refused because the queue was full'
+            )
             
             # Error metrics
             cls.ERROR_COUNT = Counter(
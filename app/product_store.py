@@ -0,0 +1,299 @@
+"""
+Product Store - Compact column-oriented storage for the boycott catalog
+"""
+import csv
+import heapq
+from array import array
+from collections import Counter
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+# Columns with few distinct values: stored once, referenced by small codes
+CATEGORICAL_COLUMNS = ('category', 'intensity', 'alternative_brand', 'reason')
+
+# Column holding the product id, stored as integers when possible
+ID_COLUMN = 'id'
+
+
+def _code_array(size: int) -> array:
+    """Smallest unsigned array type able to hold `size` codes"""
+    if size <= 0xFF:
+        return array('B')
+    if size <= 0xFFFF:
+        return array('H')
+    return array('I')
+
+
+class CodedColumn:
+    """Categorical column: distinct values plus one small code per row"""
+
+    __slots__ = ('values', 'codes', 'lookup')
+
+    def __init__(self):
+        self.values = []
+        self.codes = array('B')
+        self.lookup = {}
+
+    def append(self, value: Optional[str]):
+        code = self.lookup.get(value)
+        if code is None:
+            code = len(self.values)
+            self.lookup[value] = code
+            self.values.append(value)
+            if code == 0x100 or code == 0x10000:
+                # Widen the code array once the value table outgrows it
+                widened = _code_array(code + 1)
+                widened.fromlist(self.codes.tolist())
+                self.codes = widened
+        self.codes.append(code)
+
+    def __getitem__(self, row: int) -> Optional[str]:
+        return self.values[self.codes[row]]
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+
+class IntColumn:
+    """Integer-valued text column (such as ids) kept as a packed array"""
+
+    __slots__ = ('numbers',)
+
+    def __init__(self, numbers: array):
+        self.numbers = numbers
+
+    def __getitem__(self, row: int) -> str:
+        return str(self.numbers[row])
+
+    def __len__(self) -> int:
+        return len(self.numbers)
+
+
+def _pack_ints(values: List[Optional[str]]):
+    """Pack canonical decimal strings into an array, or None if any is not"""
+    numbers = array('q')
+    for value in values:
+        # ASCII only: isdigit() also accepts digits like '²' or '٣' that int() rejects or rewrites
+        if (not value or not value.isascii() or not value.isdigit() or len(value) > 18
+                or (value[0] == '0' and value != '0')):
+            return None
+        numbers.append(int(value))
+    return IntColumn(numbers)
+
+
+class ValueIndex:
+    """
+    Sorted row-id list per distinct value of a column, matched
+    case-insensitively like the ``value.lower() == wanted.lower()`` scans
+    it replaces.
+    """
+
+    def __init__(self, column: Sequence[Any]):
+        self.column = column
+        coded = isinstance(column, CodedColumn)
+        by_value = {}
+        values = column.codes if coded else (column[row] for row in range(len(column)))
+        for row, value in enumerate(values):
+            rows = by_value.get(value)
+            if rows is None:
+                rows = by_value[value] = array('I')
+            rows.append(row)
+
+        # Group values that only differ by case under one lowercase key
+        self.postings = {}
+        self.codes = {}
+        for value, rows in by_value.items():
+            text = column.values[value] if coded else value
+            key = (text or '').lower()
+            if key in self.postings:
+                self.postings[key] = array('I', heapq.merge(self.postings[key], rows))
+            else:
+                self.postings[key] = rows
+            if coded:
+                self.codes.setdefault(key, set()).add(value)
+
+    def rows(self, value: str) -> Sequence[int]:
+        """Ascending row ids whose value equals `value` (any case)"""
+        return self.postings.get(value.lower(), ())
+
+    def matcher(self, value: str):
+        """Predicate telling whether a row has the given value (any case)"""
+        key = value.lower()
+        if isinstance(self.column, CodedColumn):
+            codes = self.column.codes
+            wanted = self.codes.get(key, set())
+            return lambda row: codes[row] in wanted
+        column = self.column
+        return lambda row: (column[row] or '').lower() == key
+
+
+class Product(Mapping):
+    """
+    Read-only view of one catalog row.
+
+    Behaves like the dict rows csv.DictReader used to produce
+    (``product.get('brand')``, ``product['id']``, ``dict(product)``) but
+    holds only a reference to the store and a row number.
+    """
+
+    __slots__ = ('_store', '_row')
+
+    def __init__(self, store: 'ProductStore', row: int):
+        self._store = store
+        self._row = row
+
+    @property
+    def row(self) -> int:
+        """Position of the product in the catalog"""
+        return self._row
+
+    @property
+    def store(self) -> 'ProductStore':
+        """Catalog the product belongs to"""
+        return self._store
+
+    def get(self, key: str, default: Any = None) -> Any:
+        column = self._store.columns.get(key)
+        if column is None:
+            return default
+        return column[self._row]
+
+    def __getitem__(self, key: str) -> Any:
+        return self._store.columns[key][self._row]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._store.fieldnames)
+
+    def __len__(self) -> int:
+        return len(self._store.fieldnames)
+
+    def copy(self) -> Dict[str, Any]:
+        """Plain dict copy of the row"""
+        return dict(self.items())
+
+    def __repr__(self) -> str:
+        return f"Product({self.copy()!r})"
+
+
+class ProductStore:
+    """
+    Column-oriented boycott catalog.
+
+    Each column is a list of strings, a CodedColumn for categorical
+    fields, or an IntColumn for numeric ids. Indexing the store returns
+    Product views, so code written against a list of DictReader rows
+    keeps working.
+    """
+
+    def __init__(self, fieldnames: Sequence[str], columns: Dict[str, Sequence[Any]], size: int):
+        self.fieldnames = list(fieldnames)
+        self.columns = columns
+        self.size = size
+        self.value_indexes = {}
+        # Per-row encodings, by the shape that produced them (see fast_json)
+        self.row_fragments = {}
+
+    @classmethod
+    def from_rows(cls, fieldnames: Sequence[str], rows: Iterable[Sequence[Any]]) -> 'ProductStore':
+        """Build a store from rows given as value lists in fieldnames order"""
+        builders = [
+            CodedColumn() if name in CATEGORICAL_COLUMNS else []
+            for name in fieldnames
+        ]
+        size = 0
+        width = len(builders)
+        for values in rows:
+            if len(values) < width:
+                values = list(values) + [None] * (width - len(values))
+            for builder, value in zip(builders, values):
+                builder.append(value)
+            size += 1
+
+        columns = dict(zip(fieldnames, builders))
+        if ID_COLUMN in columns and isinstance(columns[ID_COLUMN], list):
+            packed = _pack_ints(columns[ID_COLUMN])
+            if packed is not None:
+                columns[ID_COLUMN] = packed
+        return cls(fieldnames, columns, size)
+
+    @classmethod
+    def from_dicts(cls, products: Iterable[Mapping]) -> 'ProductStore':
+        """Build a store from dict rows"""
+        products = list(products)
+        fieldnames = []
+        for product in products:
+            for key in product:
+                if key not in fieldnames:
+                    fieldnames.append(key)
+        return cls.from_rows(fieldnames, ([p.get(name) for name in fieldnames] for p in products))
+
+    @classmethod
+    def from_csv(cls, path: str) -> 'ProductStore':
+        """Load a catalog CSV with a header row"""
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            fieldnames = next(reader, [])
+            # Blank lines are skipped, as csv.DictReader does
+            return cls.from_rows(fieldnames, (row for row in reader if row))
+
+    def column(self, name: str) -> Sequence[Any]:
+        """Row-indexable values of one column (None where missing)"""
+        column = self.columns.get(name)
+        if column is None:
+            return [None] * self.size
+        return column
+
+    def build_value_index(self, name: str) -> ValueIndex:
+        """Index the rows of a column by value"""
+        index = ValueIndex(self.column(name))
+        self.value_indexes[name] = index
+        return index
+
+    def iter_where(self, **criteria: Optional[str]) -> Iterator[Product]:
+        """
+        Lazily yield products matching every column=value criterion
+
+        Criteria set to None or '' are ignored. The shortest posting list
+        is walked in row order and each row is checked against the other
+        columns, so stopping early costs only what was consumed.
+        """
+        filters = []
+        for name, value in criteria.items():
+            if value:
+                index = self.value_indexes.get(name) or self.build_value_index(name)
+                filters.append((len(index.rows(value)), index, value))
+        if not filters:
+            yield from self
+            return
+
+        filters.sort(key=lambda f: f[0])
+        _, index, value = filters[0]
+        checks = [other.matcher(other_value) for _, other, other_value in filters[1:]]
+        for row in index.rows(value):
+            if all(check(row) for check in checks):
+                yield Product(self, row)
+
+    def value_counts(self, name: str, default: Any = None) -> Dict[Any, int]:
+        """Number of rows per distinct value of a column"""
+        column = self.columns.get(name)
+        if column is None:
+            return {default: self.size} if self.size else {}
+        if isinstance(column, CodedColumn):
+            return {column.values[code]: count for code, count in Counter(column.codes).items()}
+        return dict(Counter(column[row] for row in range(self.size)))
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [Product(self, row) for row in range(*key.indices(self.size))]
+        if key < 0:
+            key += self.size
+        if not 0 <= key < self.size:
+            raise IndexError("product index out of range")
+        return Product(self, key)
+
+    def __iter__(self) -> Iterator[Product]:
+        for row in range(self.size):
+            yield Product(self, row)
@@ -0,0 +1,393 @@
+"""
+Rate Limit - GCRA request limiter with pluggable shared state
+"""
+import hashlib
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no shared-memory store
+    fcntl = None
+
+STORE_KINDS = ("memory", "shared", "redis")
+
+# Keys an in-process store holds at most; the least recently seen go first
+MEMORY_MAX_KEYS = 100_000
+
+# Slots of a key probed in the shared table before reusing the stalest one
+SHARED_PROBES = 8
+_SLOT = struct.Struct("<Qd")  # key hash (0 for an empty slot), theoretical arrival time
+
+
+class RateLimitResult(NamedTuple):
+    """Outcome of one request against a limit"""
+    allowed: bool
+    limit: int
+    remaining: int
+    # Seconds until a refused request would be allowed (0 when allowed)
+    retry_after: float
+    # Seconds until the client's full burst is available again
+    reset_after: float
+
+
+# ============ STORES ============
+
+class RateLimitStore:
+    """
+    Where the limiter keeps each client's theoretical arrival time (TAT).
+
+    `consume` runs one GCRA step atomically: the request is allowed if
+    the client's TAT, once pushed `interval` forward, is at most `period`
+    ahead of now, and the TAT is only stored when it is. A key whose TAT
+    has passed is in the same state as an unknown key, so stores may
+    forget it.
+    """
+
+    def consume(self, key: str, interval: float, period: float) -> Tuple[bool, float]:
+        """
+        Count one request of a key
+
+        Returns:
+            Whether it is allowed, and how far the key's TAT is ahead of
+            now afterwards (seconds)
+        """
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        """Size of the stored state"""
+        return {}
+
+    def close(self):
+        """Release the store's resources"""
+
+
+def _gcra(tat: float, now: float, interval: float, period: float) -> Tuple[bool, float]:
+    """One GCRA step from a stored TAT: whether allowed, and the new TAT"""
+    new_tat = max(tat, now) + interval
+    if new_tat - now > period:
+        return False, tat
+    return True, new_tat
+
+
+class MemoryStore(RateLimitStore):
+    """
+    Per-process state: a dict ordered by last use.
+
+    Keys are kept in the order they were last counted. Since a TAT is
+    never more than `period` ahead of the time it was written, expired
+    keys are dropped from the front of that order as requests come in,
+    at O(1) amortized cost, and no key idle for longer than the period
+    outlives the next request. Past `max_keys`, the least recently seen
+    client is forgotten (and gets a fresh allowance).
+    """
+
+    def __init__(self, max_keys: int = MEMORY_MAX_KEYS, clock: Callable[[], float] = time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self.evictions = 0
+        self._tats: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key: str, interval: float, period: float) -> Tuple[bool, float]:
+        with self._lock:
+            now = self.clock()
+            tats = self._tats
+            while tats:
+                oldest, tat = next(iter(tats.items()))
+                if tat > now:
+                    break
+                del tats[oldest]
+            allowed, tat = _gcra(tats.get(key, now), now, interval, period)
+            if allowed:
+                tats[key] = tat
+                tats.move_to_end(key)
+                if len(tats) > self.max_keys:
+                    tats.popitem(last=False)
+                    self.evictions += 1
+            return allowed, max(tat - now, 0.0)
+
+    def __len__(self) -> int:
+        return len(self._tats)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"keys": len(self._tats), "max_keys": self.max_keys, "evictions": self.evictions}
+
+
+class SharedMemoryStore(RateLimitStore):
+    """
+    State shared by every process on the host through a mapped file.
+
+    The file (in /dev/shm when available) is a fixed hash table of
+    `slots` entries of (key hash, TAT), so uvicorn workers started
+    separately all count against the same limits. A key lives in one of
+    SHARED_PROBES slots after its hash; a slot whose TAT has passed is
+    free for any key, so idle clients need no sweeping. When all probed
+    slots are in use, the one closest to expiring is taken over. Updates
+    hold an flock on the file (and a thread lock, since flock does not
+    exclude threads sharing the descriptor).
+
+    Clocks must agree between processes: the default is wall time.
+    """
+
+    def __init__(self, path: Optional[str] = None, slots: int = 65_536,
+                 clock: Callable[[], float] = time.time):
+        if fcntl is None:
+            raise RuntimeError("The shared rate limit store needs fcntl (POSIX)")
+        if path is None:
+            directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+            path = os.path.join(directory, "consumesafe-rate-limit")
+        self.path = path
+        self.slots = slots
+        self.clock = clock
+        self._lock = threading.Lock()
+
+        size = slots * _SLOT.size
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd).st_size != size:
+                # A table of another size cannot be read: start afresh
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, size)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._map = mmap.mmap(self._fd, size)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        # Never 0, which marks an empty slot
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "little") | 1
+
+    def consume(self, key: str, interval: float, period: float) -> Tuple[bool, float]:
+        key_hash = self._hash(key)
+        table = self._map
+        first = key_hash % self.slots
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                now = self.clock()
+                found = None
+                free = None
+                stalest = None
+                for probe in range(SHARED_PROBES):
+                    slot = (first + probe) % self.slots
+                    slot_hash, tat = _SLOT.unpack_from(table, slot * _SLOT.size)
+                    if slot_hash == key_hash:
+                        found = slot
+                        break
+                    if free is None and (slot_hash == 0 or tat <= now):
+                        free = slot
+                    if stalest is None or tat < stalest[1]:
+                        stalest = (slot, tat)
+
+                if found is not None:
+                    slot, stored = found, tat
+                else:
+                    slot, stored = (free if free is not None else stalest[0]), now
+                allowed, tat = _gcra(stored, now, interval, period)
+                if allowed:
+                    _SLOT.pack_into(table, slot * _SLOT.size, key_hash, tat)
+                return allowed, max(tat - now, 0.0)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def stats(self) -> Dict[str, Any]:
+        now = self.clock()
+        with self._lock:
+            live = sum(
+                1 for slot_hash, tat in _SLOT.iter_unpack(self._map) if slot_hash and tat > now
+            )
+        return {"keys": live, "slots": self.slots, "path": self.path}
+
+    def close(self):
+        self._map.close()
+        os.close(self._fd)
+
+
+# GCRA step run inside Redis, on the server's clock, so that API servers
+# on several hosts share limits. KEYS[1]: key; ARGV: interval, period (s).
+GCRA_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local interval = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+local new_tat = math.max(tat, now) + interval
+if new_tat - now > period then
+    return {0, tostring(math.max(tat - now, 0))}
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+return {1, tostring(new_tat - now)}
+"""
+
+
+class RedisStore(RateLimitStore):
+    """
+    State in Redis (or any server speaking its protocol and Lua).
+
+    Each request is one EVALSHA of GCRA_SCRIPT. Keys expire on their
+    own once their TAT has passed.
+    """
+
+    def __init__(self, client: Any, prefix: str = "consumesafe:rate:"):
+        """
+        Args:
+            client: redis-py compatible client (`script_load`, `evalsha`)
+            prefix: Prepended to every key
+        """
+        self.client = client
+        self.prefix = prefix
+        self._sha = client.script_load(GCRA_SCRIPT)
+
+    def consume(self, key: str, interval: float, period: float) -> Tuple[bool, float]:
+        allowed, ahead = self.client.evalsha(self._sha, 1, self.prefix + key, interval, period)
+        return bool(int(allowed)), float(ahead)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"prefix": self.prefix}
+
+    def close(self):
+        close = getattr(self.client, "close", None)
+        if close:
+            close()
+
+
+class LocalRedis:
+    """
+    In-process stand-in for the part of a Redis client RedisStore uses.
+
+    Runs GCRA_SCRIPT as its Python equivalent with expiring keys, for
+    tests and single-host setups without a Redis server.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self.data: Dict[str, Tuple[str, float]] = {}
+        self._scripts: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def script_load(self, script: str) -> str:
+        sha = hashlib.sha1(script.encode("utf-8")).hexdigest()
+        self._scripts[sha] = script
+        return sha
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._get(key, self.clock())
+
+    def _get(self, key: str, now: float) -> Optional[str]:
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= now:
+            del self.data[key]
+            return None
+        return entry[0]
+
+    def evalsha(self, sha: str, numkeys: int, *args: Any) -> list:
+        if self._scripts.get(sha) != GCRA_SCRIPT:
+            raise ValueError("NOSCRIPT No matching script")
+        key, interval, period = args[0], float(args[1]), float(args[2])
+        with self._lock:
+            now = self.clock()
+            stored = self._get(key, now)
+            allowed, tat = _gcra(float(stored) if stored else now, now, interval, period)
+            if allowed:
+                self.data[key] = (repr(tat), now + math.ceil((tat - now) * 1000) / 1000)
+            return [int(allowed), repr(max(tat - now, 0.0))]
+
+
+def create_store(kind: str = "memory", redis_url: Optional[str] = None,
+                 shared_path: Optional[str] = None, shared_slots: int = 65_536) -> RateLimitStore:
+    """
+    Build the store named by a setting
+
+    Args:
+        kind: "memory", "shared" or "redis"
+        redis_url: Server of the "redis" store ("local" for the
+            in-process stand-in)
+        shared_path: File of the "shared" store
+        shared_slots: Table size of the "shared" store
+    """
+    if kind == "memory":
+        return MemoryStore()
+    if kind == "shared":
+        return SharedMemoryStore(shared_path, shared_slots)
+    if kind == "redis":
+        if not redis_url:
+            raise ValueError("The redis rate limit store needs RATE_LIMIT_REDIS_URL")
+        if redis_url == "local":
+            return RedisStore(LocalRedis())
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("The redis rate limit store needs the redis package")
+        return RedisStore(redis.Redis.from_url(redis_url))
+    raise ValueError(f"Unknown rate limit store: {kind}")
+
+
+# ============ LIMITER ============
+
+class RateLimiter:
+    """
+    Allows `max_requests` per `time_window` seconds per client.
+
+    GCRA (the generic cell rate algorithm, a token bucket kept as one
+    timestamp): requests are spaced `time_window / max_requests` apart
+    on average, and a client may burst up to `max_requests` at once.
+    Each request is a single O(1) store update.
+    """
+
+    def __init__(self, max_requests: int = 100, time_window: float = 60,
+                 store: Optional[RateLimitStore] = None):
+        if max_requests <= 0 or time_window <= 0:
+            raise ValueError("max_requests and time_window must be positive")
+        self.max_requests = max_requests
+        self.time_window = time_window
+        self.interval = time_window / max_requests
+        self.store = store if store is not None else MemoryStore()
+
+    def hit(self, client_id: str) -> RateLimitResult:
+        """Count one request of a client"""
+        allowed, ahead = self.store.consume(client_id, self.interval, self.time_window)
+        # Rounding guard: a TAT exactly on a boundary leaves a whole request
+        remaining = int((self.time_window - ahead) / self.interval + 1e-9)
+        if allowed:
+            return RateLimitResult(True, self.max_requests, remaining, 0.0, ahead)
+        retry_after = ahead + self.interval - self.time_window
+        return RateLimitResult(False, self.max_requests, 0, max(retry_after, 0.0), ahead)
+
+    def is_allowed(self, client_id: str) -> bool:
+        """Count one request of a client and tell whether it may proceed"""
+        return self.hit(client_id).allowed
+
+    @staticmethod
+    def headers(result: RateLimitResult) -> Dict[str, str]:
+        """RateLimit-* response headers (and Retry-After when refused)"""
+        headers = {
+            "X-RateLimit-Limit": str(result.limit),
+            "X-RateLimit-Remaining": str(result.remaining),
+            "X-RateLimit-Reset": str(math.ceil(result.reset_after)),
+        }
+        if not result.allowed:
+            headers["Retry-After"] = str(math.ceil(result.retry_after))
+        return headers
+
+    def stats(self) -> Dict[str, Any]:
+        """Limit settings and store size"""
+        return {
+            "max_requests": self.max_requests,
+            "time_window": self.time_window,
+            "store": type(self.store).__name__,
+            **self.store.stats(),
+        }
@@ -0,0 +1,98 @@
+"""
+Recommender - Category index behind AI recommendations
+"""
+import heapq
+import threading
+from array import array
+from collections import OrderedDict
+from itertools import islice
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Mapping, Optional, Sequence
+
+from app.search_index import TokenIndex
+
+# Distinct history entries whose categories are remembered
+QUERY_CACHE_SIZE = 4096
+
+
+class CategoryIndex:
+    """
+    Products grouped by category, best first.
+
+    A recommendation request used to match every history entry against
+    the whole catalog, then score every product of the viewed
+    categories and sort them all. Here history entries are resolved
+    through the product name index (and cached), each category keeps
+    its rows ordered by a score computed once per product, and the top
+    k are taken by merging those orderings with a heap. A request costs
+    O(H + C + k log C) for H history entries and C viewed categories,
+    whatever the catalog size.
+    """
+
+    def __init__(self, products: Sequence[Mapping[str, Any]],
+                 base_score: Callable[[Mapping[str, Any]], float],
+                 name_index: Optional[TokenIndex] = None):
+        """
+        Args:
+            products: Catalog rows
+            base_score: Score of a product apart from its category
+            name_index: Existing index over the product names, if any
+        """
+        self.products = products
+        if name_index is None:
+            name_index = TokenIndex([product.get('boycott_product') for product in products])
+        self.name_index = name_index
+
+        categories = [product.get('category', '') for product in products]
+        self.row_categories = categories
+        self.scores = array("d", (base_score(product) for product in products))
+        rows_by_category: Dict[Any, List[int]] = {}
+        for row, category in enumerate(categories):
+            rows_by_category.setdefault(category, []).append(row)
+        scores = self.scores
+        # Rows are already ascending: the stable sort keeps catalog order on ties
+        self.rows = {
+            category: array("I", sorted(rows, key=lambda row: -scores[row]))
+            for category, rows in rows_by_category.items()
+        }
+        self._all = frozenset(self.rows)
+        self._query_cache: "OrderedDict[str, FrozenSet[Any]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def categories_for(self, query: str) -> FrozenSet[Any]:
+        """Categories of the products whose name contains the query"""
+        key = query.lower()
+        if not key:
+            return self._all
+        with self._cache_lock:
+            cached = self._query_cache.get(key)
+            if cached is not None:
+                self._query_cache.move_to_end(key)
+                return cached
+        categories = self.row_categories
+        found = frozenset(categories[row] for row in self.name_index.search(key))
+        with self._cache_lock:
+            self._query_cache[key] = found
+            if len(self._query_cache) > QUERY_CACHE_SIZE:
+                self._query_cache.popitem(last=False)
+        return found
+
+    def viewed_categories(self, history: Iterable[str]) -> set:
+        """Categories matched by any history entry"""
+        viewed = set()
+        for query in history:
+            viewed |= self.categories_for(query)
+        return viewed
+
+    def top_rows(self, categories: Iterable[Any], k: int) -> List[int]:
+        """
+        Best k rows over several categories
+
+        Ordered by base score, highest first, then by catalog position,
+        like a stable sort of all their products by score.
+        """
+        if k <= 0:
+            return []
+        scores = self.scores
+        lists = [self.rows[category] for category in categories if category in self.rows]
+        merged = heapq.merge(*lists, key=lambda row: (-scores[row], row))
+        return list(islice(merged, k))
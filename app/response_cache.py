@@ -0,0 +1,212 @@
+"""
+Response Cache - Encoded bodies and validators of read-only endpoints
+"""
+import gzip
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Hashable, Mapping, Optional, Tuple
+
+# Bodies shorter than this are not worth compressing
+GZIP_MIN_SIZE = 1000
+GZIP_LEVEL = 6
+
+
+def encode_json(content: Any) -> bytes:
+    """JSON bytes exactly as FastAPI's JSONResponse renders them"""
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def accepts_encoding(accept_encoding: Optional[str], coding: str) -> bool:
+    """Whether an Accept-Encoding header allows a content coding"""
+    if not accept_encoding:
+        return False
+    for item in accept_encoding.split(","):
+        name, *params = item.split(";")
+        if name.strip().lower() not in (coding, "*"):
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, value = param.strip().partition("=")
+            if key.lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        return quality > 0
+    return False
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Whether an Accept-Encoding header allows gzip"""
+    return accepts_encoding(accept_encoding, "gzip")
+
+
+def gzip_etag(etag: str) -> str:
+    """Entity tag of the gzipped variant of a representation"""
+    return etag[:-1] + '-gzip"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Whether an If-None-Match header names the entity tag
+
+    Comparison is weak, as RFC 9110 requires for If-None-Match, and the
+    gzipped variant's tag counts as the same representation.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (etag, gzip_etag(etag))
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag in candidates:
+            return True
+    return False
+
+
+def not_modified_since(if_modified_since: Optional[str], last_modified: str,
+                       now: Optional[datetime] = None) -> bool:
+    """
+    Whether an If-Modified-Since date is no earlier than Last-Modified
+
+    Dates later than now are ignored, as RFC 9110 requires: the client's
+    clock cannot vouch for a copy from the future.
+    """
+    if not if_modified_since:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+        modified = parsedate_to_datetime(last_modified)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    if modified.tzinfo is None:
+        modified = modified.replace(tzinfo=timezone.utc)
+    if since > (now or datetime.now(timezone.utc)):
+        return False
+    return since >= modified
+
+
+class CachedBody:
+    """One response body, encoded once and compressed once"""
+
+    __slots__ = ("version", "body", "gzip_body", "size")
+
+    def __init__(self, version: int, body: bytes):
+        self.version = version
+        self.body = body
+        self.gzip_body = (
+            gzip.compress(body, GZIP_LEVEL, mtime=0) if len(body) >= GZIP_MIN_SIZE else None
+        )
+        self.size = len(body) + (len(self.gzip_body) if self.gzip_body else 0)
+
+
+class ResponseCache:
+    """
+    Response bytes keyed by (endpoint, normalized params), per dataset version.
+
+    A read-only endpoint's answer only changes when the dataset does, so
+    the body is built, JSON-encoded and gzipped on the first request and
+    every later request just picks the bytes. Entries remember the
+    version they were built from and never answer for another one, and
+    a body is not kept if the dataset changed while it was built;
+    `clear` drops every entry when a new snapshot is published. Entries
+    are kept in least-recently-used order within `max_entries` and
+    `max_bytes`. All methods are thread-safe.
+    """
+
+    def __init__(self, version: Callable[[], int], max_entries: int = 1024,
+                 max_bytes: int = 32 * 2**20):
+        """
+        Args:
+            version: Returns the version of the dataset being served
+            max_entries: Bodies kept at most
+            max_bytes: Size of the bodies kept at most, compressed ones included
+        """
+        self.version = version
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes_held = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple, CachedBody]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(endpoint: str, params: Optional[Mapping[str, Any]] = None) -> Tuple:
+        """Cache key of an endpoint: parameters left unset do not count"""
+        if not params:
+            return (endpoint,)
+        return (endpoint,) + tuple(sorted((k, v) for k, v in params.items() if v is not None))
+
+    def get(self, key: Hashable, version: int) -> Optional[CachedBody]:
+        """Cached body for a key at a dataset version, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.version != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, entry: CachedBody):
+        """Store a body, dropping the least recently used ones past the limits"""
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes_held -= old.size
+            self._entries[key] = entry
+            self.bytes_held += entry.size
+            while len(self._entries) > self.max_entries or self.bytes_held > self.max_bytes:
+                _, dropped = self._entries.popitem(last=False)
+                self.bytes_held -= dropped.size
+
+    def get_or_build(self, key: Hashable, build: Callable[[], Any]) -> CachedBody:
+        """
+        Cached body for a key, building and storing it on a miss
+
+        Args:
+            key: From `ResponseCache.key`
+            build: Returns the JSON-serializable content, or its encoded
+                bytes, read from the dataset being served
+        """
+        version = self.version()
+        entry = self.get(key, version)
+        if entry is None:
+            content = build()
+            entry = CachedBody(version, content if isinstance(content, bytes) else encode_json(content))
+            if self.version() == version:
+                self.put(key, entry)
+        return entry
+
+    def clear(self, *_):
+        """Drop every entry (usable as a dataset listener)"""
+        with self._lock:
+            self._entries.clear()
+            self.bytes_held = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Entries, bytes held and hit counts"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes_held,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,473 @@
+"""
+Search Indexes - Fast product lookup structures built once at load time
+"""
+import heapq
+import os
+import re
+import unicodedata
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Tokens are maximal runs of word characters in the lowercased text
+_TOKEN_RE = re.compile(r"\w+")
+
+# Separator between vocabulary entries; never part of a token
+_SEP = "\n"
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens"""
+    return _TOKEN_RE.findall(text.lower())
+
+
+class TokenIndex:
+    """
+    Inverted token index over one text column.
+
+    Answers the same question as ``query.lower() in value.lower()`` for
+    every row, but only verifies the rows whose tokens can contain the
+    query instead of scanning the whole column. Fragments that may sit
+    inside a longer token are resolved through a suffix array over the
+    token vocabulary.
+    """
+
+    def __init__(self, values: Sequence[str]):
+        self.values = values
+        postings = {}
+        for row, value in enumerate(values):
+            for token in set(_TOKEN_RE.findall((value or "").lower())):
+                postings.setdefault(token, []).append(row)
+
+        self.tokens = sorted(postings)
+        self.postings = [array("I", postings[token]) for token in self.tokens]
+
+        # Vocabulary joined as "tok1\ntok2\n...\n"; every suffix of every
+        # token is referenced by its offset, sorted by the suffix text
+        self._vocab = "".join(token + _SEP for token in self.tokens)
+        suffixes = []
+        offsets = array("I")
+        owners = array("I")
+        start = 0
+        for token_id, token in enumerate(self.tokens):
+            length = len(token)
+            suffixes.extend(token[i:] for i in range(length))
+            offsets.extend(range(start, start + length))
+            owners.extend([token_id] * length)
+            start += length + 1
+        order = sorted(range(len(suffixes)), key=suffixes.__getitem__)
+        del suffixes
+        self._suffixes = array("I", [offsets[i] for i in order])
+        self._suffix_owners = array("I", [owners[i] for i in order])
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def _suffix(self, offset: int) -> str:
+        """Token suffix starting at a vocabulary offset"""
+        return self._vocab[offset:self._vocab.index(_SEP, offset)]
+
+    def search(self, query: str) -> List[int]:
+        """Return row ids (ascending) whose value contains the query"""
+        query_lower = query.lower()
+        candidates = self.candidates(query_lower)
+        if candidates is None:
+            candidates = range(len(self.values))
+        elif _TOKEN_RE.fullmatch(query_lower):
+            # A single word is inside every candidate token: no check needed
+            return list(candidates)
+
+        values = self.values
+        return [row for row in candidates
+                if query_lower in (values[row] or "").lower()]
+
+    def candidates(self, query_lower: str) -> Optional[Sequence[int]]:
+        """
+        Get the candidate rows for a lowercased query
+
+        Returns:
+            Sorted row ids that may match, or None if the query has no
+            word characters and every row must be checked
+        """
+        best = None
+        best_size = 0
+        for match in _TOKEN_RE.finditer(query_lower):
+            # A fragment touching the edge of the query may continue
+            # inside a longer token of the indexed value
+            token_ids = self.token_ids(
+                match.group(),
+                left_open=match.start() == 0,
+                right_open=match.end() == len(query_lower)
+            )
+            size = sum(len(self.postings[t]) for t in token_ids)
+            if best is None or size < best_size:
+                best, best_size = token_ids, size
+            if not size:
+                return ()
+
+        if best is None:
+            return None
+        if len(best) == 1:
+            return self.postings[best[0]]
+        return merge_rows(self.postings[t] for t in best)
+
+    def token_ids(self, fragment: str, left_open: bool, right_open: bool) -> List[int]:
+        """
+        Get the vocabulary tokens a query fragment can be part of
+
+        Args:
+            fragment: Lowercase run of word characters
+            left_open: Fragment may be preceded by more token characters
+            right_open: Fragment may be followed by more token characters
+        """
+        length = len(fragment)
+
+        if not left_open:
+            tokens = self.tokens
+            if not right_open:
+                position = bisect_left(tokens, fragment)
+                if position < len(tokens) and tokens[position] == fragment:
+                    return [position]
+                return []
+            lo = bisect_left(tokens, fragment)
+            hi = bisect_right(tokens, fragment, lo=lo, key=lambda t: t[:length])
+            return list(range(lo, hi))
+
+        if right_open:
+            key = self._prefix_key(length)
+        else:
+            key = self._suffix
+        lo = bisect_left(self._suffixes, fragment, key=key)
+        hi = bisect_right(self._suffixes, fragment, lo=lo, key=key)
+        return sorted(set(self._suffix_owners[lo:hi]))
+
+    def _prefix_key(self, length: int):
+        """Sort key giving the first characters of a token suffix"""
+        vocab = self._vocab
+
+        def key(offset):
+            return vocab[offset:offset + length].split(_SEP, 1)[0]
+        return key
+
+
+def merge_rows(row_lists: Iterable[Sequence[int]]) -> List[int]:
+    """Union several row id lists into one ascending list"""
+    merged = set()
+    for rows in row_lists:
+        merged.update(rows)
+    return sorted(merged)
+
+
+def trigrams(text: str) -> set:
+    """Character trigrams of an already lowercased string"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def substring_distance(pattern: str, text: str, max_edits: int) -> int:
+    """
+    Smallest edit distance between the pattern and any substring of text
+
+    Args:
+        pattern: Lowercased query
+        text: Lowercased value to search in
+        max_edits: Distances above this bound are not told apart
+
+    Returns:
+        The distance, or max_edits + 1 if it is larger than max_edits
+    """
+    if pattern in text:
+        return 0
+    length = len(pattern)
+    if not length:
+        return 0
+
+    # Myers' bit-parallel matcher: one column of the Sellers edit-distance
+    # matrix is kept as vertical +1/-1 delta bitmasks over the pattern
+    peq = {}
+    for i, char in enumerate(pattern):
+        peq[char] = peq.get(char, 0) | (1 << i)
+    mask = (1 << length) - 1
+    last = 1 << (length - 1)
+    plus, minus = mask, 0
+    score = best = length
+    for char in text:
+        eq = peq.get(char, 0)
+        xv = eq | minus
+        xh = (((eq & plus) + plus) ^ plus) | eq
+        hplus = minus | ~(xh | plus)
+        hminus = plus & xh
+        if hplus & last:
+            score += 1
+        elif hminus & last:
+            score -= 1
+            if score < best:
+                best = score
+        # A match may start anywhere, so the top row stays at zero
+        hplus = (hplus << 1) & mask
+        hminus = (hminus << 1) & mask
+        plus = (hminus | ~(xv | hplus)) & mask
+        minus = hplus & xv
+    return best if best <= max_edits else max_edits + 1
+
+
+class TrigramIndex:
+    """
+    Character trigram posting lists over several text columns.
+
+    Serves substring lookups by intersecting the posting lists of the
+    query's trigrams, and typo-tolerant lookups with a count filter: a
+    value within k edits of the query still shares at least
+    ``len(trigrams) - 3k`` of its trigrams.
+    """
+
+    def __init__(self, columns: Dict[str, Sequence[str]]):
+        self.columns = columns
+        postings = {}
+        row_count = 0
+        for values in columns.values():
+            row_count = max(row_count, len(values))
+        for row in range(row_count):
+            grams = set()
+            for values in columns.values():
+                grams |= trigrams((values[row] or "").lower())
+            for gram in grams:
+                postings.setdefault(gram, []).append(row)
+        self.row_count = row_count
+        self.postings = {gram: array("I", rows) for gram, rows in postings.items()}
+
+    def _fields(self, fields: Optional[Sequence[str]]) -> List[Sequence[str]]:
+        return [self.columns[field] for field in (fields or self.columns)]
+
+    def search(self, query: str, fields: Optional[Sequence[str]] = None) -> List[int]:
+        """Return row ids (ascending) with a field containing the query"""
+        query_lower = query.lower()
+        columns = self._fields(fields)
+        grams = trigrams(query_lower)
+        if grams:
+            lists = sorted((self.postings.get(gram, ()) for gram in grams), key=len)
+            candidates = set(lists[0])
+            for rows in lists[1:]:
+                if not candidates:
+                    break
+                candidates.intersection_update(rows)
+            candidates = sorted(candidates)
+        else:
+            candidates = range(self.row_count)
+
+        return [row for row in candidates
+                if any(query_lower in (values[row] or "").lower() for values in columns)]
+
+    def fuzzy_search(self, query: str, fields: Optional[Sequence[str]] = None,
+                     max_edits: Optional[int] = None) -> List[Tuple[int, int]]:
+        """
+        Find rows with a field approximately containing the query
+
+        Args:
+            query: User query, possibly misspelled
+            fields: Columns to match against (default: all indexed columns)
+            max_edits: Allowed edit distance (default: from query length)
+
+        Returns:
+            (row, distance) pairs sorted by distance, then row
+        """
+        query_lower = query.lower()
+        grams = trigrams(query_lower)
+        if max_edits is None:
+            max_edits = default_max_edits(query_lower)
+        # Keep the count filter selective: at least two shared trigrams
+        max_edits = max(0, min(max_edits, (len(grams) - 2) // 3))
+        if max_edits == 0:
+            return [(row, 0) for row in self.search(query, fields)]
+
+        columns = self._fields(fields)
+        threshold = len(grams) - 3 * max_edits
+        lists = sorted((self.postings.get(gram, ()) for gram in grams), key=len)
+
+        # Any row with `threshold` shared trigrams appears in at least one
+        # of the shortest len(lists) - threshold + 1 lists
+        seed_count = len(lists) - threshold + 1
+        counts = {}
+        for rows in lists[:seed_count]:
+            for row in rows:
+                counts[row] = counts.get(row, 0) + 1
+        remaining = len(lists) - seed_count
+        for rows in lists[seed_count:]:
+            if len(rows) < 8 * len(counts):
+                for row in rows:
+                    if row in counts:
+                        counts[row] += 1
+            else:
+                for row, count in counts.items():
+                    position = bisect_left(rows, row)
+                    if position < len(rows) and rows[position] == row:
+                        counts[row] = count + 1
+            # Drop rows that can no longer reach the threshold
+            remaining -= 1
+            counts = {row: count for row, count in counts.items()
+                      if count + remaining >= threshold}
+
+        matches = []
+        for row in sorted(counts):
+            if counts[row] < threshold:
+                continue
+            distance = min(
+                substring_distance(query_lower, (values[row] or "").lower(), max_edits)
+                for values in columns
+            )
+            if distance <= max_edits:
+                matches.append((row, distance))
+        matches.sort(key=lambda match: match[1])
+        return matches
+
+
+def default_max_edits(query_lower: str) -> int:
+    """Typo budget for a query: none for short words, then 1 or 2"""
+    if len(query_lower) < 5:
+        return 0
+    if len(query_lower) < 12:
+        return 1
+    return 2
+
+
+def normalize_name(text: str) -> str:
+    """Lowercase, strip accents and collapse punctuation to single spaces"""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(_TOKEN_RE.findall(stripped.lower()))
+
+
+class _TrieNode:
+    """Radix trie node: edges are keyed by the first character of their label"""
+
+    __slots__ = ("edges", "entries", "top")
+
+    def __init__(self):
+        self.edges = {}
+        self.entries = []
+        self.top = ()
+
+
+class PrefixTrie:
+    """
+    Compressed prefix trie whose nodes cache their top-k completions.
+
+    Keys map to entry ids; entries are ranked by the sort keys passed at
+    construction (smaller is better). After ``finalize`` a lookup only
+    walks the prefix and returns the cached tuple of the node below it.
+    """
+
+    def __init__(self, ranks: Sequence[Any], top_k: int = 10):
+        self.root = _TrieNode()
+        self.ranks = ranks
+        self.top_k = top_k
+
+    def insert(self, key: str, entry_id: int):
+        """Add an entry under a key"""
+        node = self.root
+        while key:
+            edge = node.edges.get(key[0])
+            if edge is None:
+                child = _TrieNode()
+                node.edges[key[0]] = (key, child)
+                node = child
+                break
+            label, child = edge
+            common = len(os.path.commonprefix((label, key)))
+            if common < len(label):
+                # Split the edge where the new key diverges
+                middle = _TrieNode()
+                middle.edges[label[common]] = (label[common:], child)
+                node.edges[key[0]] = (label[:common], middle)
+                child = middle
+            node = child
+            key = key[common:]
+        node.entries.append(entry_id)
+
+    def finalize(self):
+        """Compute the cached top-k completions of every node"""
+        ranks = self.ranks
+        stack = [(self.root, False)]
+        while stack:
+            node, children_done = stack.pop()
+            if not children_done:
+                stack.append((node, True))
+                stack.extend((child, False) for _, child in node.edges.values())
+                continue
+            candidates = set(node.entries)
+            for _, child in node.edges.values():
+                candidates.update(child.top)
+            node.top = tuple(heapq.nsmallest(self.top_k, candidates, key=ranks.__getitem__))
+            node.entries = ()
+
+    def complete(self, prefix: str) -> Tuple[int, ...]:
+        """Best entry ids for keys starting with the prefix"""
+        node = self.root
+        while prefix:
+            edge = node.edges.get(prefix[0])
+            if edge is None:
+                return ()
+            label, child = edge
+            if label.startswith(prefix):
+                return child.top
+            if not prefix.startswith(label):
+                return ()
+            prefix = prefix[len(label):]
+            node = child
+        return node.top
+
+
+# Boycott intensity as popularity: stronger calls to boycott rank first
+INTENSITY_RANK = {"high": 0, "medium": 1, "low": 2}
+
+SUGGEST_TOP_K = 10
+
+
+class Autocomplete:
+    """
+    Product and brand name completion backed by a PrefixTrie.
+
+    Every word start of a normalized name is a key, so "cola" completes
+    "Coca-Cola". Suggestions are ranked by boycott intensity, then by
+    catalog order (earlier products are the better known ones).
+    """
+
+    KINDS = (("product", "boycott_product"), ("brand", "brand"))
+
+    def __init__(self, products: Sequence[Any], top_k: int = SUGGEST_TOP_K):
+        # entries[i] = (display text, kind, representative row)
+        self.entries = []
+        ranks = []
+        seen = {}
+        keys = []
+        for row, product in enumerate(products):
+            intensity = INTENSITY_RANK.get((product.get("intensity") or "").lower(), 3)
+            for kind_order, (kind, field) in enumerate(self.KINDS):
+                text = product.get(field) or ""
+                normalized = normalize_name(text)
+                if not normalized:
+                    continue
+                entry_id = seen.get((kind, normalized))
+                if entry_id is None:
+                    entry_id = len(self.entries)
+                    seen[(kind, normalized)] = entry_id
+                    self.entries.append((text, kind, row))
+                    ranks.append((intensity, row, kind_order))
+                    keys.append(normalized)
+                elif (intensity, row, kind_order) < ranks[entry_id]:
+                    self.entries[entry_id] = (text, kind, row)
+                    ranks[entry_id] = (intensity, row, kind_order)
+
+        self.trie = PrefixTrie(ranks, top_k)
+        for entry_id, normalized in enumerate(keys):
+            words = normalized.split(" ")
+            for i in range(len(words)):
+                self.trie.insert(" ".join(words[i:]), entry_id)
+        self.trie.finalize()
+
+    def suggest(self, prefix: str, limit: int = SUGGEST_TOP_K) -> List[Tuple[str, str, int]]:
+        """Top (text, kind, row) completions for a typed prefix"""
+        normalized = normalize_name(prefix)
+        # Keep a trailing space: "coca " should not complete "cocacola"
+        if normalized and prefix[-1:].isspace():
+            normalized += " "
+        return [self.entries[entry_id] for entry_id in self.trie.complete(normalized)[:limit]]
@@ -0,0 +1,218 @@
+"""
+Similarity Index - TF-IDF product vectors for similarity recommendations
+"""
+import heapq
+import math
+from array import array
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
+
+from app.search_index import TokenIndex, tokenize
+
+# Text embedded for each product
+SIMILARITY_FIELDS = ('boycott_product', 'brand', 'category', 'reason')
+
+# Terms in at least this many products (and this share of the catalog)
+# are scored per group of products instead of per product
+DENSE_MIN_PRODUCTS = 64
+DENSE_MIN_SHARE = 0.01
+
+
+class SimilarityIndex:
+    """
+    Cosine similarity between TF-IDF vectors of products.
+
+    Each product is embedded from its name, brand, category and reason
+    with smoothed IDF weights and L2 normalization. Scoring a query
+    against every product is one sparse matrix-vector product, computed
+    so that its cost does not grow with the catalog:
+
+    - Rare terms (names, brands) keep per-product posting lists, and
+      only the products on the query's lists are accumulated.
+    - Frequent terms come from the few distinct categories, reasons and
+      brand suffixes. Products with the same frequent terms form a
+      group and share that part of the dot product. A group member
+      with no rare-term match scores ``group_dot / norm``, so its best
+      members are simply the first of its rows sorted by norm.
+    """
+
+    def __init__(self, products: Sequence[Mapping[str, Any]],
+                 name_index: Optional[TokenIndex] = None):
+        """
+        Args:
+            products: Catalog rows
+            name_index: Existing index over the product names, if any
+        """
+        self.products = products
+        if name_index is None:
+            name_index = TokenIndex([product.get('boycott_product') for product in products])
+        self.name_index = name_index
+
+        counts = [self._term_counts(product) for product in products]
+        size = len(counts)
+        df = Counter()
+        for terms in counts:
+            df.update(terms.keys())
+        self.terms: Dict[str, int] = {term: term_id for term_id, term in enumerate(df)}
+        self.idf = array("d", (math.log((1 + size) / (1 + freq)) + 1 for freq in df.values()))
+        dense_min = max(DENSE_MIN_PRODUCTS, size * DENSE_MIN_SHARE)
+        dense = {self.terms[term] for term, freq in df.items() if freq >= dense_min}
+        del df
+
+        self.inv_norms = array("d")
+        self.groups = array("I")
+        postings: List[List[Tuple[int, float]]] = [[] for _ in self.terms]
+        group_ids: Dict[Tuple, int] = {}
+        group_weights: List[Dict[int, float]] = []
+        for row, terms in enumerate(counts):
+            weights = self._weigh(terms)
+            norm = math.sqrt(sum(w * w for w in weights.values()))
+            self.inv_norms.append(1 / norm if norm else 0.0)
+
+            signature = tuple(sorted((t, w) for t, w in weights.items() if t in dense))
+            group = group_ids.get(signature)
+            if group is None:
+                group = group_ids[signature] = len(group_weights)
+                group_weights.append(dict(signature))
+            self.groups.append(group)
+
+            for term_id, weight in weights.items():
+                if term_id not in dense:
+                    postings[term_id].append((row, weight))
+        del counts
+
+        # Rare term postings, flattened: entries of term t are
+        # posting_starts[t]:posting_starts[t + 1] (empty for frequent terms)
+        self.posting_starts = array("I", [0])
+        self.posting_rows = array("I")
+        self.posting_weights = array("d")
+        for entries in postings:
+            self.posting_rows.extend(row for row, _ in entries)
+            self.posting_weights.extend(weight for _, weight in entries)
+            self.posting_starts.append(len(self.posting_rows))
+        del postings
+
+        # Frequent term -> [(group, weight)], and each group's rows, best first
+        self.dense_postings: Dict[int, List[Tuple[int, float]]] = {}
+        for group, weights in enumerate(group_weights):
+            for term_id, weight in weights.items():
+                self.dense_postings.setdefault(term_id, []).append((group, weight))
+        members: List[List[int]] = [[] for _ in group_weights]
+        for row, group in enumerate(self.groups):
+            members[group].append(row)
+        inv_norms = self.inv_norms
+        self.group_rows = [
+            array("I", sorted(rows, key=lambda row: -inv_norms[row])) for rows in members
+        ]
+
+    @staticmethod
+    def _term_counts(product: Mapping[str, Any]) -> Counter:
+        terms = Counter()
+        for field in SIMILARITY_FIELDS:
+            terms.update(tokenize(product.get(field) or ''))
+        return terms
+
+    def _weigh(self, terms: Mapping[str, int]) -> Dict[int, float]:
+        """TF-IDF weights by term id, ignoring unknown terms"""
+        ids = self.terms
+        idf = self.idf
+        weights = {}
+        for term, count in terms.items():
+            term_id = ids.get(term)
+            if term_id is not None:
+                weights[term_id] = count * idf[term_id]
+        return weights
+
+    def named_row(self, entry: str) -> Optional[int]:
+        """First product whose name is the entry, ignoring case"""
+        entry_lower = entry.lower()
+        if not entry_lower:
+            return None
+        names = self.name_index.values
+        for row in self.name_index.search(entry_lower):
+            if (names[row] or '').lower() == entry_lower:
+                return row
+        return None
+
+    def query_vector(self, history: Iterable[str]) -> Tuple[Dict[int, float], Set[int]]:
+        """
+        Embed a user history
+
+        An entry naming a product exactly stands for that product's
+        vector; any other entry is embedded as free text. Each entry
+        counts equally.
+
+        Returns:
+            Normalized query weights, and the rows named by the history
+        """
+        query: Dict[int, float] = {}
+        seen = set()
+        for entry in history:
+            row = self.named_row(entry)
+            if row is not None:
+                seen.add(row)
+                weights = self._weigh(self._term_counts(self.products[row]))
+            else:
+                weights = self._weigh(Counter(tokenize(entry)))
+            norm = math.sqrt(sum(w * w for w in weights.values()))
+            for term, weight in weights.items():
+                query[term] = query.get(term, 0.0) + weight / norm
+        norm = math.sqrt(sum(w * w for w in query.values()))
+        if norm:
+            query = {term: weight / norm for term, weight in query.items()}
+        return query, seen
+
+    def top_rows(self, history: Iterable[str], k: int,
+                 exclude_seen: bool = True) -> List[Tuple[int, float]]:
+        """
+        Products most similar to a history, best first
+
+        Args:
+            history: Product names or free text the user looked at
+            k: Number of products
+            exclude_seen: Leave out the products the history names
+
+        Returns:
+            (row, cosine similarity) pairs with a positive score, highest
+            first, then in catalog order
+        """
+        if k <= 0:
+            return []
+        query, seen = self.query_vector(history)
+        return self._ranked(query, seen if exclude_seen else (), k)
+
+    def _ranked(self, query: Mapping[int, float], exclude, k: int) -> List[Tuple[int, float]]:
+        # Frequent terms: the part of the dot product shared by each group
+        group_dots: Dict[int, float] = {}
+        for term_id, q in query.items():
+            for group, weight in self.dense_postings.get(term_id, ()):
+                group_dots[group] = group_dots.get(group, 0.0) + q * weight
+
+        # Rare terms: the rest, for the products that have any
+        sparse_dots: Dict[int, float] = {}
+        starts = self.posting_starts
+        posting_rows = self.posting_rows
+        posting_weights = self.posting_weights
+        for term_id, q in query.items():
+            start, end = starts[term_id], starts[term_id + 1]
+            for row, weight in zip(posting_rows[start:end], posting_weights[start:end]):
+                sparse_dots[row] = sparse_dots.get(row, 0.0) + q * weight
+
+        groups = self.groups
+        inv_norms = self.inv_norms
+        candidates = []
+        for row, dot in sparse_dots.items():
+            if row not in exclude:
+                candidates.append((-(group_dots.get(groups[row], 0.0) + dot) * inv_norms[row], row))
+        for group, dot in group_dots.items():
+            taken = 0
+            for row in self.group_rows[group]:
+                if taken >= k:
+                    break
+                if row in sparse_dots or row in exclude:
+                    continue
+                candidates.append((-dot * inv_norms[row], row))
+                taken += 1
+
+        return [(row, -negative) for negative, row in heapq.nsmallest(k, candidates)
+                if negative < 0]
@@ -0,0 +1,547 @@
+"""
+Snapshot File - Compiled, memory-mapped catalog with prebuilt indexes
+
+A snapshot file holds the columnar catalog and every search index in flat
+arrays and string tables, so opening it is a matter of mapping the file
+and wrapping slices of it; nothing is parsed or rebuilt. Pages are shared
+through the OS page cache by every worker mapping the same file.
+
+Layout (native byte order, recorded in the manifest):
+
+    magic (8 bytes) | format version (u32) | manifest length (u32)
+    manifest (UTF-8 JSON) | padding to 8 bytes | sections...
+
+The manifest names every section with its offset (relative to the end of
+the header), array typecode and item count. A string table is three
+sections: ``<name>.offsets`` (u32 byte offsets, one more than strings),
+``<name>.blob`` (UTF-8 bytes) and ``<name>.nulls`` (rows holding None).
+A posting table is ``<name>.offsets`` plus a flat ``<name>.rows`` array.
+
+Build one from the CSV with:
+
+    python -m app.snapshot_file data/boycott_products.csv
+"""
+import argparse
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping, Sequence
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.dataset import DatasetSnapshot
+from app.product_store import CodedColumn, IntColumn, ProductStore, ValueIndex
+from app.search_index import Autocomplete, PrefixTrie, TokenIndex, TrigramIndex
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"CSSNAP\x00\x00"
+# 2: the manifest records the CSV content hash
+FORMAT_VERSION = 2
+SNAPSHOT_SUFFIX = ".snap"
+
+_HEADER = struct.Struct("<8sII")
+_ALIGN = 8
+
+
+class SnapshotFormatError(ValueError):
+    """File is not a snapshot this code can read"""
+
+
+# ============ MAPPED SEQUENCES ============
+
+class MappedStrings(Sequence):
+    """String table read in place: each item is decoded on access"""
+
+    __slots__ = ("offsets", "blob", "nulls")
+
+    def __init__(self, offsets: Sequence[int], blob: memoryview, nulls: Sequence[int]):
+        self.offsets = offsets
+        self.blob = blob
+        self.nulls = nulls
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("string table index out of range")
+        start = self.offsets[index]
+        end = self.offsets[index + 1]
+        if start == end:
+            nulls = self.nulls
+            if nulls:
+                position = bisect_left(nulls, index)
+                if position < len(nulls) and nulls[position] == index:
+                    return None
+        return str(self.blob[start:end], "utf-8")
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+
+class PostingLists(Sequence):
+    """Row id lists stored back to back; item i is a slice of the flat array"""
+
+    __slots__ = ("offsets", "rows")
+
+    def __init__(self, offsets: Sequence[int], rows: Sequence[int]):
+        self.offsets = offsets
+        self.rows = rows
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return self.rows[self.offsets[index]:self.offsets[index + 1]]
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+
+class PostingMap(Mapping):
+    """Sorted string keys mapped to posting lists, looked up by bisection"""
+
+    __slots__ = ("keys_table", "lists")
+
+    def __init__(self, keys_table: MappedStrings, lists: PostingLists):
+        self.keys_table = keys_table
+        self.lists = lists
+
+    def __getitem__(self, key: str):
+        position = bisect_left(self.keys_table, key)
+        if position < len(self.keys_table) and self.keys_table[position] == key:
+            return self.lists[position]
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys_table)
+
+    def __len__(self) -> int:
+        return len(self.keys_table)
+
+
+class MappedTrie:
+    """
+    Read-only PrefixTrie laid out as arrays.
+
+    Node 0 is the root. The edges of node n are entries
+    ``edges.offsets[n]:edges.offsets[n + 1]`` of ``labels``/``children``,
+    sorted by label, and its cached completions are ``top[n]``.
+    """
+
+    def __init__(self, edge_offsets: Sequence[int], labels: MappedStrings,
+                 children: Sequence[int], top: PostingLists):
+        self.edge_offsets = edge_offsets
+        self.labels = labels
+        self.children = children
+        self.top = top
+
+    def complete(self, prefix: str) -> Tuple[int, ...]:
+        """Best entry ids for keys starting with the prefix"""
+        node = 0
+        labels = self.labels
+        while prefix:
+            # Labels of a node start with distinct characters, so the
+            # first label not below prefix[0] is the only candidate
+            lo, hi = self.edge_offsets[node], self.edge_offsets[node + 1]
+            position = bisect_left(labels, prefix[0], lo, hi)
+            if position == hi:
+                return ()
+            label = labels[position]
+            if label[0] != prefix[0]:
+                return ()
+            child = self.children[position]
+            if label.startswith(prefix):
+                return tuple(self.top[child])
+            if not prefix.startswith(label):
+                return ()
+            prefix = prefix[len(label):]
+            node = child
+        return tuple(self.top[node])
+
+
+class MappedEntries(Sequence):
+    """Autocomplete (text, kind, row) entries read from parallel columns"""
+
+    __slots__ = ("texts", "kinds", "rows")
+
+    def __init__(self, texts: MappedStrings, kinds: Sequence[int], rows: Sequence[int]):
+        self.texts = texts
+        self.kinds = kinds
+        self.rows = rows
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return (self.texts[index], Autocomplete.KINDS[self.kinds[index]][0], self.rows[index])
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+
+# ============ WRITING ============
+
+class _SectionWriter:
+    """Collect named, aligned sections and their manifest entries"""
+
+    def __init__(self):
+        self.sections = {}
+        self.chunks = []
+        self.size = 0
+
+    def add_bytes(self, name: str, typecode: str, count: int, data: bytes):
+        padding = -self.size % _ALIGN
+        if padding:
+            self.chunks.append(b"\x00" * padding)
+            self.size += padding
+        self.sections[name] = [self.size, typecode, count]
+        self.chunks.append(data)
+        self.size += len(data)
+
+    def add_array(self, name: str, values: Iterable[int], typecode: str = "I"):
+        data = values if isinstance(values, array) and values.typecode == typecode \
+            else array(typecode, values)
+        self.add_bytes(name, typecode, len(data), data.tobytes())
+
+    def add_strings(self, name: str, strings: Iterable[Optional[str]]):
+        offsets = array("I", [0])
+        nulls = array("I")
+        blob = bytearray()
+        for index, text in enumerate(strings):
+            if text is None:
+                nulls.append(index)
+            else:
+                blob += text.encode("utf-8")
+            if len(blob) > 0xFFFFFFFF:
+                raise ValueError(f"string table {name} exceeds 4 GiB")
+            offsets.append(len(blob))
+        self.add_array(name + ".offsets", offsets)
+        self.add_bytes(name + ".blob", "B", len(blob), bytes(blob))
+        self.add_array(name + ".nulls", nulls)
+
+    def add_postings(self, name: str, lists: Iterable[Sequence[int]]):
+        offsets = array("I", [0])
+        rows = array("I")
+        for row_list in lists:
+            rows.extend(row_list)
+            offsets.append(len(rows))
+        self.add_array(name + ".offsets", offsets)
+        self.add_array(name + ".rows", rows)
+
+
+def _trie_arrays(trie: PrefixTrie):
+    """Flatten a finalized PrefixTrie into MappedTrie arrays (BFS order)"""
+    nodes = [trie.root]
+    edge_offsets = [0]
+    labels = []
+    children = []
+    tops = []
+    position = 0
+    while position < len(nodes):
+        node = nodes[position]
+        position += 1
+        tops.append(node.top)
+        for label, child in sorted(node.edges.values(), key=lambda edge: edge[0]):
+            labels.append(label)
+            children.append(len(nodes))
+            nodes.append(child)
+        edge_offsets.append(len(labels))
+    return edge_offsets, labels, children, tops
+
+
+def write_snapshot(snapshot: DatasetSnapshot, path: str,
+                   source: Optional[Dict[str, int]] = None):
+    """
+    Serialize a dataset snapshot and its indexes to a snapshot file
+
+    Args:
+        snapshot: Loaded catalog with indexes built
+        path: Output file, replaced atomically
+        source: Size and mtime of the CSV it was built from
+    """
+    products = snapshot.products
+    writer = _SectionWriter()
+    manifest = {
+        "byteorder": sys.byteorder,
+        "created": time.time(),
+        "source": source,
+        "content_hash": snapshot.content_hash,
+        "rows": len(products),
+        "fieldnames": products.fieldnames,
+        "columns": {},
+    }
+
+    for name in products.fieldnames:
+        column = products.columns[name]
+        section = f"column/{name}"
+        if isinstance(column, CodedColumn):
+            manifest["columns"][name] = "coded"
+            writer.add_strings(section + ".values", column.values)
+            writer.add_array(section + ".codes", column.codes, column.codes.typecode)
+        elif isinstance(column, IntColumn):
+            manifest["columns"][name] = "int"
+            writer.add_array(section + ".numbers", column.numbers, "q")
+        else:
+            manifest["columns"][name] = "text"
+            writer.add_strings(section, column)
+
+    manifest["value_indexes"] = list(products.value_indexes)
+    for name, index in products.value_indexes.items():
+        keys = sorted(index.postings)
+        writer.add_strings(f"values/{name}.keys", keys)
+        writer.add_postings(f"values/{name}", (index.postings[key] for key in keys))
+
+    manifest["token_indexes"] = list(snapshot.indexes)
+    for field, index in snapshot.indexes.items():
+        section = f"tokens/{field}"
+        if field not in products.columns:
+            writer.add_strings(section + ".values", index.values)
+        writer.add_strings(section + ".tokens", index.tokens)
+        writer.add_postings(section, index.postings)
+        vocab = index._vocab.encode("utf-8")
+        writer.add_bytes(section + ".vocab", "B", len(vocab), vocab)
+        writer.add_array(section + ".suffixes", index._suffixes)
+        writer.add_array(section + ".owners", index._suffix_owners)
+
+    trigram_index = snapshot.trigram_index
+    manifest["trigram"] = {"fields": list(trigram_index.columns),
+                           "row_count": trigram_index.row_count}
+    grams = sorted(trigram_index.postings)
+    writer.add_strings("trigram.keys", grams)
+    writer.add_postings("trigram", (trigram_index.postings[gram] for gram in grams))
+
+    autocomplete = snapshot.autocomplete
+    kinds = {kind: code for code, (kind, _) in enumerate(Autocomplete.KINDS)}
+    manifest["autocomplete"] = {"top_k": autocomplete.trie.top_k}
+    writer.add_strings("suggest.texts", (text for text, _, _ in autocomplete.entries))
+    writer.add_array("suggest.kinds", (kinds[kind] for _, kind, _ in autocomplete.entries), "B")
+    writer.add_array("suggest.rows", (row for _, _, row in autocomplete.entries))
+    edge_offsets, labels, children, tops = _trie_arrays(autocomplete.trie)
+    writer.add_array("suggest.trie.edges", edge_offsets)
+    writer.add_strings("suggest.trie.labels", labels)
+    writer.add_array("suggest.trie.children", children)
+    writer.add_postings("suggest.trie.top", tops)
+
+    manifest["sections"] = writer.sections
+    manifest_bytes = json.dumps(manifest, separators=(",", ":")).encode("utf-8")
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, len(manifest_bytes)) + manifest_bytes
+    header += b"\x00" * (-len(header) % _ALIGN)
+
+    # Write beside the target and rename: workers that still map the old
+    # file keep reading it, and never see a partial one
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(header)
+            for chunk in writer.chunks:
+                f.write(chunk)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def source_info(csv_path: str) -> Dict[str, int]:
+    """Size and mtime of a CSV, recorded to detect stale snapshots"""
+    stat = os.stat(csv_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def compile_csv(csv_path: str, output_path: Optional[str] = None) -> str:
+    """Build the snapshot file of a catalog CSV and return its path"""
+    if output_path is None:
+        output_path = default_snapshot_path(csv_path)
+    source = source_info(csv_path)
+    write_snapshot(DatasetSnapshot.from_csv(csv_path), output_path, source)
+    return output_path
+
+
+def default_snapshot_path(csv_path: str) -> str:
+    """data/boycott_products.csv -> data/boycott_products.snap"""
+    return os.path.splitext(csv_path)[0] + SNAPSHOT_SUFFIX
+
+
+# ============ READING ============
+
+class _SectionReader:
+    """Typed zero-copy views of the sections of a mapped file"""
+
+    def __init__(self, view: memoryview, base: int, sections: Dict[str, List[Any]]):
+        self.view = view
+        self.base = base
+        self.sections = sections
+
+    def has(self, name: str) -> bool:
+        return name in self.sections
+
+    def array(self, name: str) -> memoryview:
+        offset, typecode, count = self.sections[name]
+        start = self.base + offset
+        end = start + count * array(typecode).itemsize
+        if end > len(self.view):
+            raise SnapshotFormatError(f"section {name} is truncated")
+        return self.view[start:end].cast(typecode)
+
+    def strings(self, name: str) -> MappedStrings:
+        return MappedStrings(self.array(name + ".offsets"), self.array(name + ".blob"),
+                             self.array(name + ".nulls"))
+
+    def postings(self, name: str) -> PostingLists:
+        return PostingLists(self.array(name + ".offsets"), self.array(name + ".rows"))
+
+
+def _restore(cls, **attributes):
+    """Instance of an index class with its fields set from mapped data"""
+    instance = cls.__new__(cls)
+    for name, value in attributes.items():
+        setattr(instance, name, value)
+    return instance
+
+
+def read_manifest(path: str) -> Dict[str, Any]:
+    """Header manifest of a snapshot file"""
+    with open(path, "rb") as f:
+        header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise SnapshotFormatError("snapshot file is truncated")
+        magic, version, length = _HEADER.unpack(header)
+        _check_header(magic, version)
+        return json.loads(f.read(length))
+
+
+def _check_header(magic: bytes, version: int):
+    if magic != MAGIC:
+        raise SnapshotFormatError("not a ConsumeSafe snapshot file")
+    if version != FORMAT_VERSION:
+        raise SnapshotFormatError(
+            f"snapshot format version {version} is not supported (expected {FORMAT_VERSION})"
+        )
+
+
+def open_snapshot(path: str) -> DatasetSnapshot:
+    """
+    Map a snapshot file and wrap it as a DatasetSnapshot
+
+    Columns and indexes read straight from the mapping; only small
+    tables (categorical values, token vocabularies) are copied into the
+    process.
+
+    Raises:
+        SnapshotFormatError: The file is not a readable snapshot
+    """
+    with open(path, "rb") as f:
+        try:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise SnapshotFormatError("snapshot file is empty")
+    if len(mapping) < _HEADER.size:
+        raise SnapshotFormatError("snapshot file is truncated")
+    magic, version, length = _HEADER.unpack_from(mapping, 0)
+    _check_header(magic, version)
+    manifest = json.loads(mapping[_HEADER.size:_HEADER.size + length])
+    if manifest["byteorder"] != sys.byteorder:
+        raise SnapshotFormatError(f"snapshot was written on a {manifest['byteorder']}-endian host")
+    base = _HEADER.size + length
+    base += -base % _ALIGN
+    reader = _SectionReader(memoryview(mapping), base, manifest["sections"])
+
+    size = manifest["rows"]
+    columns = {}
+    for name, kind in manifest["columns"].items():
+        section = f"column/{name}"
+        if kind == "coded":
+            values = list(reader.strings(section + ".values"))
+            columns[name] = _restore(
+                CodedColumn, values=values, codes=reader.array(section + ".codes"),
+                lookup={value: code for code, value in enumerate(values)}
+            )
+        elif kind == "int":
+            columns[name] = IntColumn(reader.array(section + ".numbers"))
+        else:
+            columns[name] = reader.strings(section)
+    products = ProductStore(manifest["fieldnames"], columns, size)
+
+    for name in manifest["value_indexes"]:
+        column = products.column(name)
+        keys = reader.strings(f"values/{name}.keys")
+        postings = dict(zip(keys, reader.postings(f"values/{name}")))
+        codes = {}
+        if isinstance(column, CodedColumn):
+            for code, value in enumerate(column.values):
+                codes.setdefault((value or "").lower(), set()).add(code)
+        products.value_indexes[name] = _restore(ValueIndex, column=column,
+                                                postings=postings, codes=codes)
+
+    indexes = {}
+    for field in manifest["token_indexes"]:
+        section = f"tokens/{field}"
+        if reader.has(section + ".values.offsets"):
+            values = reader.strings(section + ".values")
+        else:
+            values = products.column(field)
+        indexes[field] = _restore(
+            TokenIndex, values=values,
+            tokens=reader.strings(section + ".tokens"),
+            postings=reader.postings(section),
+            _vocab=str(reader.array(section + ".vocab"), "utf-8"),
+            _suffixes=reader.array(section + ".suffixes"),
+            _suffix_owners=reader.array(section + ".owners"),
+        )
+
+    trigram = manifest["trigram"]
+    trigram_index = _restore(
+        TrigramIndex,
+        columns={field: indexes[field].values for field in trigram["fields"]},
+        row_count=trigram["row_count"],
+        postings=PostingMap(reader.strings("trigram.keys"), reader.postings("trigram")),
+    )
+
+    trie = MappedTrie(reader.array("suggest.trie.edges"), reader.strings("suggest.trie.labels"),
+                      reader.array("suggest.trie.children"), reader.postings("suggest.trie.top"))
+    trie.top_k = manifest["autocomplete"]["top_k"]
+    autocomplete = _restore(
+        Autocomplete, trie=trie,
+        entries=MappedEntries(reader.strings("suggest.texts"), reader.array("suggest.kinds"),
+                              reader.array("suggest.rows")),
+    )
+
+    return DatasetSnapshot(products, indexes=indexes, trigram_index=trigram_index,
+                           autocomplete=autocomplete, mapping=mapping,
+                           content_hash=manifest["content_hash"])
+
+
+def is_fresh(manifest: Dict[str, Any], csv_path: str) -> bool:
+    """Whether a snapshot was built from the CSV as it is now"""
+    try:
+        return manifest.get("source") == source_info(csv_path)
+    except OSError:
+        # No CSV next to it: the snapshot is all there is
+        return True
+
+
+# ============ COMMAND LINE ============
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m app.snapshot_file",
+        description="Compile the boycott catalog CSV into a memory-mapped snapshot file"
+    )
+    parser.add_argument("csv", help="catalog CSV with a header row")
+    parser.add_argument("-o", "--output", help="snapshot path (default: CSV path with .snap)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    output = compile_csv(args.csv, args.output)
+    manifest = read_manifest(output)
+    print(f"Wrote {output}: {manifest['rows']} products, "
+          f"{os.path.getsize(output) / 2**20:.1f} MiB in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
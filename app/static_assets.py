@@ -0,0 +1,115 @@
+"""
+Static Assets - In-memory, precompressed static files
+"""
+import gzip
+import hashlib
+import logging
+import threading
+from email.utils import formatdate
+from typing import Dict, Optional, Tuple
+
+from app.dataset import DatasetWatcher, file_signature
+from app.response_cache import accepts_encoding, etag_matches
+
+logger = logging.getLogger(__name__)
+
+GZIP_LEVEL = 9
+
+
+class AssetVersion:
+    """One version of a file: its bytes, every encoding of them, and validators"""
+
+    __slots__ = ("signature", "etag", "last_modified", "bodies")
+
+    def __init__(self, signature: Tuple[int, int, int], body: bytes):
+        self.signature = signature
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        self.last_modified = formatdate(signature[0] / 1e9, usegmt=True)
+        # Preferred encodings first; gzip is kept only if it is smaller
+        self.bodies: Dict[str, bytes] = {}
+        compressed = gzip.compress(body, GZIP_LEVEL, mtime=0)
+        if len(compressed) < len(body):
+            self.bodies["gzip"] = compressed
+        self.bodies["identity"] = body
+
+    def encoded_etag(self, encoding: str) -> str:
+        """Entity tag of the body in an encoding"""
+        return self.etag if encoding == "identity" else self.etag[:-1] + '-' + encoding + '"'
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """Whether an If-None-Match header names this version, in any encoding"""
+        return any(etag_matches(if_none_match, self.encoded_etag(encoding)) for encoding in self.bodies)
+
+    def select(self, accept_encoding: Optional[str]) -> Tuple[str, bytes]:
+        """Best encoding the client accepts, and its body"""
+        for encoding, body in self.bodies.items():
+            if encoding == "identity" or accepts_encoding(accept_encoding, encoding):
+                return encoding, body
+        return "identity", self.bodies["identity"]
+
+
+class StaticAsset:
+    """
+    A static file served from memory.
+
+    The file is read and gzipped once, on first use, so a request only
+    picks the bytes matching its Accept-Encoding: no disk read and no
+    compression per request. `watch` polls the file in a background
+    thread and rebuilds everything there when it changes; requests keep
+    the previous version until the new one is swapped in.
+    """
+
+    def __init__(self, path: str, media_type: str):
+        self.path = path
+        self.media_type = media_type
+        self.builds = 0
+        self._current: Optional[AssetVersion] = None
+        self._lock = threading.Lock()
+        self._watcher: Optional[DatasetWatcher] = None
+
+    @property
+    def current(self) -> Optional[AssetVersion]:
+        """Version being served, built on first use; None while the file is unreadable"""
+        if self._current is None:
+            with self._lock:
+                if self._current is None:
+                    self.reload()
+        return self._current
+
+    def _build(self) -> AssetVersion:
+        signature = file_signature(self.path)
+        with open(self.path, "rb") as f:
+            body = f.read()
+        self.builds += 1
+        return AssetVersion(signature, body)
+
+    def reload(self) -> bool:
+        """Rebuild from the file on disk, keeping the current version on failure"""
+        try:
+            self._current = self._build()
+        except OSError as e:
+            logger.error(f"Failed to reload {self.path}: {e}")
+            return False
+        return True
+
+    def watch(self, interval: float):
+        """Rebuild automatically whenever the file changes"""
+        if self._watcher is not None:
+            return
+        current = self.current
+        signature = current.signature if current is not None else None
+        self._watcher = DatasetWatcher(self.path, self.reload, interval, signature)
+        self._watcher.start()
+
+    def stop_watching(self):
+        """Stop the file watcher, if running"""
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
+
+    def stats(self) -> Dict[str, int]:
+        """Size of each encoding and the number of builds"""
+        current = self._current
+        stats = {encoding: len(body) for encoding, body in current.bodies.items()} if current else {}
+        stats["builds"] = self.builds
+        return stats
@@ -0,0 +1,190 @@
+"""
+Sync - Change log between dataset snapshots for delta sync
+"""
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.dataset import DatasetSnapshot
+from app.product_store import ID_COLUMN
+
+# Snapshots a client may be behind and still get a delta
+MAX_VERSIONS = 50
+
+
+def snapshot_version(snapshot: DatasetSnapshot) -> str:
+    """Version clients sync from: the snapshot's entity tag, unquoted"""
+    return snapshot.etag.strip('"')
+
+
+def _id_order(product_id: str) -> Tuple[int, Any]:
+    """Numeric ids in numeric order, before any others"""
+    # ASCII only: isdigit() also accepts digits like '²' that int() rejects
+    if product_id.isascii() and product_id.isdigit():
+        return (0, int(product_id))
+    return (1, product_id)
+
+
+class _Indexed:
+    """One snapshot with the row and content hash of each product id"""
+
+    __slots__ = ("snapshot", "version", "rows", "fingerprints")
+
+    def __init__(self, snapshot: DatasetSnapshot):
+        products = snapshot.products
+        columns = [products.column(name) for name in products.fieldnames]
+        ids = products.column(ID_COLUMN)
+        self.snapshot = snapshot
+        self.version = snapshot_version(snapshot)
+        # Rows without an id cannot be tracked; a repeated id keeps its last row
+        self.rows: Dict[str, int] = {}
+        self.fingerprints: Dict[str, int] = {}
+        for row in range(len(products)):
+            product_id = ids[row]
+            if product_id:
+                self.rows[product_id] = row
+                self.fingerprints[product_id] = hash(tuple(column[row] for column in columns))
+
+
+class ChangeLog:
+    """
+    Product ids added, removed and modified between consecutive snapshots.
+
+    Each published snapshot is compared with the previous one by row
+    content, keyed by product id. The last `max_versions` steps are
+    kept, so a client holding any of those versions can be sent just
+    the rows that changed since, however many reloads happened in
+    between. Only the current snapshot's rows are held; older versions
+    are remembered as sets of ids. The first snapshot is indexed on first
+    use rather than at startup. All methods are thread-safe.
+    """
+
+    def __init__(self, snapshot: DatasetSnapshot, max_versions: int = MAX_VERSIONS):
+        self.max_versions = max_versions
+        self._snapshot = snapshot
+        self._current: Optional[_Indexed] = None
+        # (from version, to version, added, removed, modified), oldest first
+        self._steps: "deque[Tuple[str, str, Set[str], Set[str], Set[str]]]" = deque(maxlen=max_versions)
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> str:
+        """Version of the latest recorded snapshot"""
+        return snapshot_version(self._snapshot)
+
+    def _indexed(self) -> _Indexed:
+        # Called with the lock held
+        if self._current is None:
+            self._current = _Indexed(self._snapshot)
+        return self._current
+
+    def record(self, snapshot: DatasetSnapshot):
+        """
+        Log the changes a newly published snapshot brings
+
+        Usable as a dataset listener. Snapshots older than the latest
+        recorded one are ignored, so readers may also call it to catch
+        up with a swap whose listeners have not run yet.
+        """
+        if snapshot.version <= self._snapshot.version:
+            return
+        indexed = _Indexed(snapshot)
+        with self._lock:
+            if snapshot.version <= self._snapshot.version:
+                return
+            old = self._indexed()
+            self._snapshot, self._current = snapshot, indexed
+            if indexed.version == old.version:
+                # Same content reloaded
+                return
+            new_fingerprints, old_fingerprints = indexed.fingerprints, old.fingerprints
+            added = new_fingerprints.keys() - old_fingerprints.keys()
+            removed = old_fingerprints.keys() - new_fingerprints.keys()
+            modified = {
+                product_id for product_id, fingerprint in new_fingerprints.items()
+                if product_id in old_fingerprints and old_fingerprints[product_id] != fingerprint
+            }
+            self._steps.append((old.version, indexed.version, added, removed, modified))
+
+    def knows(self, version: Optional[str]) -> bool:
+        """Whether a delta can be computed from a version"""
+        with self._lock:
+            if version == snapshot_version(self._snapshot):
+                return True
+            return any(step[0] == version for step in self._steps)
+
+    def changes_since(self, version: str) -> Optional[Dict[str, List[str]]]:
+        """
+        Ids changed between a version and the current one
+
+        Returns:
+            Sorted "added", "removed" and "modified" ids, or None if the
+            version is unknown or older than the log
+        """
+        return self._delta(version)[1]
+
+    def _delta(self, version: Optional[str]) -> Tuple[_Indexed, Optional[Dict[str, List[str]]]]:
+        """The current snapshot and its changes since a version"""
+        with self._lock:
+            current = self._indexed()
+            steps = list(self._steps)
+        if version == current.version:
+            return current, {"added": [], "removed": [], "modified": []}
+        # The latest step from that version: content may come back to an earlier state
+        for start in range(len(steps) - 1, -1, -1):
+            if steps[start][0] == version:
+                break
+        else:
+            return current, None
+
+        # Whether each touched id existed at the client's version: known
+        # from the first step that touched it
+        existed: Dict[str, bool] = {}
+        for _, _, added, removed, modified in steps[start:]:
+            for product_id in added:
+                existed.setdefault(product_id, False)
+            for product_id in removed | modified:
+                existed.setdefault(product_id, True)
+
+        changes = {"added": [], "removed": [], "modified": []}
+        for product_id, was_there in existed.items():
+            if product_id in current.rows:
+                changes["modified" if was_there else "added"].append(product_id)
+            elif was_there:
+                changes["removed"].append(product_id)
+        for ids in changes.values():
+            ids.sort(key=_id_order)
+        return current, changes
+
+    def sync(self, since: Optional[str]) -> Dict[str, Any]:
+        """
+        Body of a sync request: the rows changed since a version, or the
+        whole catalog when there is no usable version
+        """
+        current, changes = self._delta(since)
+        products = current.snapshot.products
+        version = current.version
+        if changes is None:
+            return {
+                "version": version,
+                "since": since,
+                "full": True,
+                "products": [product.copy() for product in products],
+            }
+        rows = current.rows
+        return {
+            "version": version,
+            "since": since,
+            "full": False,
+            "added": [products[rows[product_id]].copy() for product_id in changes["added"]],
+            "modified": [products[rows[product_id]].copy() for product_id in changes["modified"]],
+            "removed": changes["removed"],
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Current version and the versions a delta can start from"""
+        with self._lock:
+            return {
+                "version": snapshot_version(self._snapshot),
+                "versions": [step[0] for step in self._steps],
+            }
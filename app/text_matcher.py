@@ -0,0 +1,296 @@
+"""
+Text Matcher - Aho-Corasick automaton for finding many names in free text
+"""
+import unicodedata
+from array import array
+from bisect import bisect_left
+from collections import deque
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+
+class AhoCorasick:
+    """
+    Multi-pattern substring matcher.
+
+    Finds every occurrence of every pattern (overlaps included) in one
+    left-to-right pass over the text, whatever the number of patterns.
+
+    The automaton is stored as flat arrays rather than one dict per
+    state: the transitions of state s are the characters
+    ``labels[offsets[s]:offsets[s + 1]]`` (sorted) leading to the states
+    in ``children`` at the same positions, so a transition is one
+    ``str.find`` over a short slice.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns = sorted(set(p for p in patterns if p))
+        self._build_trie()
+        self._build_links()
+
+    def _build_trie(self):
+        """Breadth-first trie over the sorted patterns"""
+        patterns = self.patterns
+        offsets = array("I", [0])
+        children = array("I")
+        terminal = array("i")
+        depths = array("I")
+        labels = []
+
+        # Each queued state is the run patterns[lo:hi] sharing a prefix of length `depth`
+        queue = deque([(0, len(patterns), 0)])
+        next_state = 1
+        while queue:
+            lo, hi, depth = queue.popleft()
+            depths.append(depth)
+            if lo < hi and len(patterns[lo]) == depth:
+                terminal.append(lo)
+                lo += 1
+            else:
+                terminal.append(-1)
+            while lo < hi:
+                char = patterns[lo][depth]
+                if hi - lo == 1:
+                    end = hi
+                else:
+                    prefix = patterns[lo][:depth]
+                    end = bisect_left(patterns, prefix + chr(ord(char) + 1), lo, hi) \
+                        if ord(char) < 0x10FFFF else hi
+                labels.append(char)
+                children.append(next_state)
+                next_state += 1
+                queue.append((lo, end, depth + 1))
+                lo = end
+            offsets.append(len(children))
+
+        self.labels = "".join(labels)
+        self.offsets = offsets
+        self.children = children
+        self.terminal = terminal
+        self.depths = depths
+
+    def _build_links(self):
+        """Failure links, and links to the next state on the chain that ends a pattern"""
+        size = len(self.terminal)
+        fail = array("I", bytes(4 * size))
+        output = array("i", [-1]) * size
+        labels, offsets, children = self.labels, self.offsets, self.children
+        terminal = self.terminal
+
+        # States are numbered breadth-first, so every state's failure
+        # target is already linked when its children are reached
+        for state in range(size):
+            for position in range(offsets[state], offsets[state + 1]):
+                child = children[position]
+                if state:
+                    char = labels[position]
+                    target = fail[state]
+                    while True:
+                        found = labels.find(char, offsets[target], offsets[target + 1])
+                        if found >= 0:
+                            fail[child] = children[found]
+                            break
+                        if not target:
+                            break
+                        target = fail[target]
+                target = fail[child]
+                output[child] = target if terminal[target] >= 0 else output[target]
+        self.fail = fail
+        self.output = output
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        """
+        Yield (start, end, pattern id) for every occurrence in the text
+
+        Occurrences come in order of their end position; patterns ending
+        at the same position come longest first.
+        """
+        labels, offsets, children = self.labels, self.offsets, self.children
+        fail, output, terminal, depths = self.fail, self.output, self.terminal, self.depths
+        state = 0
+        for index, char in enumerate(text):
+            while True:
+                found = labels.find(char, offsets[state], offsets[state + 1])
+                if found >= 0:
+                    state = children[found]
+                    break
+                if not state:
+                    break
+                state = fail[state]
+            match = state if terminal[state] >= 0 else output[state]
+            while match > 0:
+                end = index + 1
+                yield end - depths[match], end, terminal[match]
+                match = output[match]
+
+    def pattern_ids(self, text: str) -> set:
+        """Ids of the patterns occurring anywhere in the text"""
+        return {pattern_id for _, _, pattern_id in self.iter_matches(text)}
+
+
+def normalize_with_offsets(text: str) -> Tuple[str, array]:
+    """
+    Normalize like search_index.normalize_name (lowercase, accents
+    stripped, runs of non-word characters collapsed to one space) and
+    keep, for every output character, the index of the input character
+    it came from.
+    """
+    chars = []
+    positions = array("I")
+    pending_space = False
+    space_at = 0
+    for index, char in enumerate(text):
+        if char.isascii():
+            pieces = char.lower()
+        else:
+            decomposed = unicodedata.normalize("NFKD", char)
+            pieces = "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+        for piece in pieces:
+            if piece.isalnum() or piece == "_":
+                if pending_space:
+                    chars.append(" ")
+                    positions.append(space_at)
+                    pending_space = False
+                chars.append(piece)
+                positions.append(index)
+            elif chars and not pending_space:
+                pending_space = True
+                space_at = index
+    return "".join(chars), positions
+
+
+# Kinds of catalog text a scan can match, best first
+SCAN_KINDS = ("product", "brand", "word")
+
+# Words of a multi-word name shorter than this are not matched on their own
+MIN_WORD_LENGTH = 4
+
+
+class CatalogScanner:
+    """
+    Finds boycotted product names, brands and significant name words in
+    free text such as an OCR'd receipt.
+
+    Names and text are normalized the same way (case, accents and
+    punctuation ignored). When the same text is both a name and a word
+    of other names, the best kind wins (product, then brand, then word)
+    and only the rows of that kind are reported.
+    """
+
+    def __init__(self, products: Sequence[Any]):
+        best = {}
+        for row, product in enumerate(products):
+            for rank, field in ((0, "boycott_product"), (1, "brand")):
+                normalized, _ = normalize_with_offsets(product.get(field) or "")
+                if not normalized:
+                    continue
+                self._add(best, normalized, rank, row)
+                words = normalized.split(" ")
+                if len(words) > 1:
+                    for word in words:
+                        if len(word) >= MIN_WORD_LENGTH:
+                            self._add(best, word, 2, row)
+
+        self.automaton = AhoCorasick(best)
+        self.kinds = array("B", (best[p][0] for p in self.automaton.patterns))
+        self.rows = [best[p][1] for p in self.automaton.patterns]
+
+    @staticmethod
+    def _add(best: Dict[str, List[Any]], pattern: str, rank: int, row: int):
+        entry = best.get(pattern)
+        if entry is None or rank < entry[0]:
+            best[pattern] = [rank, array("I", [row])]
+        elif rank == entry[0] and entry[1][-1] != row:
+            entry[1].append(row)
+
+    def scan(self, text: str, whole_words: bool = True) -> List[Dict[str, Any]]:
+        """
+        Find catalog names in text
+
+        Args:
+            text: Free text, e.g. a receipt
+            whole_words: Only report matches that start and end on word
+                boundaries ("nestle" but not inside "unnestled")
+
+        Returns:
+            Matches ordered by position, each with the original `start`/
+            `end` offsets and `text`, the matched `pattern`, its `kind`
+            and the catalog `rows` it refers to. A match lying inside a
+            longer match is dropped.
+        """
+        normalized, positions = normalize_with_offsets(text)
+        found = []
+        for start, end, pattern_id in self.automaton.iter_matches(normalized):
+            if whole_words and (
+                (start and normalized[start - 1] != " ")
+                or (end < len(normalized) and normalized[end] != " ")
+            ):
+                continue
+            found.append((start, -end, pattern_id))
+
+        matches = []
+        covered = 0
+        for start, end, pattern_id in sorted(found):
+            end = -end
+            if end <= covered:
+                continue
+            covered = end
+            original_start = positions[start]
+            original_end = positions[end - 1] + 1
+            # Keep combining accents that follow the last character
+            while original_end < len(text) and unicodedata.combining(text[original_end]):
+                original_end += 1
+            matches.append({
+                "start": original_start,
+                "end": original_end,
+                "text": text[original_start:original_end],
+                "pattern": self.automaton.patterns[pattern_id],
+                "kind": SCAN_KINDS[self.kinds[pattern_id]],
+                "rows": list(self.rows[pattern_id]),
+            })
+        return matches
+
+
+class FirstRowMatcher:
+    """
+    Earliest catalog row having a pattern that occurs in a text.
+
+    Answers "first row r, in catalog order, such that any pattern of r is
+    a substring of the text" with one automaton pass instead of a loop
+    over the catalog. Patterns come in named groups sharing a single
+    automaton, and each lookup names the group it asks about. An empty
+    pattern occurs in every text.
+    """
+
+    def __init__(self, groups: Dict[str, Iterable[Tuple[str, int]]]):
+        first = {}
+        self.always = {}
+        for group, patterns in groups.items():
+            first[group] = rows = {}
+            always = None
+            for pattern, row in patterns:
+                if not pattern:
+                    if always is None or row < always:
+                        always = row
+                elif row < rows.get(pattern, row + 1):
+                    rows[pattern] = row
+            self.always[group] = always
+
+        self.automaton = AhoCorasick(p for rows in first.values() for p in rows)
+        self.rows = {
+            group: array("i", (rows.get(pattern, -1) for pattern in self.automaton.patterns))
+            for group, rows in first.items()
+        }
+
+    def first_row(self, group: str, *texts: str) -> Optional[int]:
+        """Smallest row with a pattern of the group in any of the texts, or None"""
+        best = self.always[group]
+        rows = self.rows[group]
+        for text in texts:
+            for _, _, pattern_id in self.automaton.iter_matches(text):
+                row = rows[pattern_id]
+                if row >= 0 and (best is None or row < best):
+                    best = row
+        return best
@@ -0,0 +1,101 @@
+"""
+Chat benchmark: product extraction by catalog scan vs compiled matcher,
+and FAQ answers rebuilt per message vs cached per catalog version.
+
+Usage:
+    python -m benchmarks.bench_chat --sizes 1000 10000 100000
+"""
+
+import argparse
+import random
+import time
+
+from app.ai_service import AIService
+from app.product_store import ProductStore
+from benchmarks.catalog import synthetic_catalog
+
+
+def scan_extract_product(products, message):
+    """The original AIService._extract_product loop."""
+    message_lower = message.lower()
+    normalized_msg = message_lower.replace("-", " ").replace("'", "")
+    for product in products:
+        product_name = product.get('boycott_product', '').lower()
+        brand = product.get('brand', '').lower()
+        normalized_product = product_name.replace("-", " ").replace("'", "")
+        normalized_brand = brand.replace("-", " ").replace("'", "")
+        if product_name in message_lower or brand in message_lower:
+            return product_name
+        if normalized_product in normalized_msg or normalized_brand in normalized_msg:
+            return product_name
+        for word in normalized_product.split() + normalized_brand.split():
+            if len(word) > 3 and word in normalized_msg:
+                return product_name
+    return None
+
+
+def uncached_faq_answer(service, message):
+    """The original intent checks, building the answer every time."""
+    message_lower = message.lower()
+    if any(word in message_lower for word in ["produits", "products", "boycotter", "boycott", "listes", "list"]):
+        return service._answer_why_boycott()
+    elif any(word in message_lower for word in ["pourquoi", "why", "raison", "reason"]):
+        return service._answer_why_boycott()
+    elif any(word in message_lower for word in ["alternative", "remplacer", "autre", "tunisien", "replace"]):
+        return service._find_alternative("")
+    elif any(word in message_lower for word in ["stats", "statistiques", "nombre", "total", "combien"]):
+        return service._get_chat_statistics()
+    elif any(word in message_lower for word in ["palestine", "enfants", "children", "guerre", "war"]):
+        return service._answer_palestine_support()
+    return service._generate_general_response(message)
+
+
+FAQ_MESSAGES = ["Statistiques?", "Pourquoi boycotter?", "Palestine", "hello", "combien de marques"]
+
+
+def per_message(func, messages):
+    start = time.perf_counter()
+    for message in messages:
+        func(message)
+    return (time.perf_counter() - start) / len(messages) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--messages", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    print(f"{'products':>9} {'build':>9} {'scan ms/msg':>12} {'compiled ms/msg':>16}"
+          f" {'faq ms/msg':>11} {'cached ms/msg':>14}")
+    for size in args.sizes:
+        catalog = synthetic_catalog(size)
+        products = ProductStore.from_dicts(catalog)
+        messages = [
+            f"Est-ce que {rng.choice(catalog)['boycott_product'].lower()} est boycotté?"
+            if rng.random() < 0.5 else "Pourquoi boycotter? Quelles alternatives tunisiennes?"
+            for _ in range(args.messages)
+        ]
+
+        start = time.perf_counter()
+        service = AIService(products)
+        build = time.perf_counter() - start
+
+        sample = messages[:20]
+        for message in sample:
+            assert service._extract_product(message) == scan_extract_product(products, message)
+        scan = per_message(lambda m: scan_extract_product(products, m), sample)
+        compiled = per_message(service._extract_product, messages)
+
+        faq = FAQ_MESSAGES * 20
+        for message in FAQ_MESSAGES:
+            assert service._cached_response("intent", service._detect_intent(message)) \
+                == uncached_faq_answer(service, message)
+        rebuilt = per_message(lambda m: uncached_faq_answer(service, m), faq)
+        cached = per_message(lambda m: service._cached_response("intent", service._detect_intent(m)), faq)
+        print(f"{size:>9} {build:>8.2f}s {scan:>12.3f} {compiled:>16.3f} {rebuilt:>11.3f} {cached:>14.4f}")
+
+
+if __name__ == "__main__":
+    main()
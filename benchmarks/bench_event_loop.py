@@ -0,0 +1,64 @@
+"""
+Event loop stall benchmark: AI work called inline vs through the AI executor.
+
+A ticker coroutine stands in for cheap requests such as /api/check and
+records how late each of its 1ms sleeps wakes up while a large sentiment
+batch runs.
+
+Usage:
+    python -m benchmarks.bench_event_loop --texts 20000
+"""
+
+import argparse
+import asyncio
+import time
+
+from app.ai_executor import AIExecutor
+from app.ai_service import AIService
+from app.product_store import ProductStore
+from benchmarks.bench_sentiment import synthetic_feedback
+from benchmarks.catalog import synthetic_catalog
+
+
+async def measure(work):
+    lags = []
+    done = False
+
+    async def ticker():
+        while not done:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - start - 0.001)
+
+    task = asyncio.ensure_future(ticker())
+    await asyncio.sleep(0.01)
+    await work()
+    done = True
+    await task
+    lags.sort()
+    return lags[int(len(lags) * 0.99)] * 1000, lags[-1] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--texts", type=int, default=20_000)
+    args = parser.parse_args()
+
+    service = AIService(ProductStore.from_dicts(synthetic_catalog(1000)))
+    texts = synthetic_feedback(args.texts)
+    executor = AIExecutor(service, workers=2)
+
+    async def inline():
+        service.analyze_sentiment_batch(texts)
+
+    async def offloaded():
+        await executor.run("analyze_sentiment_batch", texts)
+
+    for name, work in (("inline", inline), ("executor", offloaded)):
+        p99, worst = asyncio.run(measure(work))
+        print(f"{name:>9}: ticker lag p99 {p99:8.2f}ms  max {worst:8.2f}ms")
+    executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
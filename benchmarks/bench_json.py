@@ -0,0 +1,73 @@
+"""
+Listing serialization benchmark: per-request dicts vs cached row fragments.
+
+Usage:
+    python -m benchmarks.bench_json --rows 100000 --requests 200
+"""
+
+import argparse
+import random
+import time
+from itertools import islice
+
+from app.fast_json import RowShape, orjson
+from app.product_store import ProductStore
+from app.response_cache import encode_json
+from benchmarks.catalog import synthetic_catalog
+
+FIELDS = [
+    ("id", "id"),
+    ("Product Name", "boycott_product"),
+    ("Brand", "brand"),
+    ("Category", "category"),
+    ("Reason", "reason"),
+    ("Intensity", "intensity"),
+    ("Tunisian Alternative", "tunisian_alternative"),
+    ("Alternative Brand", "alternative_brand"),
+]
+
+
+def dict_listing(store, category, limit):
+    """The original /api/products body: a fresh dict per row, stdlib json."""
+    rows = islice(store.iter_where(category=category), limit)
+    return encode_json([{key: row.get(column) for key, column in FIELDS} for row in rows])
+
+
+def timed(label, func, requests):
+    start = time.perf_counter()
+    for category in requests:
+        func(category)
+    elapsed = (time.perf_counter() - start) / len(requests) * 1000
+    print(f"  {label:<28} {elapsed:10.3f} ms/request")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    store = ProductStore.from_dicts(synthetic_catalog(args.rows))
+    categories = sorted(store.value_counts("category"))
+    requests = [rng.choice(categories + [None]) for _ in range(args.requests)]
+    shape = RowShape(FIELDS)
+
+    def fragment_listing(category):
+        rows = islice(store.iter_where(category=category), args.limit)
+        return shape.encode_rows(rows).data
+
+    for category in categories:
+        assert fragment_listing(category) == dict_listing(store, category, args.limit)
+    store.row_fragments.clear()
+
+    print(f"Listings of {args.limit} rows ({args.rows} rows, orjson: {orjson is not None}):")
+    timed("dicts + json.dumps", lambda c: dict_listing(store, c, args.limit), requests)
+    timed("row fragments, first pass", fragment_listing, requests[:1])
+    timed("row fragments", fragment_listing, requests)
+
+
+if __name__ == "__main__":
+    main()
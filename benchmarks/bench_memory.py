@@ -0,0 +1,73 @@
+"""
+Memory benchmark: list of csv.DictReader rows vs the columnar ProductStore.
+
+Each layout is loaded in a fresh subprocess and measured with tracemalloc
+(bytes still allocated once loading is done).
+
+Usage:
+    python -m benchmarks.bench_memory --rows 1000000
+"""
+
+import argparse
+import csv
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.catalog import FIELDNAMES, synthetic_catalog
+
+
+def load(layout, path):
+    if layout == "dicts":
+        with open(path, encoding="utf-8") as f:
+            return list(csv.DictReader(f))
+    from app.product_store import ProductStore
+    return ProductStore.from_csv(path)
+
+
+def measure(layout, path):
+    """Run in a subprocess: print retained bytes and load time."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    products = load(layout, path)
+    elapsed = time.perf_counter() - start
+    retained, _ = tracemalloc.get_traced_memory()
+    print(retained, elapsed, len(products))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--measure", nargs=2, metavar=("LAYOUT", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(*args.measure)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "catalog.csv")
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+            writer.writeheader()
+            writer.writerows(synthetic_catalog(args.rows))
+
+        results = {}
+        for layout in ("dicts", "store"):
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_memory", "--measure", layout, path],
+                check=True, capture_output=True, text=True
+            ).stdout.split()
+            retained, elapsed, count = int(output[0]), float(output[1]), int(output[2])
+            results[layout] = retained
+            print(f"{layout:<6} {count} rows: {retained / 2**20:8.1f} MiB "
+                  f"({retained / count:6.0f} B/row), loaded in {elapsed:.1f}s")
+
+        print(f"\nReduction: {results['dicts'] / results['store']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
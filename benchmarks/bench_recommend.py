@@ -0,0 +1,83 @@
+"""
+Recommendation benchmark: catalog scan vs category index, and the
+TF-IDF similarity mode.
+
+Usage:
+    python -m benchmarks.bench_recommend --sizes 1000 10000 100000
+"""
+
+import argparse
+import random
+import time
+
+from app.ai_service import AIService
+from app.product_store import ProductStore
+from benchmarks.catalog import synthetic_catalog
+
+
+def scan_recommendations(service, user_history, limit=5):
+    """The original AIService.get_recommendations."""
+    recommendations = []
+    viewed_categories = set()
+    for product_name in user_history:
+        for product in service.products:
+            if product_name.lower() in product.get('boycott_product', '').lower():
+                viewed_categories.add(product.get('category', ''))
+    for product in service.products:
+        if product.get('category', '') in viewed_categories:
+            recommendations.append({
+                "product": product.get('boycott_product'),
+                "brand": product.get('brand'),
+                "alternative": product.get('tunisian_alternative'),
+                "category": product.get('category'),
+                "score": service._calculate_relevance_score(product, viewed_categories)
+            })
+    recommendations.sort(key=lambda x: x['score'], reverse=True)
+    return recommendations[:limit]
+
+
+def per_request(func, histories):
+    start = time.perf_counter()
+    for history in histories:
+        func(history)
+    return (time.perf_counter() - start) / len(histories) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--history", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(12)
+    print(f"{'products':>9} {'build':>9} {'scan ms/req':>12} {'index ms/req':>13}"
+          f" {'tfidf build':>12} {'tfidf ms/req':>13}")
+    for size in args.sizes:
+        catalog = synthetic_catalog(size)
+        products = ProductStore.from_dicts(catalog)
+        histories = [
+            [rng.choice(catalog)['boycott_product'].split()[0] for _ in range(args.history)]
+            for _ in range(args.requests)
+        ]
+
+        start = time.perf_counter()
+        service = AIService(products)
+        build = time.perf_counter() - start
+
+        sample = histories[:5]
+        for history in sample:
+            assert service.get_recommendations(history) == scan_recommendations(service, history)
+        scan = per_request(lambda h: scan_recommendations(service, h), sample)
+        indexed = per_request(service.get_recommendations, histories)
+
+        start = time.perf_counter()
+        service._similarity_index()
+        tfidf_build = time.perf_counter() - start
+        similar = per_request(lambda h: service.get_recommendations(h, mode="similarity"), histories)
+        print(f"{size:>9} {build:>8.2f}s {scan:>12.3f} {indexed:>13.3f}"
+              f" {tfidf_build:>11.2f}s {similar:>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
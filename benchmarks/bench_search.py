@@ -0,0 +1,88 @@
+"""
+Search benchmark: linear scan vs token index vs trigram index.
+
+Usage:
+    python -m benchmarks.bench_search --rows 100000 --queries 200
+"""
+
+import argparse
+import random
+import time
+
+from app.search_index import TokenIndex, TrigramIndex, substring_distance, default_max_edits
+from benchmarks.catalog import synthetic_catalog, misspell
+
+FIELDS = ("boycott_product", "brand", "tunisian_alternative")
+
+
+def linear_search(catalog, query):
+    """The original BoycottData scan."""
+    query_lower = query.lower()
+    return [row for row, product in enumerate(catalog)
+            if any(query_lower in product[field].lower() for field in FIELDS)]
+
+
+def linear_fuzzy(catalog, query):
+    """Edit-distance check of every row."""
+    query_lower = query.lower()
+    max_edits = default_max_edits(query_lower)
+    return [row for row, product in enumerate(catalog)
+            if min(substring_distance(query_lower, product[field].lower(), max_edits)
+                   for field in FIELDS) <= max_edits]
+
+
+def timed(label, func, queries):
+    start = time.perf_counter()
+    for query in queries:
+        func(query)
+    elapsed = (time.perf_counter() - start) / len(queries) * 1000
+    print(f"  {label:<28} {elapsed:10.3f} ms/query")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    catalog = synthetic_catalog(args.rows)
+    columns = {field: [p[field] for p in catalog] for field in FIELDS}
+
+    start = time.perf_counter()
+    token_indexes = {field: TokenIndex(values) for field, values in columns.items()}
+    print(f"Token index build:   {time.perf_counter() - start:.2f}s")
+    start = time.perf_counter()
+    trigram_index = TrigramIndex(columns)
+    print(f"Trigram index build: {time.perf_counter() - start:.2f}s")
+
+    names = [rng.choice(catalog)["boycott_product"] for _ in range(args.queries)]
+    substrings = []
+    for name in names:
+        start = rng.randrange(0, max(1, len(name) - 4))
+        substrings.append(name[start:start + rng.randint(4, 10)])
+    typos = [misspell(name, rng) for name in names]
+
+    def token_search(query):
+        rows = set()
+        for index in token_indexes.values():
+            rows.update(index.search(query))
+        return sorted(rows)
+
+    for query in substrings[:20]:
+        assert token_search(query) == linear_search(catalog, query) == trigram_index.search(query)
+
+    print(f"\nSubstring queries ({args.rows} rows):")
+    timed("linear scan", lambda q: linear_search(catalog, q), substrings[:20])
+    timed("token index", token_search, substrings)
+    timed("trigram index", trigram_index.search, substrings)
+
+    # The linear fuzzy scan is very slow on large catalogs: sample a few
+    print(f"\nFuzzy queries ({args.rows} rows):")
+    timed("linear edit-distance scan", lambda q: linear_fuzzy(catalog, q), typos[:2])
+    timed("trigram count filter", trigram_index.fuzzy_search, typos)
+
+
+if __name__ == "__main__":
+    main()
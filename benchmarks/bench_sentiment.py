@@ -0,0 +1,74 @@
+"""
+Sentiment benchmark: per-keyword scans vs one compiled pass, and the
+process pool for large batches.
+
+Usage:
+    python -m benchmarks.bench_sentiment --texts 100000 --processes 4
+"""
+
+import argparse
+import random
+import time
+
+from app.feedback import (
+    CATEGORY_KEYWORDS, NEGATIVE_WORDS, POSITIVE_WORDS, analyze_feedback, analyze_feedback_batch,
+)
+
+
+def categorize(text_lower):
+    for category, words in CATEGORY_KEYWORDS:
+        if any(word in text_lower for word in words):
+            return category
+    return "General"
+
+
+def scan_analysis(text):
+    """The original analyze_sentiment: a sentiment scan, then two category scans."""
+    text_lower = text.lower()
+    positive_count = sum(1 for word in POSITIVE_WORDS if word in text_lower)
+    negative_count = sum(1 for word in NEGATIVE_WORDS if word in text_lower)
+    if positive_count > negative_count:
+        label = "positive"
+    elif negative_count > positive_count:
+        label = "negative"
+    else:
+        label = "neutral"
+    category = categorize(text.lower())
+    return label, category, categorize(text.lower())
+
+
+def synthetic_feedback(count, seed=4):
+    rng = random.Random(seed)
+    words = ("the app is really great but the search page is a bit slow sometimes "
+             "merci pour cette application je cherche des produits tunisiens").split()
+    keywords = list(POSITIVE_WORDS + NEGATIVE_WORDS) + [w for _, ws in CATEGORY_KEYWORDS for w in ws]
+    return [" ".join(rng.choice(keywords) if rng.random() < 0.1 else rng.choice(words)
+                     for _ in range(rng.randint(10, 60)))
+            for _ in range(count)]
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--texts", type=int, default=100_000)
+    parser.add_argument("--processes", type=int, default=4)
+    args = parser.parse_args()
+
+    texts = synthetic_feedback(args.texts)
+    scan = timed(lambda: [scan_analysis(t) for t in texts])
+    compiled = timed(lambda: [analyze_feedback(t) for t in texts])
+    pooled = timed(lambda: analyze_feedback_batch(texts, args.processes))
+    per_text = 1e6 / len(texts)
+    print(f"{len(texts)} texts")
+    print(f"  keyword scans (analysis only):  {scan:.2f}s  {scan * per_text:.1f} us/text")
+    print(f"  compiled pass (full results):   {compiled:.2f}s  {compiled * per_text:.1f} us/text")
+    print(f"  {args.processes} processes (full results):   {pooled:.2f}s  {pooled * per_text:.1f} us/text")
+
+
+if __name__ == "__main__":
+    main()
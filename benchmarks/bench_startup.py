@@ -0,0 +1,86 @@
+"""
+Startup benchmark: parse the CSV and build indexes vs map a compiled snapshot.
+
+Each mode runs in a fresh subprocess; reported memory is what tracemalloc
+sees allocated by Python once loading is done (mapped pages live in the
+shared page cache and are not counted).
+
+Usage:
+    python -m benchmarks.bench_startup --rows 100000
+"""
+
+import argparse
+import csv
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.catalog import FIELDNAMES, synthetic_catalog
+
+
+def measure(mode, path):
+    """Run in a subprocess: print retained bytes, load time and a sample query."""
+    from app.dataset import DatasetSnapshot
+    from app.snapshot_file import open_snapshot
+
+    def load():
+        return DatasetSnapshot.from_csv(path) if mode == "csv" else open_snapshot(path)
+
+    start = time.perf_counter()
+    snapshot = load()
+    elapsed = time.perf_counter() - start
+
+    # Tracing slows loading down a lot: measure memory on a second load
+    del snapshot
+    tracemalloc.start()
+    snapshot = load()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    hits = len(snapshot.indexes["boycott_product"].search("ka"))
+    query = (time.perf_counter() - start) * 1000
+    print(retained, elapsed, len(snapshot.products), hits, query)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--measure", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(*args.measure)
+        return
+
+    from app.snapshot_file import compile_csv
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "catalog.csv")
+        with open(csv_path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+            writer.writeheader()
+            writer.writerows(synthetic_catalog(args.rows))
+
+        start = time.perf_counter()
+        snap_path = compile_csv(csv_path)
+        print(f"Compiled {os.path.getsize(snap_path) / 2**20:.1f} MiB snapshot "
+              f"in {time.perf_counter() - start:.1f}s\n")
+
+        for mode, path in (("csv", csv_path), ("snapshot", snap_path)):
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_startup", "--measure", mode, path],
+                check=True, capture_output=True, text=True
+            ).stdout.split()
+            retained, elapsed, count = int(output[0]), float(output[1]), int(output[2])
+            hits, query = int(output[3]), float(output[4])
+            print(f"{mode:<8} {count} rows: ready in {elapsed * 1000:9.1f} ms, "
+                  f"{retained / 2**20:7.1f} MiB private, "
+                  f"first query {query:.2f} ms ({hits} hits)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Synthetic boycott catalogs for benchmarks."""
+
+import random
+from typing import Dict, List
+
+FIELDNAMES = [
+    "id", "boycott_product", "brand", "category", "reason",
+    "tunisian_alternative", "alternative_brand", "intensity",
+]
+
+_SYLLABLES = [c + v for c in "bcdfghjklmnprstvwz" for v in "aeiou"] + [
+    c + v + e for c in "bcdgklmprst" for v in "aeiou" for e in "lnrs"
+]
+_CATEGORIES = [
+    "Beverages", "Food", "Snacks", "Dairy", "Coffee", "Cosmetics",
+    "Technology", "Fashion", "Cleaning", "Pet Food", "Fast Food", "Candy",
+]
+_REASONS = [
+    "Supporting Israeli occupation", "Financial support to Israel",
+    "Pro-Israel statements", "Financial backing of Israeli military",
+    "Operations in settlements", "Investment in Israeli economy",
+]
+_ALT_BRANDS = ["Tiba", "SFBT", "Kapelka", "Local", "Delice", "Vitalait", "Saida", "Jadida"]
+_INTENSITIES = ["High", "Medium", "Low"]
+
+
+def _word(rng: random.Random) -> str:
+    return "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+
+
+def synthetic_catalog(rows: int, seed: int = 42) -> List[Dict[str, str]]:
+    """Build rows shaped like data/boycott_products.csv."""
+    rng = random.Random(seed)
+    brands = [f"{_word(rng)} {rng.choice(['Group', 'Company', 'Inc', 'SA'])}"
+              for _ in range(max(1, rows // 20))]
+    catalog = []
+    for i in range(1, rows + 1):
+        catalog.append({
+            "id": str(i),
+            "boycott_product": " ".join(_word(rng) for _ in range(rng.randint(1, 3))),
+            "brand": rng.choice(brands),
+            "category": rng.choice(_CATEGORIES),
+            "reason": rng.choice(_REASONS),
+            "tunisian_alternative": f"{_word(rng)} {_word(rng)}",
+            "alternative_brand": rng.choice(_ALT_BRANDS),
+            "intensity": rng.choice(_INTENSITIES),
+        })
+    return catalog
+
+
+def misspell(text: str, rng: random.Random) -> str:
+    """Drop, swap or replace one character."""
+    if len(text) < 3:
+        return text
+    i = rng.randrange(1, len(text) - 1)
+    edit = rng.choice(["drop", "swap", "replace"])
+    if edit == "drop":
+        return text[:i] + text[i + 1:]
+    if edit == "swap":
+        return text[:i - 1] + text[i] + text[i - 1] + text[i + 1:]
+    return text[:i] + rng.choice("aeiou") + text[i + 1:]
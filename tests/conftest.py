@@ -0,0 +1,30 @@
+"""Fixtures shared by the test suite."""
+
+import csv
+
+import pytest
+
+CATALOG_FIELDNAMES = ["id", "boycott_product", "brand", "category", "reason",
+                      "tunisian_alternative", "alternative_brand", "intensity"]
+
+
+@pytest.fixture
+def fieldnames():
+    """Columns of the boycott catalog CSV, in file order."""
+    return list(CATALOG_FIELDNAMES)
+
+
+@pytest.fixture
+def write_catalog(fieldnames):
+    """Function writing a catalog CSV from names (ids 1, 2, ...) or {id: name}."""
+
+    def write(path, rows):
+        if not isinstance(rows, dict):
+            rows = dict(enumerate(rows, 1))
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(fieldnames)
+            for product_id, name in rows.items():
+                writer.writerow([product_id, name, f"{name} Co", "Food", "Reason", "Alt", "Local", "High"])
+
+    return write
@@ -0,0 +1,134 @@
+"""Tests for the executor running AI work off the event loop."""
+
+import asyncio
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.ai_executor import AIExecutor, ExecutorBusy
+from app.ai_service import AIService
+from app.product_store import ProductStore
+
+DATA_PATH = Path(__file__).parent.parent / "data" / "boycott_products.csv"
+
+
+class SlowService:
+    """Stand-in service whose calls block until released."""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def wait(self, value):
+        self.release.wait(5)
+        return value
+
+    def fail(self):
+        raise KeyError("boom")
+
+
+class TestThreadExecutor:
+    """Test the thread pool mode."""
+
+    def test_runs_service_methods(self):
+        """Test calls return the service's results."""
+        service = AIService(ProductStore.from_csv(str(DATA_PATH)))
+        executor = AIExecutor(service, workers=2)
+        try:
+            result = asyncio.run(executor.run("analyze_sentiment", "excellent"))
+            assert result == service.analyze_sentiment("excellent")
+            assert executor.stats()["completed"] == 1
+        finally:
+            executor.shutdown()
+
+    def test_loop_stays_free(self):
+        """Test other coroutines run while an AI call is blocked."""
+        service = SlowService()
+        executor = AIExecutor(service, workers=1)
+
+        async def scenario():
+            call = asyncio.ensure_future(executor.run("wait", 1))
+            ticks = 0
+            while executor.stats()["running"] == 0 or ticks < 5:
+                await asyncio.sleep(0.001)
+                ticks += 1
+            service.release.set()
+            return ticks, await call
+
+        try:
+            ticks, result = asyncio.run(scenario())
+            assert ticks >= 5 and result == 1
+        finally:
+            executor.shutdown()
+
+    def test_concurrency_limit_and_queue(self):
+        """Test extra calls wait, and are refused past the queue limit."""
+        service = SlowService()
+        executor = AIExecutor(service, workers=2, max_concurrency=1, max_queue=2)
+
+        async def scenario():
+            calls = [asyncio.ensure_future(executor.run("wait", i)) for i in range(3)]
+            await asyncio.sleep(0.05)
+            stats = executor.stats()
+            with pytest.raises(ExecutorBusy):
+                await executor.run("wait", 3)
+            service.release.set()
+            return stats, await asyncio.gather(*calls)
+
+        try:
+            stats, results = asyncio.run(scenario())
+            assert stats["running"] == 1 and stats["queued"] == 2
+            assert results == [0, 1, 2]
+            final = executor.stats()
+            assert final["rejected"] == 1 and final["completed"] == 3
+            assert final["running"] == 0 and final["queued"] == 0
+        finally:
+            executor.shutdown()
+
+    def test_failures_counted(self):
+        """Test errors reach the caller and free the slot."""
+        executor = AIExecutor(SlowService(), workers=1)
+        try:
+            with pytest.raises(KeyError):
+                asyncio.run(executor.run("fail"))
+            assert executor.stats()["failed"] == 1 and executor.stats()["running"] == 0
+        finally:
+            executor.shutdown()
+
+    def test_invalid_settings(self):
+        """Test bad modes and missing arguments are rejected."""
+        with pytest.raises(ValueError):
+            AIExecutor(SlowService(), mode="gpu")
+        with pytest.raises(ValueError):
+            AIExecutor(None)
+        with pytest.raises(ValueError):
+            AIExecutor(mode="process")
+
+
+class TestProcessExecutor:
+    """Test the process pool mode."""
+
+    def test_workers_load_catalog(self):
+        """Test workers answer from their own copy of the catalog."""
+        service = AIService(ProductStore.from_csv(str(DATA_PATH)))
+        executor = AIExecutor(mode="process", workers=1, data_path=str(DATA_PATH))
+
+        async def scenario():
+            return await asyncio.gather(
+                executor.run("respond", "Coca-Cola?"),
+                executor.run("get_recommendations", ["Pepsi"], 5, "category"),
+            )
+
+        try:
+            response, recommendations = asyncio.run(scenario())
+            assert response == service.respond("Coca-Cola?")
+            assert recommendations == service.get_recommendations(["Pepsi"])
+        finally:
+            executor.shutdown()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
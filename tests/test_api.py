@@ -1,3 +1,5 @@
+import json
+
 import pytest
 from fastapi.testclient import TestClient
 from app.main import app
@@ -36,6 +38,68 @@ def test_check_product_empty():
     response = client.get("/api/check?product_name=")
     assert response.status_code == 422  # Validation error
 
+def test_check_batch():
+    """Test checking several products in one request"""
+    names = ["Coca-Cola", "RandomNonExistentProduct123", "coca-cola", " "]
+    response = client.post("/api/check/batch", json={"products": names})
+    assert response.status_code == 200
+    data = response.json()
+    assert [item["product"] for item in data["results"]] == names
+    assert [item["status"] for item in data["results"]] == ["boycotted", "safe", "boycotted", "invalid"]
+    assert data["results"][0]["found_items"][0]["tunisian_alternative"]
+    single = client.get("/api/check?product_name=Coca-Cola").json()
+    assert data["results"][0]["found_items"] == single["found_items"]
+    assert data["total"] == 4 and data["boycotted"] == 2
+
+def test_check_batch_streamed():
+    """Test large batches are streamed with the same body"""
+    names = ["Pepsi", "Unknown"] * 300
+    response = client.post("/api/check/batch", json={"products": names})
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["results"]) == 600
+    assert data["results"][0]["status"] == "boycotted"
+    assert data["results"][1]["status"] == "safe"
+
+def test_check_batch_limits():
+    """Test empty and oversized batches are rejected"""
+    assert client.post("/api/check/batch", json={"products": []}).status_code == 422
+    too_many = {"products": ["x"] * 5001}
+    assert client.post("/api/check/batch", json=too_many).status_code == 422
+
+def test_scan_text():
+    """Test flagging boycotted products in free text"""
+    text = "TICKET: 2x COCA-COLA 1.5L, pain, Nescafé"
+    response = client.post("/api/scan", json={"text": text})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "boycotted"
+    first = data["matches"][0]
+    assert text[first["start"]:first["end"]] == "COCA-COLA"
+    assert first["products"][0]["product"] == "Coca-Cola"
+
+def test_scan_text_clean():
+    """Test text without boycotted products"""
+    response = client.post("/api/scan", json={"text": "pain, lait, oeufs"})
+    assert response.status_code == 200
+    assert response.json()["status"] == "safe"
+
+def test_recommend_mode_validation():
+    """Test unknown recommendation modes are rejected"""
+    response = client.post("/api/ai/recommend?history=Pepsi&mode=magic")
+    assert response.status_code == 422
+
+def test_sentiment_batch_validation():
+    """Test empty sentiment batches are rejected"""
+    response = client.post("/api/ai/analyze-sentiment/batch", json={"feedback": []})
+    assert response.status_code == 422
+
+def test_chat_message_length():
+    """Test overlong chat messages are rejected before reaching the AI"""
+    for path in ("/api/ai/chat", "/api/ai/chat/stream"):
+        response = client.post(path, json={"message": "x" * 2_000_001, "session_id": "a"})
+        assert response.status_code == 422
+
 def test_get_alternatives():
     """Test getting alternatives"""
     response = client.get("/api/alternatives?product_name=Nestlé")
@@ -59,6 +123,16 @@ def test_list_boycotts_with_category():
     data = response.json()
     assert data["status"] == "success"
 
+def test_listing_filters_share_cache_entries():
+    """Test filters differing only by case or spaces reuse one cache entry"""
+    first = client.get("/api/products?category=Beverages&intensity=High")
+    entries = client.get("/api/health").json()["response_cache"]["entries"]
+    for category, intensity in (("beverages", "high"), (" BEVERAGES ", "High ")):
+        response = client.get("/api/products", params={"category": category, "intensity": intensity})
+        assert response.json() == first.json() and first.json()
+    assert client.get("/api/health").json()["response_cache"]["entries"] == entries
+    assert client.get("/api/boycotts?category=%20").json() == client.get("/api/boycotts").json()
+
 def test_list_boycotts_with_intensity():
     """Test listing boycotts by intensity"""
     response = client.get("/api/boycotts?intensity=High")
@@ -90,6 +164,22 @@ def test_search_product():
     data = response.json()
     assert "results" in data or data["status"] == "no_results"
 
+def test_search_fuzzy():
+    """Test fuzzy search tolerates typos"""
+    response = client.get("/api/search?q=starbuks&fuzzy=true")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "success"
+    assert data["results"][0]["product"] == "Starbucks"
+
+def test_suggest():
+    """Test autocomplete suggestions"""
+    response = client.get("/api/suggest?prefix=coca")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["suggestions"][0]["product"] == "Coca-Cola"
+    assert data["count"] <= 10
+
 def test_search_empty():
     """Test search with empty query"""
     response = client.get("/api/search?q=")
@@ -123,5 +213,102 @@ def test_multiple_searches():
         assert response.status_code == 200
         assert "status" in response.json()
 
+def test_catalog_responses_cached():
+    """Test catalog endpoints answer the same bytes, gzipped when accepted"""
+    plain = client.get("/api/products?limit=200", headers={"Accept-Encoding": "identity"})
+    assert plain.status_code == 200
+    assert "content-encoding" not in plain.headers
+    compressed = client.get("/api/products?limit=200", headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.json() == plain.json()
+    assert client.get("/api/stats").json()["total_products"] > 0
+
+def test_conditional_get():
+    """Test catalog responses carry validators and revalidate to 304"""
+    response = client.get("/api/products", headers={"Accept-Encoding": "identity"})
+    etag = response.headers["etag"]
+    assert response.headers["cache-control"] == "no-cache"
+    assert "last-modified" in response.headers
+    
+    response = client.get("/api/categories", headers={"If-None-Match": f'"other", W/{etag}'})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    assert client.get("/api/stats", headers={"If-None-Match": '"other"'}).status_code == 200
+    
+    last_modified = client.get("/api/stats").headers["last-modified"]
+    assert client.get("/api/stats", headers={"If-Modified-Since": last_modified}).status_code == 304
+    
+    compressed = client.get("/api/products?limit=200", headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["etag"] != etag
+    response = client.get("/api/products?limit=200",
+                          headers={"If-None-Match": compressed.headers["etag"]})
+    assert response.status_code == 304
+    
+    # Invalid requests get their error even when the validators match
+    assert client.get("/api/check", headers={"If-None-Match": etag}).status_code == 422
+    assert client.get("/api/products?limit=9999", headers={"If-None-Match": etag}).status_code == 422
+    future = "Fri, 01 Jan 2100 00:00:00 GMT"
+    assert client.get("/api/stats", headers={"If-Modified-Since": future}).status_code == 200
+
+def test_not_modified_skips_handler(monkeypatch):
+    """Test a 304 is answered without running the endpoint"""
+    from app import main
+    etag = client.get("/api/search?q=Pepsi").headers["etag"]
+    calls = []
+    monkeypatch.setattr(main.boycott_data, "search_products", lambda *args, **kwargs: calls.append(args))
+    response = client.get("/api/search?q=Pepsi", headers={"If-None-Match": etag})
+    assert response.status_code == 304 and response.headers["etag"] == etag
+    assert client.get("/api/search?q=", headers={"If-None-Match": etag}).status_code == 422
+    assert calls == []
+
+def test_sync():
+    """Test a full sync, then an empty delta from the version it returned"""
+    full = client.get("/api/sync").json()
+    assert full["full"] and len(full["products"]) == client.get("/api/stats").json()["total_products"]
+    delta = client.get(f"/api/sync?since={full['version']}").json()
+    assert not delta["full"]
+    assert delta["added"] == delta["modified"] == delta["removed"] == []
+    assert client.get("/api/sync?since=unknown").json()["full"]
+    
+    # Made-up versions share the one full resync entry
+    entries = client.get("/api/health").json()["response_cache"]["entries"]
+    for attempt in range(5):
+        body = client.get(f"/api/sync?since=bogus{attempt}").json()
+        assert body["full"] and body["since"] is None
+    assert client.get("/api/health").json()["response_cache"]["entries"] == entries
+
+def test_export():
+    """Test CSV and NDJSON exports match the catalog, filters included"""
+    total = client.get("/api/stats").json()["total_products"]
+    response = client.get("/api/download/boycott_list.csv")
+    assert response.status_code == 200
+    assert response.text.count("\n") >= total + 1
+    category = client.get("/api/categories").json()["categories"][0]
+    response = client.get("/api/export", params={"format": "ndjson", "category": category})
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert rows and all(row["category"] == category for row in rows)
+    assert client.get("/api/export?format=xml").status_code == 422
+
+def test_index_page():
+    """Test the page is negotiated and revalidated"""
+    plain = client.get("/", headers={"Accept-Encoding": "identity"})
+    assert plain.status_code == 200 and "ConsumeSafe" in plain.text
+    assert plain.headers["cache-control"] == "no-cache"
+    compressed = client.get("/")
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.text == plain.text
+    response = client.get("/", headers={"If-None-Match": compressed.headers["etag"]})
+    assert response.status_code == 304
+
+def test_index_page_missing(monkeypatch, tmp_path):
+    """Test a missing page is a 404, not an import or server error"""
+    from app import main
+    from app.static_assets import StaticAsset
+    monkeypatch.setattr(main, "index_page", StaticAsset(str(tmp_path / "index.html"), "text/html"))
+    assert client.get("/").status_code == 404
+    assert client.get("/api/stats").status_code == 200
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,236 @@
+"""Tests for the chatbot of the AI service."""
+
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.ai_service import AIService, split_paragraphs
+from app.product_store import ProductStore
+from app.text_matcher import FirstRowMatcher
+
+DATA_PATH = Path(__file__).parent.parent / "data" / "boycott_products.csv"
+
+
+def scan_extract_product(products, message):
+    """The product scan _extract_product used to run for every message."""
+    message_lower = message.lower()
+    normalized_msg = message_lower.replace("-", " ").replace("'", "")
+    for product in products:
+        product_name = product.get('boycott_product', '').lower()
+        brand = product.get('brand', '').lower()
+        normalized_product = product_name.replace("-", " ").replace("'", "")
+        normalized_brand = brand.replace("-", " ").replace("'", "")
+        if product_name in message_lower or brand in message_lower:
+            return product_name
+        if normalized_product in normalized_msg or normalized_brand in normalized_msg:
+            return product_name
+        for word in normalized_product.split() + normalized_brand.split():
+            if len(word) > 3 and word in normalized_msg:
+                return product_name
+    return None
+
+
+def scan_detect_intent(message):
+    """The keyword scans _detect_intent used to run."""
+    message_lower = message.lower()
+    if any(word in message_lower for word in ["produits", "products", "boycotter", "boycott", "listes", "list"]):
+        return "why_boycott"
+    elif any(word in message_lower for word in ["pourquoi", "why", "raison", "reason"]):
+        return "why_boycott"
+    elif any(word in message_lower for word in ["alternative", "remplacer", "autre", "tunisien", "replace"]):
+        return "find_alternative"
+    elif any(word in message_lower for word in ["stats", "statistiques", "nombre", "total", "combien"]):
+        return "statistics"
+    elif any(word in message_lower for word in ["palestine", "enfants", "children", "guerre", "war"]):
+        return "palestine_support"
+    return "general"
+
+
+@pytest.fixture(scope="module")
+def products():
+    """Dataset loaded into a ProductStore."""
+    return ProductStore.from_csv(str(DATA_PATH))
+
+
+@pytest.fixture(scope="module")
+def service(products):
+    """AI service over the dataset."""
+    return AIService(products)
+
+
+def messages(products, count=400, seed=5):
+    """Messages mentioning names, brands and words in various spellings."""
+    rng = random.Random(seed)
+    names = [p.get(field) for p in products for field in ("boycott_product", "brand")]
+    words = [w for name in names for w in name.replace("-", " ").split()]
+    fillers = ["c'est quoi", "alternative pour", "why boycott", "hello", "coca", "l'oreal"]
+    result = []
+    for _ in range(count):
+        parts = [rng.choice(fillers)]
+        for _ in range(rng.randint(0, 2)):
+            piece = rng.choice(names + words)
+            piece = rng.choice([piece, piece.upper(), piece.replace("-", " "),
+                                piece.replace(" ", "-"), piece[:-1]])
+            parts.append(piece)
+        rng.shuffle(parts)
+        result.append(" ".join(parts))
+    return result
+
+
+class TestExtractProduct:
+    """Test the compiled matcher against the original product scan."""
+
+    def test_same_as_scan(self, service, products):
+        """Test every message resolves to the same product as before."""
+        for message in messages(products):
+            assert service._extract_product(message) == scan_extract_product(products, message), message
+
+    def test_catalog_order_wins(self):
+        """Test the earliest product wins, whatever kind of match it has."""
+        service = AIService(ProductStore.from_dicts([
+            {"boycott_product": "Gold Blend", "brand": "Roasters Ltd"},
+            {"boycott_product": "Blend", "brand": "Other"},
+        ]))
+        # A word of the first product beats the exact name of the second
+        assert service._extract_product("best blend ever") == "gold blend"
+        assert service._extract_product("roasters coffee") == "gold blend"
+        assert service._extract_product("other coffee") == "blend"
+
+    def test_specific_product_same_as_scan(self, service, products):
+        """Test the answer is about the product the old scan picked."""
+        for message in messages(products, seed=9):
+            query = scan_extract_product(products, message)
+            if not query:
+                continue
+            expected = next(p for p in products
+                            if p.get('boycott_product', '').lower() in query
+                            or p.get('brand', '').lower() in query)
+            response = service._answer_specific_product(query)
+            assert response.startswith(f"❌ **À BOYCOTTER**\n\n{expected.get('boycott_product')}\n")
+
+    def test_reload_recompiles(self, products):
+        """Test a reloaded catalog is matched against."""
+        service = AIService(products)
+        service.reload(ProductStore.from_dicts([{"boycott_product": "Zzyzx", "brand": "Zz"}]))
+        assert service._extract_product("coca-cola") is None
+        assert service._extract_product("zzyzx?") == "zzyzx"
+
+    def test_specific_product_answer(self, service):
+        """Test the answer names the product and its alternative."""
+        response = service.chat("Est-ce que je peux acheter Coca-Cola?")
+        assert "Coca-Cola" in response
+        assert "ALTERNATIVE TUNISIENNE" in response
+
+
+class TestIntentsAndCache:
+    """Test compiled intent detection and cached answers."""
+
+    def test_intent_same_as_scan(self, service, products):
+        """Test the single pass picks the same intent as the keyword scans."""
+        samples = messages(products) + [
+            "WAR and palestine", "combien? pourquoi?", "liste des produits", "autrement", ""
+        ]
+        for message in samples:
+            assert service._detect_intent(message) == scan_detect_intent(message)
+
+    def test_answers_cached_until_reload(self, products):
+        """Test answers are reused, then rebuilt from the reloaded catalog."""
+        service = AIService(products)
+        first = service.respond("Statistiques?")
+        assert service.respond("combien de marques?") is first
+        assert service.respond("Coca-Cola?") is service.respond("coca-cola!")
+
+        smaller = ProductStore.from_dicts([dict(products[row]) for row in range(3)])
+        service.reload(smaller)
+        assert service.version == 1
+        assert "**Produits:** 3" in service.respond("Statistiques?")
+
+
+class TestCatalogState:
+    """Test the catalog is swapped as one state."""
+
+    def test_indexes_built_on_first_use(self, products):
+        """Test a new catalog compiles nothing until it is used or warmed."""
+        service = AIService(products)
+        assert service._state._matcher is None and service._state._categories is None
+        service.warm()
+        assert service._state._matcher is not None and service._state._categories is not None
+
+    def test_reload_mid_answer(self, products, monkeypatch):
+        """Test an answer started before a reload is built from the old catalog."""
+        service = AIService(products)
+        smaller = ProductStore.from_dicts([dict(products[row]) for row in range(3)])
+        detect = service._detect_intent
+
+        def reload_then_detect(message):
+            service.reload(smaller)
+            return detect(message)
+
+        monkeypatch.setattr(service, "_detect_intent", reload_then_detect)
+        assert f"**Produits:** {len(products)}" in service.respond("Statistiques?")
+        assert service.version == 1
+        # The answer was cached on the old state, not on the reloaded one
+        assert service._state.responses == {}
+
+
+class TestChatSessions:
+    """Test chat history is kept per session."""
+
+    def test_history_per_session(self, products):
+        """Test exchanges are recorded in their own session only."""
+        service = AIService(products)
+        response = service.chat("Pourquoi boycotter?", session_id="a")
+        service.chat("Coca-Cola?", session_id="b")
+        assert service.conversation_history("a") == [
+            {"role": "user", "content": "Pourquoi boycotter?"},
+            {"role": "assistant", "content": response},
+        ]
+        assert len(service.conversation_history("b")) == 2
+
+    def test_no_session_keeps_nothing(self, products):
+        """Test anonymous messages are not stored."""
+        service = AIService(products)
+        for _ in range(50):
+            service.chat("hello")
+        assert service.conversations.stats()["messages"] == 0
+
+
+class TestChatStream:
+    """Test answers stream paragraph by paragraph."""
+
+    def test_pieces_join_to_answer(self, service):
+        """Test the streamed pieces rebuild the rule-based answer."""
+        for message in ["Pourquoi boycotter?", "Coca-Cola?", "statistiques", "hello"]:
+            pieces = list(service.respond_stream(message))
+            assert "".join(pieces) == service.respond(message)
+            assert all(pieces)
+
+    def test_paragraphs(self):
+        """Test pieces end after each blank line."""
+        assert list(split_paragraphs("a\n\nb\n\n\nc")) == ["a\n\n", "b\n\n\n", "c"]
+        assert list(split_paragraphs("")) == []
+
+
+class TestFirstRowMatcher:
+    """Test grouped first-row lookups."""
+
+    def test_groups(self):
+        """Test lookups only see their own group."""
+        matcher = FirstRowMatcher({"a": [("cola", 3), ("coca", 5)], "b": [("coca", 1)]})
+        assert matcher.first_row("a", "coca cola") == 3
+        assert matcher.first_row("b", "coca cola") == 1
+        assert matcher.first_row("b", "cola") is None
+
+    def test_empty_pattern_always_matches(self):
+        """Test an empty pattern matches any text, like '' in text."""
+        matcher = FirstRowMatcher({"a": [("x", 0), ("", 2)]})
+        assert matcher.first_row("a", "nothing") == 2
+        assert matcher.first_row("a", "x") == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
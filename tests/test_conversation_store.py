@@ -0,0 +1,139 @@
+"""Tests for the per-session conversation store."""
+
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.conversation_store import MESSAGE_OVERHEAD, ConversationStore
+
+
+class FakeClock:
+    """Clock advanced by hand."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestConversationStore:
+    """Test session histories and their bounds."""
+
+    def test_sessions_are_separate(self):
+        """Test each session only sees its own messages."""
+        store = ConversationStore()
+        store.append("a", "user", "bonjour")
+        store.append("b", "user", "hello")
+        store.append("a", "assistant", "salut")
+        assert store.history("a") == [
+            {"role": "user", "content": "bonjour"},
+            {"role": "assistant", "content": "salut"},
+        ]
+        assert store.history("b") == [{"role": "user", "content": "hello"}]
+        assert store.history("unknown") == []
+
+    def test_ring_buffer(self):
+        """Test a session keeps only its last messages."""
+        store = ConversationStore(max_messages=3)
+        for i in range(10):
+            store.append("a", "user", f"message {i}")
+        assert [m["content"] for m in store.history("a")] == ["message 7", "message 8", "message 9"]
+        single = ConversationStore()
+        single.append("a", "user", "message 9")
+        assert store.bytes_held == 3 * single.bytes_held
+
+    def test_ttl(self):
+        """Test idle sessions expire."""
+        clock = FakeClock()
+        store = ConversationStore(ttl=60, clock=clock)
+        store.append("old", "user", "x")
+        clock.now = 30
+        store.append("recent", "user", "y")
+        clock.now = 61
+        assert store.history("old") == []
+        assert store.history("recent")
+        assert store.stats()["evictions"]["ttl"] == 1
+
+    def test_activity_refreshes_ttl(self):
+        """Test a message keeps its session alive."""
+        clock = FakeClock()
+        store = ConversationStore(ttl=60, clock=clock)
+        store.append("a", "user", "x")
+        clock.now = 50
+        store.append("a", "user", "y")
+        clock.now = 100
+        assert len(store.history("a")) == 2
+
+    def test_lru_cap(self):
+        """Test the least recently used session goes first."""
+        store = ConversationStore(max_sessions=2)
+        store.append("a", "user", "x")
+        store.append("b", "user", "x")
+        store.append("a", "user", "y")
+        store.append("c", "user", "x")
+        assert "a" in store and "c" in store and "b" not in store
+        assert store.stats()["evictions"]["lru"] == 1
+
+    def test_memory_cap(self):
+        """Test the memory cap trims the growing session, then evicts others."""
+        probe = ConversationStore()
+        probe.append("a", "user", "x" * 1000)
+        size = probe.bytes_held
+        store = ConversationStore(max_bytes=size * 3)
+        for session in ("a", "b", "c"):
+            store.append(session, "user", "x" * 1000)
+        store.append("d", "user", "x" * 1000)
+        assert "a" not in store and len(store) == 3
+        for i in range(5):
+            store.append("d", "user", f"{i}" * 1000)
+        assert len(store) == 3 and store.history("d") == [{"role": "user", "content": "4" * 1000}]
+        assert store.bytes_held <= store.max_bytes
+        assert store.stats()["evictions"]["memory"] == 1
+
+    def test_oversized_message(self):
+        """Test one huge message is cut and evicts nobody."""
+        store = ConversationStore(max_bytes=1_000_000)
+        for i in range(100):
+            store.append(f"s{i}", "user", "hello")
+        store.append("s0", "user", "x" * 2_000_000)
+        assert len(store) == 100 and store.stats()["evictions"]["memory"] == 0
+        assert store.bytes_held <= store.max_bytes
+        content = store.history("s0")[-1]["content"]
+        assert content == "x" * len(content)
+        assert 0 < sys.getsizeof(content) + MESSAGE_OVERHEAD <= store.max_message_bytes
+
+    def test_clear_and_stats(self):
+        """Test clearing a session releases its bytes."""
+        store = ConversationStore()
+        store.append("a", "user", "x")
+        store.append("a", "assistant", "y")
+        stats = store.stats()
+        assert stats["sessions"] == 1 and stats["messages"] == 2 and stats["bytes"] > 0
+        assert store.clear("a") and not store.clear("a")
+        assert store.stats()["bytes"] == 0
+
+    def test_thread_safety(self):
+        """Test concurrent appends keep the byte count exact."""
+        store = ConversationStore(max_messages=5, max_sessions=50)
+
+        def worker(n):
+            for i in range(500):
+                store.append(f"s{(n * 7 + i) % 80}", "user", "m" * (i % 13))
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(store) == 50
+        assert all(len(store.history(s)) <= 5 for s in list(store._sessions))
+        assert store.bytes_held == sum(s.bytes for s in store._sessions.values())
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,169 @@
+"""Tests for dataset snapshots and hot reload."""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.dataset import Dataset, DatasetSnapshot, DatasetWatcher, file_signature
+
+
+def bump_mtime(path):
+    """Move the file's mtime forward so a change is seen on coarse clocks."""
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.fixture
+def catalog_path(tmp_path, write_catalog):
+    """Path of a two-row catalog CSV."""
+    path = tmp_path / "catalog.csv"
+    write_catalog(path, ["Alpha", "Beta"])
+    return str(path)
+
+
+class TestDatasetSnapshot:
+    """Test snapshot construction."""
+
+    def test_indexes_built(self, catalog_path):
+        """Test a snapshot carries the store and its indexes."""
+        snapshot = DatasetSnapshot.from_csv(catalog_path)
+        assert len(snapshot.products) == 2
+        assert list(snapshot.indexes["boycott_product"].search("alp")) == [0]
+        assert snapshot.autocomplete.suggest("be")
+        assert snapshot.source == file_signature(catalog_path)
+
+    def test_content_hash(self, catalog_path, write_catalog):
+        """Test the entity tag follows the file content, not the load."""
+        first = DatasetSnapshot.from_csv(catalog_path)
+        again = DatasetSnapshot.from_csv(catalog_path)
+        assert first.etag == again.etag and first.version != again.version
+        assert first.etag.startswith('"') and first.last_modified.endswith("GMT")
+        write_catalog(catalog_path, ["Alpha", "Gamma"])
+        assert DatasetSnapshot.from_csv(catalog_path).etag != first.etag
+
+    def test_versions_increase(self):
+        """Test every snapshot gets a newer version."""
+        first = DatasetSnapshot.empty()
+        second = DatasetSnapshot.empty()
+        assert second.version > first.version
+
+
+class TestDataset:
+    """Test reloads and snapshot swaps."""
+
+    def test_reload_swaps_snapshot(self, catalog_path, write_catalog):
+        """Test a reload publishes a new snapshot and leaves the old one intact."""
+        dataset = Dataset(catalog_path)
+        assert dataset.reload()
+        old = dataset.snapshot
+
+        write_catalog(catalog_path, ["Alpha", "Beta", "Gamma"])
+        seen = []
+        dataset.add_listener(seen.append)
+        assert dataset.reload()
+
+        assert dataset.snapshot is not old
+        assert seen == [dataset.snapshot]
+        assert len(dataset.snapshot.products) == 3
+        assert len(old.products) == 2
+        assert list(old.indexes["boycott_product"].search("gamma")) == []
+
+    def test_failed_reload_keeps_snapshot(self, catalog_path):
+        """Test an unreadable file keeps the current snapshot."""
+        dataset = Dataset(catalog_path)
+        dataset.reload()
+        current = dataset.snapshot
+        os.remove(catalog_path)
+        assert not dataset.reload()
+        assert dataset.snapshot is current
+
+    def test_listener_errors_do_not_block_swap(self, catalog_path):
+        """Test a failing listener does not undo the swap."""
+        dataset = Dataset(catalog_path)
+
+        def broken(snapshot):
+            raise RuntimeError("boom")
+
+        dataset.add_listener(broken)
+        assert dataset.reload()
+        assert len(dataset.snapshot.products) == 2
+
+
+class TestDatasetWatcher:
+    """Test change detection."""
+
+    def test_detects_edit(self, catalog_path, write_catalog):
+        """Test an in-place edit triggers a single callback."""
+        calls = []
+        watcher = DatasetWatcher(catalog_path, lambda: calls.append(1),
+                                 signature=file_signature(catalog_path))
+        assert not watcher.check()
+        write_catalog(catalog_path, ["Alpha", "Beta", "Gamma"])
+        bump_mtime(catalog_path)
+        assert watcher.check()
+        assert not watcher.check()
+        assert calls == [1]
+
+    def test_detects_replacement(self, catalog_path, tmp_path, write_catalog):
+        """Test a file renamed over the original triggers a callback."""
+        calls = []
+        watcher = DatasetWatcher(catalog_path, lambda: calls.append(1),
+                                 signature=file_signature(catalog_path))
+        replacement = tmp_path / "new.csv"
+        write_catalog(replacement, ["Delta"])
+        os.replace(replacement, catalog_path)
+        assert watcher.check()
+
+    def test_failed_reload_retried(self, catalog_path, write_catalog):
+        """Test a change is checked again until its callback succeeds."""
+        results = [False, RuntimeError("half-written"), True]
+        calls = []
+
+        def on_change():
+            calls.append(1)
+            result = results[len(calls) - 1]
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        watcher = DatasetWatcher(catalog_path, on_change, signature=file_signature(catalog_path))
+        write_catalog(catalog_path, ["Alpha", "Beta", "Gamma"])
+        bump_mtime(catalog_path)
+        assert not watcher.check()
+        with pytest.raises(RuntimeError):
+            watcher.check()
+        assert watcher.check()
+        assert not watcher.check()
+        assert len(calls) == 3
+
+    def test_missing_file_ignored(self, catalog_path):
+        """Test a briefly missing file is not treated as a change."""
+        watcher = DatasetWatcher(catalog_path, lambda: None,
+                                 signature=file_signature(catalog_path))
+        os.remove(catalog_path)
+        assert not watcher.check()
+
+    def test_background_reload(self, catalog_path, write_catalog):
+        """Test the watcher thread reloads the dataset."""
+        dataset = Dataset(catalog_path)
+        dataset.reload()
+        dataset.watch(0.01)
+        try:
+            write_catalog(catalog_path, ["Alpha", "Beta", "Gamma"])
+            bump_mtime(catalog_path)
+            for _ in range(500):
+                if len(dataset.snapshot.products) == 3:
+                    break
+                time.sleep(0.01)
+            assert len(dataset.snapshot.products) == 3
+        finally:
+            dataset.stop_watching()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,70 @@
+"""Tests for streaming catalog exports."""
+
+import csv
+import io
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.export import iter_csv, iter_export, iter_ndjson
+from app.product_store import ProductStore
+
+
+@pytest.fixture
+def store(fieldnames):
+    """Catalog with values needing CSV quoting."""
+    return ProductStore.from_rows(fieldnames, [
+        ["1", "Cola, Classic", "Acme", "Beverages", 'Says "hi"', "Boga", "SFBT", "High"],
+        ["2", "Chips", "Acme", "Food", "Line\nbreak", "", "", "Medium"],
+        ["3", "Soap", "Clean", "Hygiene", "Reason", "Alt", "Local", "High"],
+    ])
+
+
+class TestCSV:
+    """Test CSV chunks parse back to the catalog."""
+
+    def test_round_trip(self, store, fieldnames):
+        """Test commas, quotes and newlines survive the export."""
+        text = "".join(iter_csv(store, fieldnames))
+        rows = list(csv.DictReader(io.StringIO(text)))
+        assert [dict(row) for row in rows] == [product.copy() for product in store]
+
+    def test_chunked(self, store, fieldnames):
+        """Test rows are yielded a few at a time, header first."""
+        chunks = list(iter_csv(store, fieldnames, chunk_rows=1))
+        assert len(chunks) == 4
+        assert chunks[0].startswith("id,boycott_product,")
+        assert "".join(chunks) == "".join(iter_csv(store, fieldnames))
+
+    def test_empty(self, fieldnames):
+        """Test an empty catalog still has a header."""
+        assert "".join(iter_csv([], fieldnames)) == ",".join(fieldnames) + "\n"
+
+
+class TestNDJSON:
+    """Test newline-delimited JSON exports."""
+
+    def test_one_object_per_line(self, store, fieldnames):
+        """Test each line is one product."""
+        text = "".join(iter_ndjson(store, fieldnames, chunk_rows=2))
+        rows = [json.loads(line) for line in text.splitlines()]
+        assert rows == [product.copy() for product in store]
+
+    def test_filtered(self, store, fieldnames):
+        """Test filtered rows only are exported."""
+        rows = store.iter_where(category="Beverages")
+        text = "".join(iter_export(rows, fieldnames, "ndjson"))
+        assert [json.loads(line)["id"] for line in text.splitlines()] == ["1"]
+
+    def test_unknown_format(self, store, fieldnames):
+        """Test formats other than CSV and NDJSON are refused."""
+        with pytest.raises(ValueError):
+            iter_export(store, fieldnames, "xml")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,115 @@
+"""Tests for byte-level JSON encoding of catalog rows."""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.fast_json import FastJSONResponse, JSONFragment, RowShape, dumps, encode_object, orjson
+from app.product_store import ProductStore
+from app.response_cache import encode_json
+
+DATA_PATH = Path(__file__).parent.parent / "data" / "boycott_products.csv"
+SHAPE = RowShape([("id", "id"), ("Product Name", "boycott_product"), ("Brand", "brand")])
+
+
+@pytest.fixture
+def store(fieldnames):
+    """Small catalog with non-ASCII and quoted values."""
+    return ProductStore.from_rows(fieldnames, [
+        ["1", "Café \"Noir\"", "Acme", "Coffee", "Reason", "Alt", "Local", "High"],
+        ["2", "Chips", "Acme", "Food", "Reason", "Alt", "Local", "Medium"],
+        ["3", "Soap", None, "Hygiene", "Reason", "Alt", "Local", "Low"],
+    ])
+
+
+class TestRowShape:
+    """Test listings built from fragments match plain encoding."""
+
+    def test_same_bytes_as_dicts(self, store):
+        """Test a listing equals JSONResponse's encoding of re-keyed dicts."""
+        expected = encode_json([
+            {"id": p.get("id"), "Product Name": p.get("boycott_product"), "Brand": p.get("brand")}
+            for p in store
+        ])
+        assert json.loads(SHAPE.encode_rows(store).data) == json.loads(expected)
+
+    def test_fragments_cached_per_shape(self, store):
+        """Test rows are encoded once per shape, and only when listed."""
+        SHAPE.encode_rows(store.iter_where(category="Food"))
+        fragments = store.row_fragments[SHAPE]
+        assert fragments.rows[0] is None and fragments.rows[1] is not None
+        other = RowShape([("name", "boycott_product")])
+        assert json.loads(other.encode_rows(store).data)[1] == {"name": "Chips"}
+        assert fragments.rows[1] is SHAPE.fragment(store[1])
+
+    def test_fragments_bounded(self, store):
+        """Test rows past the byte budget are encoded but not kept."""
+        shape = RowShape(SHAPE.fields, max_bytes=60)
+        listing = shape.encode_rows(store).data
+        fragments = store.row_fragments[shape]
+        assert fragments.size <= 60 and None in fragments.rows
+        assert shape.encode_rows(store).data == listing
+
+    def test_plain_dicts(self):
+        """Test rows that are not store views are encoded each time."""
+        data = SHAPE.encode_rows([{"id": "9", "boycott_product": "X"}]).data
+        assert json.loads(data) == [{"id": "9", "Product Name": "X", "Brand": None}]
+
+    def test_empty(self):
+        """Test an empty listing is an empty array."""
+        assert SHAPE.encode_rows([]).data == b"[]"
+
+
+class TestEncoding:
+    """Test envelopes and the response class."""
+
+    def test_encode_object_keeps_order(self, store):
+        """Test fragments are inserted raw and keys keep their order."""
+        body = encode_object({"total": 3, "products": SHAPE.encode_rows(store), "message": "🇵🇸"})
+        assert body.startswith(b'{"total":3,"products":[{')
+        assert json.loads(body)["message"] == "🇵🇸"
+
+    def test_dumps_matches_stdlib(self):
+        """Test the fast encoder writes what JSONResponse would."""
+        content = {"a": [1, "é", None, True, "\u2028", "\x00"], "b": {"c": 1.5}}
+        assert dumps(content) == encode_json(content)
+
+    def test_catalog_rows_match_stdlib(self):
+        """Test every shape of every row of the real catalog encodes like JSONResponse."""
+        from app.main import PRODUCTS_SHAPE, SEARCH_SHAPE, SUMMARY_SHAPE
+        products = ProductStore.from_csv(str(DATA_PATH))
+        for shape in (PRODUCTS_SHAPE, SUMMARY_SHAPE, SEARCH_SHAPE):
+            expected = encode_json([{key: p.get(column) for key, column in shape.fields} for p in products])
+            assert shape.encode_rows(products).data == expected
+
+    def test_edge_values(self):
+        """Test keys, subclasses and big integers match; floats match by value."""
+        class Text(str):
+            pass
+
+        for content in ({1: "a", 2.5: "b", None: "c"}, [Text("x"), {"n": 2**70}]):
+            assert dumps(content) == encode_json(content)
+        floats = [0.1, 1e16, 1e-7, -0.0]
+        assert json.loads(dumps(floats)) == floats
+
+    def test_non_finite_floats(self):
+        """Test NaN is written as null by orjson, refused by the stdlib encoder."""
+        if orjson is None:
+            pytest.skip("orjson not installed")
+        assert dumps([float("nan")]) == b"[null]"
+        with pytest.raises(ValueError):
+            encode_json([float("nan")])
+
+    def test_response_render(self):
+        """Test bodies already encoded are sent as they are."""
+        assert FastJSONResponse(b'{"a":1}').body == b'{"a":1}'
+        assert FastJSONResponse(JSONFragment(b"[]")).body == b"[]"
+        assert json.loads(FastJSONResponse({"a": "é"}).body) == {"a": "é"}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,96 @@
+"""Tests for the keyword feedback analysis."""
+
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import feedback
+from app.feedback import (
+    CATEGORY_KEYWORDS, NEGATIVE_WORDS, POSITIVE_WORDS,
+    analyze_feedback, analyze_feedback_batch, keywords_in,
+)
+
+
+def scan_analysis(text):
+    """The keyword scans analyze_sentiment used to run."""
+    text_lower = text.lower()
+    positive_count = sum(1 for word in POSITIVE_WORDS if word in text_lower)
+    negative_count = sum(1 for word in NEGATIVE_WORDS if word in text_lower)
+    if positive_count > negative_count:
+        label, score = "positive", 0.8 + (positive_count * 0.1)
+    elif negative_count > positive_count:
+        label, score = "negative", 0.8 + (negative_count * 0.1)
+    else:
+        label, score = "neutral", 0.5
+    category = next((c for c, words in CATEGORY_KEYWORDS
+                     if any(word in text_lower for word in words)), "General")
+    return label, score, category
+
+
+def texts(count=500, seed=8):
+    """Feedback built from keywords, fragments and glued words."""
+    rng = random.Random(seed)
+    words = list(POSITIVE_WORDS + NEGATIVE_WORDS) + [w for _, ws in CATEGORY_KEYWORDS for w in ws]
+    fillers = ["the app", "l'application", "est", "très", "vraiment", "!", "rien", ""]
+    result = []
+    for _ in range(count):
+        parts = []
+        for _ in range(rng.randint(0, 6)):
+            word = rng.choice(words + fillers)
+            word = rng.choice([word, word.upper(), word[1:], word + word[:2]])
+            parts.append(word)
+        result.append(rng.choice([" ", "", "-"]).join(parts))
+    return result
+
+
+class TestFeedbackAnalysis:
+    """Test the single-pass analysis against the keyword scans."""
+
+    def test_same_as_scan(self):
+        """Test sentiment, score and category match the old scans."""
+        for text in texts():
+            result = analyze_feedback(text)
+            assert (result["sentiment"], result["score"], result["category"]) == scan_analysis(text), text
+
+    def test_overlapping_keywords(self):
+        """Test keywords inside or across each other are all found."""
+        assert keywords_in("bonerreurbug") == {"bon", "erreur", "bug"}
+        assert keywords_in("errorreur") == {"error"}
+
+    def test_result(self):
+        """Test the result fields."""
+        result = analyze_feedback("Interface excellent, parfait!")
+        assert result == {
+            "text": "Interface excellent, parfait!",
+            "sentiment": "positive",
+            "score": pytest.approx(1.0),
+            "category": "UI/UX",
+            "actionable": False,
+            "suggestion": "✅ Feedback positif! Utilisateur satisfait avec UI/UX.",
+        }
+
+    def test_batch(self):
+        """Test a batch gives the single results in order."""
+        batch = texts(50, seed=2)
+        assert analyze_feedback_batch(batch) == [analyze_feedback(t) for t in batch]
+
+    def test_batch_process_pool(self, monkeypatch):
+        """Test large batches go through one long-lived pool of worker processes."""
+        monkeypatch.setattr(feedback, "PROCESS_POOL_MIN_BATCH", 10)
+        batch = texts(40, seed=3)
+        try:
+            assert analyze_feedback_batch(batch, processes=2) == [analyze_feedback(t) for t in batch]
+            pool = feedback._pool[1]
+            assert analyze_feedback_batch(batch, processes=2) == [analyze_feedback(t) for t in batch]
+            assert feedback._pool[1] is pool
+        finally:
+            feedback.shutdown_pool()
+        assert feedback._pool is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
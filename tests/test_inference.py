@@ -0,0 +1,212 @@
+"""Tests for the chat inference backends and micro-batching."""
+
+import asyncio
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.ai_service import AIService
+from app.inference import (
+    HTTPInferenceBackend, InferenceBackend, InferenceUnavailable, MicroBatchScheduler, load_backend,
+)
+from app.product_store import ProductStore
+
+DATA_PATH = Path(__file__).parent.parent / "data" / "boycott_products.csv"
+
+
+class EchoBackend(InferenceBackend):
+    """Backend answering "model: <prompt>", optionally slowly."""
+
+    name = "echo"
+
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.batches = []
+
+    def generate_batch(self, prompts):
+        self.batches.append(list(prompts))
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("model crashed")
+        return [f"model: {prompt}" for prompt in prompts]
+
+
+class WordBackend(EchoBackend):
+    """Backend streaming "model: <prompt>" word by word."""
+
+    def stream(self, prompt):
+        for word in self.generate_batch([prompt])[0].split(" "):
+            yield word + " "
+
+
+def collect(pieces):
+    """Gather the pieces of an async stream."""
+    async def scenario():
+        return [piece async for piece in pieces]
+    return asyncio.run(scenario())
+
+
+@pytest.fixture
+def model_server():
+    """Local stand-in model server recording the batches it gets."""
+    batches = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            prompts = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["prompts"]
+            batches.append(prompts)
+            body = json.dumps({"responses": [p.upper() for p in prompts]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/generate", batches
+    server.shutdown()
+    server.server_close()
+
+
+def generate_all(scheduler, prompts):
+    """Send prompts concurrently and collect the answers."""
+    async def scenario():
+        return await asyncio.gather(*(scheduler.generate(p) for p in prompts),
+                                    return_exceptions=True)
+    return asyncio.run(scenario())
+
+
+class TestMicroBatchScheduler:
+    """Test batching, fan-out and failures."""
+
+    def test_batches_concurrent_prompts(self):
+        """Test concurrent prompts share batches and get their own answers."""
+        backend = EchoBackend(delay=0.01)
+        scheduler = MicroBatchScheduler(backend, max_batch=8, max_wait=0.05)
+        prompts = [f"p{i}" for i in range(20)]
+        assert generate_all(scheduler, prompts) == [f"model: {p}" for p in prompts]
+        assert [len(b) for b in backend.batches] == [8, 8, 4]
+        assert scheduler.stats()["largest_batch"] == 8 and scheduler.stats()["prompts"] == 20
+        scheduler.close()
+
+    def test_lone_prompt_waits_at_most_max_wait(self):
+        """Test a single prompt is sent once the wait is over."""
+        scheduler = MicroBatchScheduler(EchoBackend(), max_batch=8, max_wait=0.02)
+        start = time.perf_counter()
+        assert generate_all(scheduler, ["hi"]) == ["model: hi"]
+        assert time.perf_counter() - start < 0.5
+        scheduler.close()
+
+    def test_timeout(self):
+        """Test slow batches raise InferenceUnavailable."""
+        scheduler = MicroBatchScheduler(EchoBackend(delay=0.3), max_wait=0.001, timeout=0.05)
+        results = generate_all(scheduler, ["a", "b"])
+        assert all(isinstance(r, InferenceUnavailable) for r in results)
+        assert scheduler.stats()["timeouts"] == 2
+        scheduler.close()
+
+    def test_backend_errors(self):
+        """Test a failing batch fails each of its prompts."""
+        scheduler = MicroBatchScheduler(EchoBackend(fail=True), max_wait=0.001)
+        results = generate_all(scheduler, ["a", "b"])
+        assert all(isinstance(r, InferenceUnavailable) for r in results)
+        assert scheduler.stats()["errors"] >= 1
+        scheduler.close()
+
+    def test_http_backend(self, model_server):
+        """Test batches are posted to a local model server."""
+        url, batches = model_server
+        scheduler = MicroBatchScheduler(HTTPInferenceBackend(url), max_batch=4, max_wait=0.05)
+        assert generate_all(scheduler, ["a", "b", "c"]) == ["A", "B", "C"]
+        assert batches == [["a", "b", "c"]]
+        scheduler.close()
+
+
+class TestChatFallback:
+    """Test the AI service falls back to the rules."""
+
+    def test_uses_backend(self):
+        """Test answers come from the backend when it works."""
+        products = ProductStore.from_csv(str(DATA_PATH))
+        scheduler = MicroBatchScheduler(EchoBackend(), max_wait=0.001)
+        service = AIService(products, inference=scheduler)
+        assert asyncio.run(service.respond_async("hello")) == "model: hello"
+        scheduler.close()
+
+    def test_falls_back_on_timeout(self):
+        """Test a timed out backend is replaced by the rule-based answer."""
+        products = ProductStore.from_csv(str(DATA_PATH))
+        scheduler = MicroBatchScheduler(EchoBackend(delay=0.3), max_wait=0.001, timeout=0.05)
+        service = AIService(products, inference=scheduler)
+        assert asyncio.run(service.respond_async("Coca-Cola?")) == service.respond("Coca-Cola?")
+        scheduler.close()
+
+    def test_no_backend(self):
+        """Test the rules answer without a backend."""
+        service = AIService(ProductStore.from_csv(str(DATA_PATH)))
+
+        async def fallback(message):
+            return "fallback"
+        assert asyncio.run(service.respond_async("hi", fallback)) == "fallback"
+        assert asyncio.run(service.respond_async("hi")) == service.respond("hi")
+
+
+class TestChatStream:
+    """Test streamed answers."""
+
+    def test_relays_backend_pieces(self):
+        """Test the backend's pieces are relayed as they come."""
+        products = ProductStore.from_csv(str(DATA_PATH))
+        scheduler = MicroBatchScheduler(WordBackend())
+        service = AIService(products, inference=scheduler)
+        assert collect(service.respond_stream_async("hi there")) == ["model: ", "hi ", "there "]
+        assert scheduler.stats()["streams"] == 1
+        scheduler.close()
+
+    def test_default_stream_is_whole_answer(self):
+        """Test backends without streaming answer in one piece."""
+        scheduler = MicroBatchScheduler(EchoBackend())
+        assert collect(scheduler.stream("hi")) == ["model: hi"]
+        scheduler.close()
+
+    def test_falls_back_to_rules(self):
+        """Test a failing backend is replaced by the streamed rule-based answer."""
+        products = ProductStore.from_csv(str(DATA_PATH))
+        scheduler = MicroBatchScheduler(WordBackend(fail=True))
+        service = AIService(products, inference=scheduler)
+        message = "Pourquoi boycotter?"
+        assert collect(service.respond_stream_async(message)) == list(service.respond_stream(message))
+        scheduler.close()
+
+
+class TestLoadBackend:
+    """Test backends are picked from settings."""
+
+    def test_specs(self):
+        """Test the rules, http and class path settings."""
+        assert load_backend("rules") is None
+        assert isinstance(load_backend("http", "http://localhost:9/"), HTTPInferenceBackend)
+        assert isinstance(load_backend("tests.test_inference:EchoBackend"), EchoBackend)
+        with pytest.raises(ValueError):
+            load_backend("http")
+        with pytest.raises(ValueError):
+            load_backend("nonsense")
+        with pytest.raises(TypeError):
+            load_backend("pathlib:Path")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
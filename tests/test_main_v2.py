@@ -0,0 +1,55 @@
+"""Tests for the hardened v2 API."""
+
+import csv
+import io
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import main_v2
+from app.config import RATE_LIMIT_REQUESTS
+from app.rate_limit import MemoryStore, RateLimiter
+
+# The trusted host middleware refuses TestClient's default "testserver"
+client = TestClient(main_v2.app, base_url="http://localhost")
+
+
+class TestRateLimit:
+    """Test requests past the limit are refused with their headers."""
+
+    def test_default_window(self):
+        """Test the v2 API keeps its per-minute window."""
+        assert main_v2.rate_limiter.time_window == 60
+        assert main_v2.rate_limiter.max_requests == RATE_LIMIT_REQUESTS
+
+    def test_limited_request(self, monkeypatch):
+        """Test a client gets its burst, then 429 with Retry-After."""
+        monkeypatch.setattr(main_v2, "rate_limiter", RateLimiter(2, 60, MemoryStore()))
+        first = client.get("/api/health")
+        assert first.status_code == 200
+        assert first.headers["X-RateLimit-Remaining"] == "1"
+        assert client.get("/api/health").status_code == 200
+        refused = client.get("/api/health")
+        assert refused.status_code == 429
+        assert int(refused.headers["Retry-After"]) > 0
+
+
+class TestDownload:
+    """Test the CSV download."""
+
+    def test_download_quoted(self, monkeypatch):
+        """Test the download parses back to the loaded products."""
+        monkeypatch.setattr(main_v2, "rate_limiter", None)
+        response = client.get("/api/download")
+        assert response.status_code == 200
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert len(rows) == len(main_v2.boycott_data.products)
+        assert rows[0]["boycott_product"] == main_v2.boycott_data.products[0]["boycott_product"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,151 @@
+"""Tests for the columnar product store."""
+
+import csv
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.product_store import CodedColumn, IntColumn, Product, ProductStore, ValueIndex
+
+DATA_PATH = Path(__file__).parent.parent / "data" / "boycott_products.csv"
+
+
+@pytest.fixture(scope="module")
+def rows():
+    """Dataset rows as csv.DictReader returns them."""
+    with open(DATA_PATH, encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+@pytest.fixture(scope="module")
+def store():
+    """Dataset loaded into a ProductStore."""
+    return ProductStore.from_csv(str(DATA_PATH))
+
+
+class TestProductStore:
+    """Test the store against the DictReader rows it replaces."""
+
+    def test_same_rows(self, store, rows):
+        """Test every product equals the original dict row."""
+        assert len(store) == len(rows)
+        for product, row in zip(store, rows):
+            assert product == row
+            assert dict(product) == row
+
+    def test_accessors(self, store):
+        """Test dict-style accessors."""
+        product = store[0]
+        assert product.get("boycott_product") == "Coca-Cola"
+        assert product["id"] == "1"
+        assert product.get("missing", "N/A") == "N/A"
+        assert "brand" in product
+        with pytest.raises(KeyError):
+            product["missing"]
+
+    def test_slicing_and_negative_index(self, store, rows):
+        """Test list-style indexing."""
+        assert [p.get("id") for p in store[:5]] == [r["id"] for r in rows[:5]]
+        assert store[-1] == rows[-1]
+        with pytest.raises(IndexError):
+            store[len(store)]
+
+    def test_categorical_columns_are_coded(self, store):
+        """Test categorical columns keep one copy of each value."""
+        category = store.columns["category"]
+        assert isinstance(category, CodedColumn)
+        assert len(category.values) < len(store)
+        assert isinstance(store.columns["id"], IntColumn)
+
+    def test_empty_store(self):
+        """Test an empty store is falsy."""
+        store = ProductStore.from_rows([], [])
+        assert not store
+        assert list(store) == []
+
+
+class TestColumns:
+    """Test column encodings."""
+
+    def test_code_array_widens(self):
+        """Test codes switch to wider arrays past 256 values."""
+        column = CodedColumn()
+        for i in range(300):
+            column.append(str(i))
+        assert column.codes.typecode == "H"
+        assert [column[i] for i in (0, 255, 256, 299)] == ["0", "255", "256", "299"]
+
+    def test_non_canonical_ids_stay_text(self):
+        """Test ids like '007' are not packed as integers."""
+        store = ProductStore.from_rows(["id"], [["007"], ["8"]])
+        assert store[0]["id"] == "007"
+        assert not isinstance(store.columns["id"], IntColumn)
+
+    def test_non_ascii_and_huge_ids_stay_text(self):
+        """Test ids that would not round-trip through int() are kept as text."""
+        for odd in ("\u00b2", "\u0663", "9" * 25):
+            store = ProductStore.from_rows(["id"], [[odd], ["8"]])
+            assert store[0]["id"] == odd
+            assert not isinstance(store.columns["id"], IntColumn)
+
+    def test_short_rows_padded(self):
+        """Test missing trailing fields read as None, like DictReader."""
+        store = ProductStore.from_rows(["id", "brand"], [["1"]])
+        assert store[0].get("brand") is None
+
+    def test_from_dicts(self):
+        """Test building from dict rows."""
+        store = ProductStore.from_dicts([{"name": "A", "category": "X"}, {"name": "B"}])
+        assert store[1].get("category") is None
+        assert isinstance(store[0], Product)
+
+
+class TestValueIndex:
+    """Test category/intensity indexes and filtered iteration."""
+
+    def test_rows_case_insensitive(self, store, rows):
+        """Test lookups ignore case, like the scans they replace."""
+        index = ValueIndex(store.column("category"))
+        expected = [i for i, r in enumerate(rows) if r["category"].lower() == "beverages"]
+        assert list(index.rows("BEVERAGES")) == expected
+        assert list(index.rows("unknown")) == []
+
+    def test_mixed_case_values_grouped(self):
+        """Test values differing only by case share one posting list."""
+        store = ProductStore.from_rows(["intensity"], [["High"], ["low"], ["high"]])
+        index = ValueIndex(store.column("intensity"))
+        assert list(index.rows("high")) == [0, 2]
+
+    def test_iter_where_matches_scan(self, store, rows):
+        """Test combined filters return the same rows in the same order."""
+        for category in [None, "Beverages", "food", "Nope"]:
+            for intensity in [None, "High", "medium"]:
+                expected = [
+                    r for r in rows
+                    if (not category or r["category"].lower() == category.lower())
+                    and (not intensity or r["intensity"].lower() == intensity.lower())
+                ]
+                found = list(store.iter_where(category=category, intensity=intensity))
+                assert found == expected, (category, intensity)
+
+    def test_iter_where_is_lazy(self, store):
+        """Test products are produced on demand."""
+        products = store.iter_where(intensity="High")
+        first = next(products)
+        assert first.get("intensity") == "High"
+
+    def test_value_counts(self, store, rows):
+        """Test per-value counts keep first-seen order."""
+        expected = {}
+        for r in rows:
+            expected[r["intensity"]] = expected.get(r["intensity"], 0) + 1
+        assert store.value_counts("intensity") == expected
+        assert list(store.value_counts("intensity")) == list(expected)
+        assert store.value_counts("missing", "Unknown") == {"Unknown": len(rows)}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,144 @@
+"""Tests for the GCRA rate limiter and its stores."""
+
+import multiprocessing
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.rate_limit import (
+    LocalRedis, MemoryStore, RateLimiter, RedisStore, SharedMemoryStore, create_store,
+)
+
+
+class Clock:
+    """Manually advanced clock."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_store(kind, clock, tmp_path):
+    """Store of a kind reading the given clock."""
+    if kind == "memory":
+        return MemoryStore(clock=clock)
+    if kind == "shared":
+        return SharedMemoryStore(str(tmp_path / "limits"), slots=64, clock=clock)
+    return RedisStore(LocalRedis(clock=clock))
+
+
+def hit_shared(path, count):
+    """Count requests from another process."""
+    limiter = RateLimiter(100, 60, SharedMemoryStore(path, slots=64))
+    return [limiter.is_allowed("client") for _ in range(count)]
+
+
+@pytest.mark.parametrize("kind", ["memory", "shared", "redis"])
+class TestGCRA:
+    """Test the limit is the same whatever the store."""
+
+    def test_burst_then_refill(self, kind, tmp_path):
+        """Test a full burst, a refusal, then one request per interval."""
+        clock = Clock()
+        limiter = RateLimiter(10, 60, make_store(kind, clock, tmp_path))
+        results = [limiter.hit("a") for _ in range(10)]
+        assert all(r.allowed for r in results)
+        assert [r.remaining for r in results] == list(range(9, -1, -1))
+
+        refused = limiter.hit("a")
+        assert not refused.allowed
+        assert refused.retry_after == pytest.approx(6)
+
+        clock.now += 6
+        assert limiter.is_allowed("a")
+        assert not limiter.is_allowed("a")
+        assert limiter.is_allowed("b")
+
+    def test_idle_client_starts_afresh(self, kind, tmp_path):
+        """Test a full window of idleness restores the whole burst."""
+        clock = Clock()
+        limiter = RateLimiter(5, 10, make_store(kind, clock, tmp_path))
+        for _ in range(5):
+            limiter.hit("a")
+        clock.now += 10
+        assert limiter.hit("a").remaining == 4
+
+
+class TestStores:
+    """Test eviction and sharing."""
+
+    def test_memory_evicts_idle_keys(self):
+        """Test expired keys are dropped as other requests come in."""
+        clock = Clock()
+        store = MemoryStore(clock=clock)
+        limiter = RateLimiter(10, 60, store)
+        for client in range(100):
+            limiter.hit(f"c{client}")
+        assert len(store) == 100
+        clock.now += 7
+        limiter.hit("new")
+        assert len(store) == 1
+
+    def test_memory_key_cap(self):
+        """Test the least recently seen keys go past the cap."""
+        store = MemoryStore(max_keys=3, clock=Clock())
+        limiter = RateLimiter(10, 60, store)
+        for client in "abcd":
+            limiter.hit(client)
+        assert len(store) == 3 and store.stats()["evictions"] == 1
+
+    def test_shared_between_processes(self, tmp_path):
+        """Test workers of separate processes count against one limit."""
+        path = str(tmp_path / "limits")
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(2) as pool:
+            results = pool.starmap(hit_shared, [(path, 60), (path, 60)])
+        assert sum(sum(r) for r in results) == 100
+
+    def test_shared_table_full(self, tmp_path):
+        """Test more clients than slots reuse the stalest slots."""
+        clock = Clock()
+        store = SharedMemoryStore(str(tmp_path / "limits"), slots=8, clock=clock)
+        limiter = RateLimiter(10, 60, store)
+        for client in range(50):
+            clock.now += 0.01
+            assert limiter.is_allowed(f"c{client}")
+        assert store.stats()["keys"] == 8
+        store.close()
+
+    def test_redis_keys_expire(self):
+        """Test stand-in Redis keys expire once the bucket is full again."""
+        clock = Clock()
+        client = LocalRedis(clock=clock)
+        limiter = RateLimiter(10, 60, RedisStore(client, prefix="t:"))
+        limiter.hit("a")
+        assert client.get("t:a") is not None
+        clock.now += 6
+        assert client.get("t:a") is None
+
+    def test_create_store(self, tmp_path):
+        """Test stores are picked from settings."""
+        assert isinstance(create_store("memory"), MemoryStore)
+        assert isinstance(create_store("shared", shared_path=str(tmp_path / "s")), SharedMemoryStore)
+        assert isinstance(create_store("redis", "local"), RedisStore)
+        with pytest.raises(ValueError):
+            create_store("redis")
+        with pytest.raises(ValueError):
+            create_store("disk")
+
+
+def test_headers():
+    """Test refused requests carry Retry-After."""
+    limiter = RateLimiter(1, 60, MemoryStore(clock=Clock()))
+    assert "Retry-After" not in RateLimiter.headers(limiter.hit("a"))
+    headers = RateLimiter.headers(limiter.hit("a"))
+    assert headers["Retry-After"] == "60" and headers["X-RateLimit-Remaining"] == "0"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
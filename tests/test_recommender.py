@@ -0,0 +1,128 @@
+"""Tests for the category-indexed recommendations."""
+
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.ai_service import AIService
+from app.dataset import DatasetSnapshot
+from app.product_store import ProductStore
+from app.recommender import CategoryIndex
+
+DATA_PATH = Path(__file__).parent.parent / "data" / "boycott_products.csv"
+
+
+def scan_recommendations(service, user_history, limit=5):
+    """The catalog scan get_recommendations used to run."""
+    recommendations = []
+    viewed_categories = set()
+    for product_name in user_history:
+        for product in service.products:
+            if product_name.lower() in product.get('boycott_product', '').lower():
+                viewed_categories.add(product.get('category', ''))
+    for product in service.products:
+        if product.get('category', '') in viewed_categories:
+            recommendations.append({
+                "product": product.get('boycott_product'),
+                "brand": product.get('brand'),
+                "alternative": product.get('tunisian_alternative'),
+                "category": product.get('category'),
+                "score": service._calculate_relevance_score(product, viewed_categories)
+            })
+    recommendations.sort(key=lambda x: x['score'], reverse=True)
+    return recommendations[:limit]
+
+
+@pytest.fixture(scope="module")
+def products():
+    """Dataset loaded into a ProductStore."""
+    return ProductStore.from_csv(str(DATA_PATH))
+
+
+@pytest.fixture(scope="module")
+def service(products):
+    """AI service over the dataset."""
+    return AIService(products)
+
+
+def histories(products, count=200, seed=3):
+    """Histories of names, fragments and unknown products."""
+    rng = random.Random(seed)
+    names = [p.get('boycott_product') for p in products]
+    pieces = names + [n[:rng.randint(1, len(n))] for n in names] + ["", "zzz", "COCA", "-"]
+    return [[rng.choice(pieces) for _ in range(rng.randint(0, 4))] for _ in range(count)]
+
+
+class TestRecommendations:
+    """Test the index gives the recommendations of the catalog scan."""
+
+    def test_same_as_scan(self, service, products):
+        """Test every history gets the same recommendations as before."""
+        for history in histories(products):
+            for limit in (1, 5, 50):
+                assert service.get_recommendations(history, limit) == \
+                    scan_recommendations(service, history, limit), history
+
+    def test_alternatives_first(self):
+        """Test products with an alternative rank first, then catalog order."""
+        service = AIService(ProductStore.from_dicts([
+            {"boycott_product": "A1", "category": "X", "tunisian_alternative": ""},
+            {"boycott_product": "A2", "category": "X", "tunisian_alternative": "T2"},
+            {"boycott_product": "B1", "category": "Y", "tunisian_alternative": "T3"},
+            {"boycott_product": "C1", "category": "Z", "tunisian_alternative": "T4"},
+        ]))
+        result = service.get_recommendations(["a1", "b"], limit=3)
+        assert [r["product"] for r in result] == ["A2", "B1", "A1"]
+        assert result[0]["score"] == pytest.approx(1.0)
+
+    def test_shared_name_index(self, products):
+        """Test the snapshot's name index can be reused."""
+        snapshot = DatasetSnapshot(products)
+        shared = AIService(products, name_index=snapshot.indexes["boycott_product"])
+        assert shared._state.categories.name_index is snapshot.indexes["boycott_product"]
+        assert shared.get_recommendations(["pepsi"]) == \
+            scan_recommendations(shared, ["pepsi"])
+
+    def test_reload(self, products):
+        """Test recommendations follow a reloaded catalog."""
+        service = AIService(products)
+        service.reload(ProductStore.from_dicts([
+            {"boycott_product": "Zzyzx", "category": "Q", "tunisian_alternative": "T"},
+        ]))
+        assert [r["product"] for r in service.get_recommendations(["zz"])] == ["Zzyzx"]
+        assert service.get_recommendations(["coca"]) == []
+
+
+class TestCategoryIndex:
+    """Test the category index on its own."""
+
+    def test_top_rows(self):
+        """Test rows are merged across categories by score."""
+        rows = [{"boycott_product": f"p{i}", "category": "ab"[i % 2], "s": i % 3}
+                for i in range(10)]
+        index = CategoryIndex(rows, lambda p: p["s"])
+        expected = sorted(range(10), key=lambda r: (-rows[r]["s"], r))
+        assert index.top_rows({"a", "b"}, 10) == expected
+        assert index.top_rows({"a"}, 2) == [2, 8]
+        assert index.top_rows({"missing"}, 3) == []
+        assert index.top_rows({"a"}, 0) == []
+
+    def test_categories_for(self):
+        """Test name lookups match substrings and are cached."""
+        index = CategoryIndex([
+            {"boycott_product": "Coca-Cola", "category": "Drinks"},
+            {"boycott_product": "Cola Chips", "category": "Snacks"},
+            {"boycott_product": "Other", "category": None},
+        ], lambda p: 0.0)
+        assert index.categories_for("COLA") == {"Drinks", "Snacks"}
+        assert index.categories_for("a-c") == {"Drinks"}
+        assert index.categories_for("") == {"Drinks", "Snacks", None}
+        assert index.categories_for("cola") is index.categories_for("Cola")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
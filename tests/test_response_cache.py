@@ -0,0 +1,99 @@
+"""Tests for the encoded response cache."""
+
+import gzip
+import json
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.response_cache import ResponseCache, accepts_gzip, encode_json, not_modified_since
+
+
+class Version:
+    """Dataset version bumped by hand."""
+
+    def __init__(self):
+        self.value = 1
+
+    def __call__(self):
+        return self.value
+
+
+class TestResponseCache:
+    """Test caching, versions and limits."""
+
+    def test_builds_once_per_version(self):
+        """Test a body is built on the first request and after each change."""
+        version = Version()
+        cache = ResponseCache(version)
+        builds = []
+
+        def build():
+            builds.append(1)
+            return {"rows": ["é"] * 500, "version": version.value}
+        key = ResponseCache.key("products", {"limit": 50, "category": None})
+        first = cache.get_or_build(key, build)
+        assert cache.get_or_build(key, build) is first
+        assert json.loads(gzip.decompress(first.gzip_body)) == json.loads(first.body)
+        assert len(builds) == 1
+
+        version.value = 2
+        assert json.loads(cache.get_or_build(key, build).body)["version"] == 2
+        assert len(builds) == 2
+
+    def test_not_kept_when_changed_during_build(self):
+        """Test a body built across a dataset swap is served but not kept."""
+        version = Version()
+        cache = ResponseCache(version)
+
+        def build():
+            version.value += 1
+            return {}
+        cache.get_or_build(("stats",), build)
+        assert len(cache) == 0
+
+    def test_limits_and_clear(self):
+        """Test least recently used bodies go past the limits."""
+        cache = ResponseCache(Version(), max_entries=2)
+        for name in "abc":
+            cache.get_or_build((name,), lambda: [name])
+        assert len(cache) == 2 and cache.get(("a",), 1) is None
+        cache.clear()
+        assert len(cache) == 0 and cache.stats()["bytes"] == 0
+
+    def test_key_ignores_unset_params(self):
+        """Test parameter order and unset ones do not matter."""
+        assert ResponseCache.key("p", {"b": 1, "a": None, "c": 2}) == \
+            ResponseCache.key("p", {"c": 2, "b": 1})
+
+    def test_encoding_matches_fastapi(self):
+        """Test bodies are encoded like FastAPI's JSONResponse."""
+        from fastapi.responses import JSONResponse
+        content = {"a": ["é", 1, None], "b": {"x": 2.5}}
+        assert encode_json(content) == JSONResponse(content).body
+
+    @pytest.mark.parametrize("header, expected", [
+        ("gzip, deflate, br", True), ("*", True), ("GZIP;q=0.5", True),
+        ("gzip;q=0", False), ("br", False), ("", False), (None, False),
+    ])
+    def test_accepts_gzip(self, header, expected):
+        """Test Accept-Encoding parsing."""
+        assert accepts_gzip(header) is expected
+
+
+    @pytest.mark.parametrize("header, expected", [
+        ("Mon, 01 Jun 2026 00:00:00 GMT", True), ("Sun, 31 May 2026 23:59:59 GMT", False),
+        ("Fri, 01 Jan 2100 00:00:00 GMT", False), ("not a date", False), (None, False),
+    ])
+    def test_not_modified_since(self, header, expected):
+        """Test If-Modified-Since: older copies and dates from the future revalidate."""
+        now = datetime(2026, 6, 2, tzinfo=timezone.utc)
+        assert not_modified_since(header, "Mon, 01 Jun 2026 00:00:00 GMT", now) is expected
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,214 @@
+"""Tests for the search index module."""
+
+import csv
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.search_index import (
+    Autocomplete, PrefixTrie, TokenIndex, TrigramIndex, normalize_name, substring_distance, tokenize
+)
+
+DATA_PATH = Path(__file__).parent.parent / "data" / "boycott_products.csv"
+
+
+def linear_search(values, query):
+    """Reference implementation: the original full substring scan."""
+    query_lower = query.lower()
+    return [row for row, value in enumerate(values) if query_lower in value.lower()]
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    """Rows of the shipped dataset."""
+    with open(DATA_PATH, encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+@pytest.fixture(scope="module")
+def names(catalog):
+    """Product name column."""
+    return [row["boycott_product"] for row in catalog]
+
+
+class TestTokenize:
+    """Test tokenization."""
+
+    def test_tokenize_lowercases_and_splits(self):
+        """Test tokens are lowercase word runs."""
+        assert tokenize("Coca-Cola Zero") == ["coca", "cola", "zero"]
+
+    def test_tokenize_keeps_accents(self):
+        """Test accented letters stay inside tokens."""
+        assert tokenize("Nestlé S.A.") == ["nestlé", "s", "a"]
+
+
+class TestTokenIndex:
+    """Test that the token index matches the linear scan."""
+
+    def test_exact_name(self, names):
+        """Test looking up a full product name."""
+        index = TokenIndex(names)
+        assert index.search("Coca-Cola") == linear_search(names, "Coca-Cola")
+        assert index.search("Coca-Cola")
+
+    def test_no_match(self, names):
+        """Test a query that matches nothing."""
+        index = TokenIndex(names)
+        assert index.search("RandomNonExistentProduct123") == []
+
+    def test_every_substring_of_every_value(self, catalog):
+        """Test all substrings of every name and brand."""
+        for field in ("boycott_product", "brand", "tunisian_alternative"):
+            values = [row[field] for row in catalog]
+            index = TokenIndex(values)
+            for value in set(values):
+                for start in range(len(value)):
+                    for end in range(start + 1, len(value) + 1):
+                        query = value[start:end]
+                        assert index.search(query) == linear_search(values, query), query
+
+    def test_random_queries(self, names):
+        """Test random queries mixing letters, spaces and punctuation."""
+        rng = random.Random(42)
+        alphabet = "abcdeilmnorst -'."
+        index = TokenIndex(names)
+        for _ in range(2000):
+            query = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 6)))
+            assert index.search(query) == linear_search(names, query), query
+
+    def test_punctuation_only_query(self, names):
+        """Test queries without word characters fall back to a scan."""
+        index = TokenIndex(names)
+        assert index.search("-") == linear_search(names, "-")
+        assert index.search(" ") == linear_search(names, " ")
+
+    def test_empty_values(self):
+        """Test empty and missing values are indexed safely."""
+        index = TokenIndex(["", "Pepsi", None])
+        assert index.search("pep") == [1]
+        assert index.search("x") == []
+
+
+class TestSubstringDistance:
+    """Test approximate substring matching."""
+
+    def test_exact_substring(self):
+        """Test a contained pattern has distance 0."""
+        assert substring_distance("cola", "coca-cola", 2) == 0
+
+    def test_one_typo(self):
+        """Test a missing letter costs one edit."""
+        assert substring_distance("starbuks", "starbucks corporation", 2) == 1
+
+    def test_bound(self):
+        """Test distances above the bound are capped."""
+        assert substring_distance("zzzzzz", "coca-cola", 2) == 3
+
+
+@pytest.fixture(scope="module")
+def index(catalog):
+    """Trigram index over the shipped dataset."""
+    return TrigramIndex({f: [row[f] for row in catalog] for f in TestTrigramIndex.FIELDS})
+
+
+class TestTrigramIndex:
+    """Test the trigram index."""
+
+    FIELDS = ("boycott_product", "brand", "tunisian_alternative")
+
+    def test_substring_matches_linear_scan(self, index, catalog):
+        """Test substring lookups agree with a scan of all fields."""
+        for query in ["coca col", "cola", "nes", "ca", "buck", "xyz", "Lay's"]:
+            expected = sorted(set().union(*(
+                linear_search([row[f] for row in catalog], query) for f in self.FIELDS
+            )))
+            assert index.search(query) == expected, query
+
+    def test_field_restriction(self, index):
+        """Test lookups can be limited to some fields."""
+        assert index.search("Cactus")
+        assert index.search("Cactus", fields=["boycott_product", "brand"]) == []
+
+    def test_fuzzy_typo(self, index, catalog):
+        """Test misspelled names are found."""
+        rows = [row for row, _ in index.fuzzy_search("starbuks")]
+        assert "Starbucks" in [catalog[row]["boycott_product"] for row in rows]
+
+    def test_fuzzy_exact_first(self, index):
+        """Test exact matches rank before typo matches."""
+        matches = index.fuzzy_search("pepsico")
+        distances = [distance for _, distance in matches]
+        assert distances == sorted(distances)
+        assert distances[0] == 0
+
+    def test_fuzzy_matches_brute_force(self, index, catalog):
+        """Test the count filter never drops a real match."""
+        for query in ["starbuks", "mcdonals", "nescaffe", "danonne", "colgat palmolive"]:
+            expected = []
+            for row, product in enumerate(catalog):
+                distance = min(substring_distance(query, product[f].lower(), 1) for f in self.FIELDS)
+                if distance <= 1:
+                    expected.append((row, distance))
+            expected.sort(key=lambda match: match[1])
+            assert index.fuzzy_search(query, max_edits=1) == expected, query
+
+
+class TestPrefixTrie:
+    """Test the compressed prefix trie."""
+
+    def test_top_k_by_rank(self):
+        """Test completions come back best rank first, capped at k."""
+        keys = ["coca cola", "coca", "cola", "colgate", "costa"]
+        trie = PrefixTrie(ranks=[3, 1, 4, 0, 2], top_k=3)
+        for entry_id, key in enumerate(keys):
+            trie.insert(key, entry_id)
+        trie.finalize()
+        assert trie.complete("co") == (3, 1, 4)
+        assert trie.complete("coc") == (1, 0)
+        assert trie.complete("coca c") == (0,)
+        assert trie.complete("colg") == (3,)
+        assert trie.complete("cx") == ()
+
+    def test_prefix_ending_inside_edge(self):
+        """Test lookups that stop in the middle of a compressed edge."""
+        trie = PrefixTrie(ranks=[0], top_k=5)
+        trie.insert("starbucks", 0)
+        trie.finalize()
+        assert trie.complete("star") == (0,)
+        assert trie.complete("starbucks") == (0,)
+        assert trie.complete("starbucksx") == ()
+
+
+class TestAutocomplete:
+    """Test product and brand autocomplete."""
+
+    def test_normalize_name(self):
+        """Test accents and punctuation are normalized."""
+        assert normalize_name("Nestlé") == "nestle"
+        assert normalize_name("Coca-Cola") == "coca cola"
+
+    def test_word_start_completion(self, catalog):
+        """Test completion from the start of any word."""
+        suggestions = Autocomplete(catalog).suggest("cola")
+        assert ("Coca-Cola", "product", 0) in suggestions
+
+    def test_high_intensity_first(self, catalog):
+        """Test stronger boycotts rank first."""
+        suggestions = Autocomplete(catalog).suggest("c", 10)
+        ranks = [catalog[row]["intensity"] for _, _, row in suggestions]
+        order = {"High": 0, "Medium": 1, "Low": 2}
+        assert ranks == sorted(ranks, key=order.get)
+
+    def test_brand_deduplicated(self, catalog):
+        """Test a brand shared by several products is suggested once."""
+        suggestions = Autocomplete(catalog).suggest("pepsico", 10)
+        assert [text for text, kind, _ in suggestions if kind == "brand"] == ["PepsiCo"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,131 @@
+"""Tests for the TF-IDF similarity recommendations."""
+
+import math
+import random
+import sys
+from collections import Counter
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.ai_service import AIService
+from app.product_store import ProductStore
+from app.search_index import tokenize
+from app.similarity import SIMILARITY_FIELDS, SimilarityIndex
+from benchmarks.catalog import synthetic_catalog
+
+DATA_PATH = Path(__file__).parent.parent / "data" / "boycott_products.csv"
+
+
+def dense_vector(counts, idf):
+    """Normalized TF-IDF vector as a plain dict."""
+    weights = {t: c * idf[t] for t, c in counts.items() if t in idf}
+    norm = math.sqrt(sum(w * w for w in weights.values()))
+    return {t: w / norm for t, w in weights.items()} if norm else {}
+
+
+def brute_force(products):
+    """Cosine similarity of a history against every product, sorted."""
+    docs = [Counter(t for f in SIMILARITY_FIELDS for t in tokenize(p.get(f) or ""))
+            for p in products]
+    df = Counter(t for doc in docs for t in doc)
+    idf = {t: math.log((1 + len(docs)) / (1 + n)) + 1 for t, n in df.items()}
+    vectors = [dense_vector(doc, idf) for doc in docs]
+    names = [(p.get("boycott_product") or "").lower() for p in products]
+
+    def rank(history, k):
+        query, seen = Counter(), set()
+        for entry in history:
+            if entry and entry.lower() in names:
+                row = names.index(entry.lower())
+                seen.add(row)
+                vector = vectors[row]
+            else:
+                vector = dense_vector(Counter(tokenize(entry)), idf)
+            for t, w in vector.items():
+                query[t] += w
+        norm = math.sqrt(sum(w * w for w in query.values()))
+        scores = [(sum(query[t] * w for t, w in vector.items()) / norm if norm else 0.0, row)
+                  for row, vector in enumerate(vectors) if row not in seen]
+        return [(row, score) for score, row in sorted(scores, key=lambda s: (-s[0], s[1]))
+                if score > 0][:k]
+    return rank
+
+
+def assert_same_ranking(got, expected):
+    """Same rows in the same order, up to float rounding on ties."""
+    assert [s for _, s in got] == pytest.approx([s for _, s in expected])
+    for (row, score), (other, _) in zip(got, expected):
+        if row != other:
+            assert score == pytest.approx(dict(expected).get(row, -1))
+
+
+class TestSimilarityIndex:
+    """Test the grouped sparse product against a dense computation."""
+
+    @pytest.mark.parametrize("size", [50, 3000])
+    def test_same_as_brute_force(self, size):
+        """Test rankings and scores match, with and without frequent terms."""
+        catalog = synthetic_catalog(size, seed=size)
+        products = ProductStore.from_dicts(catalog)
+        index = SimilarityIndex(products)
+        if size > 1000:
+            assert index.dense_postings, "catalog too small to exercise groups"
+        reference = brute_force(products)
+        rng = random.Random(size)
+        names = [p["boycott_product"] for p in catalog]
+        for _ in range(25):
+            history = [rng.choice([rng.choice(names), rng.choice(names).split()[0],
+                                   rng.choice(["Coffee", "israeli occupation", "zzz", ""])])
+                       for _ in range(rng.randint(1, 3))]
+            for k in (1, 5, 40):
+                assert_same_ranking(index.top_rows(history, k), reference(history, k))
+
+    def test_named_products_excluded(self):
+        """Test products named in the history are not recommended back."""
+        products = ProductStore.from_csv(str(DATA_PATH))
+        index = SimilarityIndex(products)
+        rows = [row for row, _ in index.top_rows(["Coca-Cola"], 10)]
+        assert 0 not in rows
+        assert index.top_rows(["Coca-Cola"], 10, exclude_seen=False)[0][0] == 0
+
+    def test_unknown_history(self):
+        """Test a history without known terms gives nothing."""
+        index = SimilarityIndex(ProductStore.from_csv(str(DATA_PATH)))
+        assert index.top_rows(["qwxz", ""], 5) == []
+        assert index.top_rows([], 5) == []
+
+
+class TestSimilarityMode:
+    """Test the similarity mode of the AI service."""
+
+    def test_recommendations(self):
+        """Test similar products are returned with their scores."""
+        service = AIService(ProductStore.from_csv(str(DATA_PATH)))
+        result = service.get_recommendations(["Nescafé"], limit=3, mode="similarity")
+        assert 0 < len(result) <= 3
+        assert result[0]["score"] >= result[-1]["score"] > 0
+        assert {"product", "brand", "alternative", "category", "score"} <= set(result[0])
+
+    def test_follows_reload(self):
+        """Test the index is rebuilt for a reloaded catalog."""
+        service = AIService(ProductStore.from_csv(str(DATA_PATH)))
+        assert service.get_recommendations(["coffee"], mode="similarity")
+        service.reload(ProductStore.from_dicts([
+            {"boycott_product": "Zzyzx Tea", "category": "Tea", "brand": "Zz"},
+            {"boycott_product": "Other Tea", "category": "Tea", "brand": "Yy"},
+        ]))
+        assert [r["product"] for r in service.get_recommendations(["zzyzx tea"], mode="similarity")] \
+            == ["Other Tea"]
+
+    def test_unknown_mode(self):
+        """Test an unknown mode is rejected."""
+        service = AIService(ProductStore.from_dicts([{"boycott_product": "A"}]))
+        with pytest.raises(ValueError):
+            service.get_recommendations(["a"], mode="magic")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,180 @@
+"""Tests for compiled, memory-mapped catalog snapshots."""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.dataset import Dataset, DatasetSnapshot
+from app.product_store import ProductStore
+from app.snapshot_file import (
+    SnapshotFormatError, compile_csv, is_fresh, main, open_snapshot, read_manifest,
+    write_snapshot
+)
+
+DATA_PATH = Path(__file__).parent.parent / "data" / "boycott_products.csv"
+
+QUERIES = ["coca", "cola", "a", "nest", "café", "tiba", "oo", "xyz", "pepsi max", ""]
+
+
+@pytest.fixture(scope="module")
+def built():
+    """Dataset snapshot built from the CSV."""
+    return DatasetSnapshot.from_csv(str(DATA_PATH))
+
+
+@pytest.fixture(scope="module")
+def mapped(built, tmp_path_factory):
+    """The same snapshot written to a file and mapped back."""
+    path = tmp_path_factory.mktemp("snap") / "catalog.snap"
+    write_snapshot(built, str(path))
+    return open_snapshot(str(path))
+
+
+class TestRoundTrip:
+    """Test a mapped snapshot answers exactly like the built one."""
+
+    def test_products(self, built, mapped):
+        """Test every row and column survives the round trip."""
+        assert mapped.products.fieldnames == built.products.fieldnames
+        assert len(mapped.products) == len(built.products)
+        for ours, theirs in zip(mapped.products, built.products):
+            assert ours == theirs
+
+    def test_token_search(self, built, mapped):
+        """Test substring search through the mapped token indexes."""
+        for field, index in built.indexes.items():
+            for query in QUERIES:
+                assert list(mapped.indexes[field].search(query)) == list(index.search(query))
+
+    def test_trigram_search(self, built, mapped):
+        """Test substring and fuzzy search through the mapped trigram index."""
+        for query in QUERIES + ["nescafe", "cocacola", "pepsii"]:
+            assert mapped.trigram_index.search(query) == built.trigram_index.search(query)
+            assert (mapped.trigram_index.fuzzy_search(query, max_edits=1)
+                    == built.trigram_index.fuzzy_search(query, max_edits=1))
+
+    def test_autocomplete(self, built, mapped):
+        """Test completions through the flattened trie."""
+        for prefix in ["", "c", "co", "coca ", "cola", "nes", "zzz", "é"]:
+            assert mapped.autocomplete.suggest(prefix) == built.autocomplete.suggest(prefix)
+
+    def test_value_indexes(self, built, mapped):
+        """Test filtered listings use the stored value indexes."""
+        assert set(mapped.products.value_indexes) == set(built.products.value_indexes)
+        for category in [None, "Beverages", "food"]:
+            for intensity in [None, "HIGH", "Low"]:
+                assert (list(mapped.products.iter_where(category=category, intensity=intensity))
+                        == list(built.products.iter_where(category=category, intensity=intensity)))
+
+    def test_none_and_empty_strings(self, tmp_path):
+        """Test None (short rows) and '' stay distinct."""
+        store = ProductStore.from_rows(["id", "boycott_product", "brand"],
+                                       [["1", "", "X"], ["2", "Y"]])
+        path = str(tmp_path / "small.snap")
+        write_snapshot(DatasetSnapshot(store), path)
+        products = open_snapshot(path).products
+        assert products[0]["boycott_product"] == ""
+        assert products[1]["brand"] is None
+
+    def test_empty_catalog(self, tmp_path):
+        """Test an empty catalog round-trips."""
+        path = str(tmp_path / "empty.snap")
+        write_snapshot(DatasetSnapshot.empty(), path)
+        snapshot = open_snapshot(path)
+        assert len(snapshot.products) == 0
+        assert snapshot.autocomplete.suggest("a") == []
+
+
+class TestFormat:
+    """Test header checks and freshness."""
+
+    def test_rejects_other_files(self, tmp_path):
+        """Test non-snapshot files raise SnapshotFormatError."""
+        path = tmp_path / "bogus.snap"
+        path.write_bytes(b"id,name\n1,x\n")
+        with pytest.raises(SnapshotFormatError):
+            open_snapshot(str(path))
+        path.write_bytes(b"")
+        with pytest.raises(SnapshotFormatError):
+            open_snapshot(str(path))
+
+    def test_rejects_other_versions(self, built, tmp_path):
+        """Test a different format version is refused."""
+        path = tmp_path / "catalog.snap"
+        write_snapshot(built, str(path))
+        data = bytearray(path.read_bytes())
+        data[8] = 99
+        path.write_bytes(bytes(data))
+        with pytest.raises(SnapshotFormatError, match="version"):
+            open_snapshot(str(path))
+
+    def test_freshness(self, tmp_path):
+        """Test the snapshot goes stale when the CSV changes."""
+        csv_path = tmp_path / "catalog.csv"
+        csv_path.write_text(DATA_PATH.read_text(encoding="utf-8"), encoding="utf-8")
+        snap_path = compile_csv(str(csv_path))
+        assert snap_path == str(tmp_path / "catalog.snap")
+        assert is_fresh(read_manifest(snap_path), str(csv_path))
+        with open(csv_path, "a", encoding="utf-8") as f:
+            f.write("999,Extra,Extra Co,Food,Reason,Alt,Local,Low\n")
+        assert not is_fresh(read_manifest(snap_path), str(csv_path))
+
+    def test_cli(self, tmp_path, capsys):
+        """Test the command line build."""
+        output = tmp_path / "out.snap"
+        main([str(DATA_PATH), "-o", str(output)])
+        assert output.exists()
+        assert "products" in capsys.readouterr().out
+
+
+class TestDatasetLoading:
+    """Test Dataset prefers a fresh compiled snapshot."""
+
+    def test_uses_fresh_snapshot(self, tmp_path):
+        """Test a fresh snapshot is mapped, a stale one ignored."""
+        csv_path = tmp_path / "catalog.csv"
+        csv_path.write_text(DATA_PATH.read_text(encoding="utf-8"), encoding="utf-8")
+        snap_path = compile_csv(str(csv_path))
+
+        dataset = Dataset(str(csv_path), snap_path)
+        assert dataset.reload()
+        assert dataset.snapshot.mapping is not None
+        assert dataset.snapshot.etag == DatasetSnapshot.from_csv(str(csv_path)).etag
+
+        with open(csv_path, "a", encoding="utf-8") as f:
+            f.write("999,Extra,Extra Co,Food,Reason,Alt,Local,Low\n")
+        assert dataset.reload()
+        assert dataset.snapshot.mapping is None
+        assert dataset.snapshot.products[-1]["boycott_product"] == "Extra"
+
+    def test_corrupt_snapshot_falls_back(self, tmp_path):
+        """Test an unreadable snapshot file falls back to the CSV."""
+        snap_path = tmp_path / "catalog.snap"
+        snap_path.write_bytes(os.urandom(64))
+        dataset = Dataset(str(DATA_PATH), str(snap_path))
+        assert dataset.reload()
+        assert dataset.snapshot.mapping is None
+        assert len(dataset.snapshot.products) > 0
+
+
+    def test_older_format_falls_back(self, tmp_path):
+        """Test a snapshot of an earlier format is ignored and the CSV hashed."""
+        csv_path = tmp_path / "catalog.csv"
+        csv_path.write_text(DATA_PATH.read_text(encoding="utf-8"), encoding="utf-8")
+        snap_path = compile_csv(str(csv_path))
+        data = bytearray(Path(snap_path).read_bytes())
+        data[8] = 1
+        Path(snap_path).write_bytes(bytes(data))
+
+        dataset = Dataset(str(csv_path), snap_path)
+        assert dataset.reload()
+        assert dataset.snapshot.mapping is None
+        assert dataset.snapshot.etag == DatasetSnapshot.from_csv(str(csv_path)).etag
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,92 @@
+"""Tests for in-memory precompressed static assets."""
+
+import gzip
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.static_assets import StaticAsset
+
+PAGE = "<html><body>" + "<p>ConsumeSafe</p>" * 200 + "</body></html>"
+
+
+@pytest.fixture
+def page(tmp_path):
+    """HTML file on disk."""
+    path = tmp_path / "index.html"
+    path.write_text(PAGE, encoding="utf-8")
+    return path
+
+
+class TestEncodings:
+    """Test the variants served for each Accept-Encoding."""
+
+    def test_gzip_negotiated(self, page):
+        """Test gzip is served to clients accepting it, identity otherwise."""
+        version = StaticAsset(str(page), "text/html").current
+        encoding, body = version.select("gzip, deflate")
+        assert encoding == "gzip" and gzip.decompress(body).decode() == PAGE
+        assert version.select("gzip;q=0")[0] == "identity"
+        assert version.select(None) == ("identity", PAGE.encode())
+
+    def test_etags(self, page):
+        """Test each encoding has its own tag and any of them validates."""
+        version = StaticAsset(str(page), "text/html").current
+        assert version.encoded_etag("gzip") != version.etag
+        assert version.matches(version.encoded_etag("gzip"))
+        assert version.matches(f"W/{version.etag}")
+        assert not version.matches('"other"')
+
+    def test_small_files_not_compressed(self, tmp_path):
+        """Test encodings are dropped when they do not save bytes."""
+        path = tmp_path / "tiny.html"
+        path.write_text("<p>", encoding="utf-8")
+        version = StaticAsset(str(path), "text/html").current
+        assert list(version.bodies) == ["identity"]
+
+
+class TestReload:
+    """Test the file is rebuilt when it changes on disk."""
+
+    def test_rebuilt_by_watcher(self, page):
+        """Test the watcher swaps in a new version after an edit."""
+        asset = StaticAsset(str(page), "text/html")
+        first = asset.current
+        asset.watch(0.01)
+        try:
+            page.write_text(PAGE + "<!-- v2 -->", encoding="utf-8")
+            os.utime(page, ns=(first.signature[0] + 10**9, first.signature[0] + 10**9))
+            for _ in range(500):
+                if asset.current is not first:
+                    break
+                time.sleep(0.01)
+            assert asset.current.etag != first.etag and asset.builds == 2
+        finally:
+            asset.stop_watching()
+
+    def test_built_on_first_use(self, tmp_path):
+        """Test a missing file is not read up front and is built once it appears."""
+        path = tmp_path / "index.html"
+        asset = StaticAsset(str(path), "text/html")
+        assert asset.builds == 0 and asset.current is None
+        assert asset.stats() == {"builds": 0}
+        path.write_text(PAGE, encoding="utf-8")
+        assert asset.current.select(None)[1] == PAGE.encode() and asset.builds == 1
+        assert asset.current is asset.current
+
+    def test_failed_reload_keeps_last_version(self, page):
+        """Test a file missing mid-replace does not break serving."""
+        asset = StaticAsset(str(page), "text/html")
+        first = asset.current
+        page.unlink()
+        assert not asset.reload()
+        assert asset.current is first
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
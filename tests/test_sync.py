@@ -0,0 +1,101 @@
+"""Tests for the change log behind delta sync."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.dataset import Dataset
+from app.sync import ChangeLog
+
+
+@pytest.fixture
+def dataset(tmp_path, write_catalog):
+    """Dataset over a three-row catalog, with a change log listening."""
+    path = tmp_path / "catalog.csv"
+    write_catalog(path, {1: "Alpha", 2: "Beta", 3: "Gamma"})
+    dataset = Dataset(str(path))
+    dataset.reload()
+    dataset.change_log = ChangeLog(dataset.snapshot)
+    dataset.add_listener(dataset.change_log.record)
+    return dataset
+
+
+@pytest.fixture
+def update(write_catalog):
+    """Function rewriting a dataset's catalog from {id: name} and reloading it."""
+
+    def rewrite(dataset, rows):
+        write_catalog(dataset.path, rows)
+        assert dataset.reload()
+
+    return rewrite
+
+
+class TestChangeLog:
+    """Test changes are tracked by id across reloads."""
+
+    def test_one_step(self, dataset, update):
+        """Test added, removed and modified rows of one reload."""
+        log = dataset.change_log
+        first = log.version
+        update(dataset, {1: "Alpha", 2: "Beta v2", 4: "Delta"})
+        assert log.changes_since(first) == {"added": ["4"], "removed": ["3"], "modified": ["2"]}
+        assert log.changes_since(log.version) == {"added": [], "removed": [], "modified": []}
+
+    def test_several_steps_net_out(self, dataset, update):
+        """Test a client several versions behind gets the net changes."""
+        log = dataset.change_log
+        first = log.version
+        update(dataset, {1: "Alpha", 2: "Beta", 3: "Gamma", 4: "Delta"})
+        update(dataset, {1: "Alpha", 2: "Beta", 3: "Gamma v2", 4: "Delta", 5: "Epsilon"})
+        update(dataset, {1: "Alpha", 2: "Beta", 3: "Gamma v2", 5: "Epsilon"})
+        assert log.changes_since(first) == {"added": ["5"], "removed": [], "modified": ["3"]}
+
+        body = log.sync(first)
+        assert not body["full"] and body["version"] == log.version
+        assert [row["boycott_product"] for row in body["added"] + body["modified"]] == \
+            ["Epsilon", "Gamma v2"]
+
+    def test_unknown_or_old_version_gets_everything(self, dataset, update):
+        """Test a version out of the log falls back to the full catalog."""
+        log = ChangeLog(dataset.snapshot, max_versions=1)
+        dataset.add_listener(log.record)
+        first = log.version
+        update(dataset, {1: "A"})
+        second = log.version
+        update(dataset, {1: "B"})
+        assert log.changes_since(first) is None
+        assert log.changes_since(second) == {"added": [], "removed": [], "modified": ["1"]}
+        assert log.knows(second) and not log.knows(first) and not log.knows(None)
+        body = log.sync("nonsense")
+        assert body["full"] and [row["boycott_product"] for row in body["products"]] == ["B"]
+
+    def test_non_ascii_digit_ids(self, dataset, update):
+        """Test ids that are digits only outside ASCII sort after numeric ids."""
+        log = dataset.change_log
+        first = log.version
+        update(dataset, {1: "Alpha", 2: "Beta", 3: "Gamma", "²": "Square", "10": "Ten"})
+        assert log.changes_since(first) == {"added": ["10", "²"], "removed": [], "modified": []}
+        assert not log.sync(first)["full"]
+
+    def test_same_content_is_not_a_change(self, dataset, update):
+        """Test reloading an identical file keeps the version."""
+        log = dataset.change_log
+        first = log.version
+        update(dataset, {1: "Alpha", 2: "Beta", 3: "Gamma"})
+        assert log.version == first and log.stats()["versions"] == []
+
+    def test_older_snapshots_ignored(self, dataset, update):
+        """Test recording a snapshot older than the current one does nothing."""
+        log = dataset.change_log
+        old = dataset.snapshot
+        update(dataset, {1: "Alpha"})
+        log.record(old)
+        assert log.version != old.etag.strip('"')
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
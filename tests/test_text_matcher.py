@@ -0,0 +1,115 @@
+"""Tests for the Aho-Corasick matcher and the catalog text scanner."""
+
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.product_store import ProductStore
+from app.search_index import normalize_name
+from app.text_matcher import AhoCorasick, CatalogScanner, normalize_with_offsets
+
+
+def naive_matches(patterns, text):
+    """Every (start, end, pattern) occurrence, found the slow way."""
+    return sorted((i, i + len(p), p) for p in set(patterns) if p
+                  for i in range(len(text)) if text.startswith(p, i))
+
+
+class TestAhoCorasick:
+    """Test the automaton against a brute-force search."""
+
+    def test_random_patterns(self):
+        """Test overlapping and nested patterns on random text."""
+        rng = random.Random(3)
+        for _ in range(300):
+            patterns = ["".join(rng.choice("abc") for _ in range(rng.randint(1, 5)))
+                        for _ in range(rng.randint(1, 12))]
+            text = "".join(rng.choice("abcd") for _ in range(rng.randint(0, 40)))
+            automaton = AhoCorasick(patterns)
+            found = sorted((start, end, automaton.patterns[pattern_id])
+                           for start, end, pattern_id in automaton.iter_matches(text))
+            assert found == naive_matches(patterns, text), (patterns, text)
+
+    def test_classic_example(self):
+        """Test the textbook he/she/his/hers example."""
+        automaton = AhoCorasick(["he", "she", "his", "hers"])
+        found = [(start, end, automaton.patterns[p]) for start, end, p in automaton.iter_matches("ushers")]
+        assert found == [(1, 4, "she"), (2, 4, "he"), (2, 6, "hers")]
+
+    def test_empty(self):
+        """Test no patterns and empty patterns match nothing."""
+        assert list(AhoCorasick([]).iter_matches("abc")) == []
+        assert list(AhoCorasick([""]).iter_matches("abc")) == []
+
+    def test_unicode(self):
+        """Test non-ASCII patterns."""
+        automaton = AhoCorasick(["café", "é"])
+        assert automaton.pattern_ids("un café") == {0, 1}
+
+
+class TestNormalizeWithOffsets:
+    """Test normalization keeps offsets into the original text."""
+
+    @pytest.mark.parametrize("text", ["Coca-Cola  Zéro!", "Ça va? NESTLÉ", "  x", "école", "", "--"])
+    def test_same_as_normalize_name(self, text):
+        """Test the output equals normalize_name."""
+        assert normalize_with_offsets(text)[0] == normalize_name(text)
+
+    def test_positions(self):
+        """Test every output character points at its source."""
+        text = "Hé, LÀ-bas"
+        normalized, positions = normalize_with_offsets(text)
+        assert normalized == "he la bas"
+        assert [text[i] for i in positions] == ["H", "é", ",", "L", "À", "-", "b", "a", "s"]
+
+
+@pytest.fixture(scope="module")
+def scanner():
+    """Scanner over a small catalog."""
+    store = ProductStore.from_dicts([
+        {"boycott_product": "Coca-Cola", "brand": "The Coca-Cola Company"},
+        {"boycott_product": "Nescafé Gold", "brand": "Nestlé"},
+        {"boycott_product": "Nestlé", "brand": "Nestlé"},
+        {"boycott_product": "Ariel", "brand": "P&G"},
+    ])
+    return CatalogScanner(store)
+
+
+class TestCatalogScanner:
+    """Test receipt scanning."""
+
+    def test_offsets_and_kinds(self, scanner):
+        """Test matches carry original offsets, text and kind."""
+        text = "2x COCA COLA, nestle, NESCAFÉ"
+        matches = scanner.scan(text)
+        assert [(m["text"], m["kind"], m["rows"]) for m in matches] == [
+            ("COCA COLA", "product", [0]),
+            ("nestle", "product", [2]),
+            ("NESCAFÉ", "word", [1]),
+        ]
+        for match in matches:
+            assert text[match["start"]:match["end"]] == match["text"]
+
+    def test_contained_matches_dropped(self, scanner):
+        """Test a name inside a longer matched name is not reported twice."""
+        matches = scanner.scan("The Coca-Cola Company")
+        assert [(m["pattern"], m["kind"]) for m in matches] == [("the coca cola company", "brand")]
+
+    def test_whole_words(self, scanner):
+        """Test names inside longer words only match when asked."""
+        assert scanner.scan("Arielle") == []
+        assert [m["pattern"] for m in scanner.scan("Arielle", whole_words=False)] == ["ariel"]
+
+    def test_decomposed_accents(self, scanner):
+        """Test combining accents stay inside the reported text."""
+        text = "Nestle\u0301 water"
+        match = scanner.scan(text)[0]
+        assert match["text"] == "Nestle\u0301"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])